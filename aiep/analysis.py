@@ -0,0 +1,402 @@
+import functools
+from collections import deque
+from typing import Optional, Union
+
+from pydantic import BaseModel
+
+from .graph import IDFGraph
+from .idd import IDD
+from .idf import build_reference_index, lookup_reference
+from .store import GraphStore
+
+
+class DanglingReference(BaseModel):
+    node: int
+    obj_type: str
+    name: str
+    field: str
+    value: str
+    # no candidates means nothing has the name; several means it is ambiguous
+    candidates: list[int] = []
+
+
+def _memoized(method):
+    """
+    Cache a method's result per arguments until the graph changes.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self: "GraphAnalysis", *args, **kwargs):
+        version = self._graph_version()
+        if version != self._version:
+            self._results.clear()
+            self._snapshot = None
+            self._version = version
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in self._results:
+            self._results[key] = method(self, *args, **kwargs)
+        return self._results[key]
+
+    return wrapper
+
+
+class _Adjacency:
+    """
+    Neighbour lists in compressed sparse row form: the neighbours of node `i`
+    are `neighbours[offsets[i]:offsets[i + 1]]`.  Two flat lists are much
+    cheaper to build than a list per node.
+    """
+
+    __slots__ = ("offsets", "neighbours")
+
+    def __init__(self, n_nodes: int, sources: list[int], targets: list[int]):
+        offsets = [0] * (n_nodes + 1)
+        for source in sources:
+            offsets[source + 1] += 1
+        for i in range(n_nodes):
+            offsets[i + 1] += offsets[i]
+        neighbours = [0] * len(sources)
+        position = offsets[:-1]
+        for source, target in zip(sources, targets):
+            neighbours[position[source]] = target
+            position[source] += 1
+        self.offsets = offsets
+        self.neighbours = neighbours
+
+    def __getitem__(self, i: int) -> list[int]:
+        return self.neighbours[self.offsets[i] : self.offsets[i + 1]]
+
+    def degree(self, i: int) -> int:
+        return self.offsets[i + 1] - self.offsets[i]
+
+
+class _Snapshot:
+    """
+    The graph flattened into dense adjacency arrays, where edges point from
+    the referring object to the object it refers to.
+    """
+
+    __slots__ = ("node_ids", "dense_ids", "types", "references", "referrers")
+
+    def __init__(self, graph: Union[GraphStore, IDFGraph]):
+        if isinstance(graph, GraphStore):
+            self.node_ids = list(range(graph.n_nodes))
+            self.dense_ids = None
+            self.types = [graph.types[type_id] for type_id in graph.node_types]
+            sources = graph.edge_sources.tolist()
+            targets = graph.edge_targets.tolist()
+        else:
+            nodes = graph.graph.nodes
+            self.node_ids = sorted(nodes)
+            self.dense_ids = {node_id: i for i, node_id in enumerate(self.node_ids)}
+            self.types = [nodes[node_id]["type"] for node_id in self.node_ids]
+            # edges in an IDFGraph point from the referenced object
+            sources, targets = [], []
+            for target, source in graph.graph.edges():
+                sources.append(self.dense_ids[source])
+                targets.append(self.dense_ids[target])
+        self.references = _Adjacency(len(self.node_ids), sources, targets)
+        self.referrers = _Adjacency(len(self.node_ids), targets, sources)
+
+    def dense(self, node_id: int) -> int:
+        return node_id if self.dense_ids is None else self.dense_ids[node_id]
+
+    def reach(self, starts: list[int], adjacency: _Adjacency) -> list[int]:
+        seen = set(starts)
+        queue = deque(starts)
+        while queue:
+            for neighbour in adjacency[queue.popleft()]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        return sorted(seen)
+
+
+class GraphAnalysis:
+    """
+    Structural analyses of an IDF graph, memoized until the graph changes.
+
+    Works on a `GraphStore`, as built by `build_graph_store` (and wrapped by
+    `create_graph`), or on an editable `IDFGraph`.  Each analysis is linear
+    in the size of the graph, or of the part of it which is visited.  Results
+    are cached per arguments, and the cache is dropped as soon as the graph is
+    edited, i.e. when the `IDFGraph`'s version changes or the `GraphStore`
+    grows.  Results are shared between callers, so they should not be
+    modified.
+
+    Node ids in results are those of the graph analysed.
+    """
+
+    def __init__(self, graph: Union[GraphStore, IDFGraph], idd: Optional[IDD] = None):
+        """
+        Args:
+            graph (Union[GraphStore, IDFGraph]): The graph to analyse
+            idd (IDD, optional): The IDD the graph was resolved with, needed to
+                find dangling references; defaults to an `IDFGraph`'s IDD
+        """
+        self.graph = graph
+        self.idd = (
+            idd if idd is not None or isinstance(graph, GraphStore) else graph.idd
+        )
+        self._results: dict[tuple, object] = {}
+        self._snapshot: Optional[_Snapshot] = None
+        self._version = self._graph_version()
+
+    def _graph_version(self):
+        if isinstance(self.graph, GraphStore):
+            # a store only ever grows
+            return self.graph.n_nodes, self.graph.n_edges
+        return self.graph.version
+
+    @property
+    def snapshot(self) -> _Snapshot:
+        if self._snapshot is None:
+            self._snapshot = _Snapshot(self.graph)
+        return self._snapshot
+
+    def _ids(self, dense: list[int]) -> list[int]:
+        node_ids = self.snapshot.node_ids
+        return [node_ids[i] for i in dense]
+
+    @_memoized
+    def unreferenced(self, referenceable_only: bool = True) -> list[int]:
+        """
+        Find the objects which no other object refers to.
+
+        Args:
+            referenceable_only (bool): Only include objects of types whose
+                names the IDD registers in some reference class, i.e. which
+                could be referred to at all.  Without an IDD every type counts.
+
+        Returns:
+            nodes (list[int]): The unreferenced nodes
+        """
+        snapshot = self.snapshot
+        referenceable: dict[str, bool] = {}
+        unreferenced = []
+        for i in range(len(snapshot.node_ids)):
+            if snapshot.referrers.degree(i):
+                continue
+            obj_type = snapshot.types[i]
+            if referenceable_only and self.idd is not None:
+                if obj_type not in referenceable:
+                    referenceable[obj_type] = obj_type in self.idd.schemas and bool(
+                        self.idd[obj_type].reference_fields
+                    )
+                if not referenceable[obj_type]:
+                    continue
+            unreferenced.append(i)
+        return self._ids(unreferenced)
+
+    @_memoized
+    def isolated(self) -> list[int]:
+        """
+        Find the objects which neither refer to nor are referred to by any
+        other object.
+        """
+        references, referrers = self.snapshot.references, self.snapshot.referrers
+        return self._ids(
+            [
+                i
+                for i in range(len(self.snapshot.node_ids))
+                if not references.degree(i) and not referrers.degree(i)
+            ]
+        )
+
+    @_memoized
+    def components(self) -> list[list[int]]:
+        """
+        Split the graph into its connected components, ignoring the direction
+        of references.
+
+        Returns:
+            components (list[list[int]]): The nodes of each component, largest
+                component first
+        """
+        snapshot = self.snapshot
+        component_of = [-1] * len(snapshot.node_ids)
+        components: list[list[int]] = []
+        for root in range(len(snapshot.node_ids)):
+            if component_of[root] != -1:
+                continue
+            component_of[root] = len(components)
+            members = [root]
+            queue = deque(members)
+            while queue:
+                i = queue.popleft()
+                for neighbours in (snapshot.references[i], snapshot.referrers[i]):
+                    for j in neighbours:
+                        if component_of[j] == -1:
+                            component_of[j] = len(components)
+                            members.append(j)
+                            queue.append(j)
+            components.append(sorted(members))
+        components.sort(key=len, reverse=True)
+        return [self._ids(members) for members in components]
+
+    @_memoized
+    def component_of(self, node_id: int) -> list[int]:
+        """
+        Find the connected component a node belongs to.
+        """
+        snapshot = self.snapshot
+        start = snapshot.dense(node_id)
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            for neighbours in (snapshot.references[i], snapshot.referrers[i]):
+                for j in neighbours:
+                    if j not in seen:
+                        seen.add(j)
+                        queue.append(j)
+        return self._ids(sorted(seen))
+
+    @_memoized
+    def dependencies(self, node_id: int) -> list[int]:
+        """
+        Find every object a node refers to, directly or through other objects,
+        e.g. a surface's construction, its materials and their schedules.
+        The node itself is included.
+        """
+        snapshot = self.snapshot
+        return self._ids(snapshot.reach([snapshot.dense(node_id)], snapshot.references))
+
+    @_memoized
+    def dependents(self, node_id: int) -> list[int]:
+        """
+        Find every object which refers to a node, directly or through other
+        objects, e.g. a zone's surfaces and the windows on them.  The node
+        itself is included.
+        """
+        snapshot = self.snapshot
+        return self._ids(snapshot.reach([snapshot.dense(node_id)], snapshot.referrers))
+
+    @_memoized
+    def zone_closure(self, zone: int) -> list[int]:
+        """
+        Find everything a zone needs to be simulated on its own: the objects
+        which refer to it, directly or through other objects (surfaces,
+        windows, people, lights, ...), and everything those objects and the
+        zone refer to (constructions, materials, schedules, ...).
+
+        Args:
+            zone (int): The zone's node
+
+        Returns:
+            nodes (list[int]): The nodes in the closure, including the zone
+        """
+        snapshot = self.snapshot
+        dependents = snapshot.reach([snapshot.dense(zone)], snapshot.referrers)
+        return self._ids(snapshot.reach(dependents, snapshot.references))
+
+    @_memoized
+    def zone_closures(self) -> dict[int, list[int]]:
+        """
+        Find the closure of every zone, see `zone_closure`.
+        """
+        snapshot = self.snapshot
+        return {
+            node_id: self.zone_closure(node_id)
+            for node_id, obj_type in zip(snapshot.node_ids, snapshot.types)
+            if obj_type == "ZONE"
+        }
+
+    @_memoized
+    def dangling_references(self) -> list[DanglingReference]:
+        """
+        Find the fields which should refer to another object but don't,
+        because no object of a type they may refer to has the name they hold,
+        or because several do.
+
+        Only fields with an object-list are considered, so an IDD is needed.
+        Node fields and fields which name object types are skipped.  Some
+        object-lists also accept names built into EnergyPlus, e.g. of fluids,
+        so those are reported as dangling too.
+
+        Returns:
+            references (list[DanglingReference]): The unresolved fields
+        """
+        if self.idd is None:
+            return []
+        if isinstance(self.graph, GraphStore):
+            return self._store_dangling_references()
+        return self._graph_dangling_references()
+
+    def _store_dangling_references(self) -> list[DanglingReference]:
+        store: GraphStore = self.graph
+        # the fields which may dangle, by type
+        type_checked_fields = [
+            {
+                field: reference_classes
+                for field, reference_classes in self.idd[
+                    obj_type.upper()
+                ].object_list_fields.items()
+                if field != "Name" and self.idd.names_objects(reference_classes)
+            }
+            for obj_type in store.types
+        ]
+        resolved = set(zip(store.edge_sources, store.edge_fields))
+        # only needed to list the candidates, so only built if something dangles
+        reference_index = None
+        dangling = []
+        for node_id, type_id, fieldnames, fieldvalues in store.iter_fields():
+            checked_fields = type_checked_fields[type_id]
+            if not checked_fields:
+                continue
+            for field, fieldvalue in zip(fieldnames, fieldvalues):
+                reference_classes = checked_fields.get(field)
+                if (
+                    reference_classes is None
+                    or not isinstance(fieldvalue, str)
+                    or not fieldvalue
+                    or (node_id, store.find_field(field)) in resolved
+                ):
+                    continue
+                if reference_index is None:
+                    reference_index = build_reference_index(store, self.idd)
+                dangling.append(
+                    DanglingReference(
+                        node=node_id,
+                        obj_type=store.node_type(node_id),
+                        name=store.names[node_id],
+                        field=field,
+                        value=fieldvalue,
+                        candidates=lookup_reference(
+                            reference_index, reference_classes, fieldvalue
+                        ),
+                    )
+                )
+        return dangling
+
+    def _graph_dangling_references(self) -> list[DanglingReference]:
+        graph: IDFGraph = self.graph
+        nodes = graph.graph.nodes
+        dangling = []
+        for node_id in sorted(nodes):
+            attrs = nodes[node_id]
+            object_list_fields = self.idd[attrs["type"]].object_list_fields
+            for field, name in graph.references(node_id).items():
+                reference_classes = object_list_fields[field]
+                if (
+                    graph.target(node_id, field) is not None
+                    or not name
+                    or not self.idd.names_objects(reference_classes)
+                ):
+                    continue
+                candidates: set[int] = set()
+                for reference_class in reference_classes:
+                    candidates.update(
+                        graph.names.get(reference_class, {}).get(name, ())
+                    )
+                dangling.append(
+                    DanglingReference(
+                        node=node_id,
+                        obj_type=attrs["type"],
+                        name=attrs["name"],
+                        field=field,
+                        value=attrs["object"][field],
+                        candidates=sorted(candidates),
+                    )
+                )
+        return dangling
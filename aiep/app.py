@@ -1,9 +1,19 @@
+import os
+import sys
+from pathlib import Path
+
 import streamlit as st
-import networkx as nx
-from archetypal.idfclass import IDF
 
-from idd import IDD
-from idf import create_graph, Node
+# streamlit only puts this file's directory on the path, but the aiep modules
+# import each other as a package
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from aiep.browser import ModelIndex, RenderTimer
+from aiep.cache import ModelCache, load_idd_file, load_idd_version
+from aiep.idd import IDD
+from aiep.idf import create_graph, Node
+from aiep.parser import parse_idf, read_idf_version
+from aiep.profiling import JSONLinesSink, Profiler, ProfileReport
 
 st.set_page_config(
     page_title="AI-EP",
@@ -13,21 +23,71 @@ st.set_page_config(
 
 
 @st.cache_resource
-def load_idf(file):
-    with open("tester.idf", "wb") as f:
-        f.write(file.read())
-    idf = IDF(idfname="tester.idf")
-    idd = IDD.from_idf(idf)
-    idf_nodes, idf_edges, idf_graph = create_graph(idf)
-    graph = idd.make_graph()
-    # TODO: move cat graph into idd class
-    cat_graph = nx.DiGraph()
-    groups = set()
-    for node in graph.nodes:
-        cat_graph.add_edge(node.header.group, node)
-        groups.add(node.header.group)
-
-    return idf, idd, graph, cat_graph, sorted(list(groups)), idf_graph
+def model_cache() -> ModelCache:
+    # one cache for every session, so a model uploaded twice is built once
+    return ModelCache(maxsize=int(os.environ.get("AIEP_MODEL_CACHE_SIZE", 8)))
+
+
+def build_model(data: bytes, idd_path: str) -> tuple[IDD, ModelIndex, ProfileReport]:
+    jsonl = os.environ.get("AIEP_PROFILE_JSONL")
+    profiler = Profiler([JSONLinesSink(jsonl)] if jsonl else [])
+    with profiler.span("pipeline", loader="parser", n_bytes=len(data)):
+        with profiler.span("idd"):
+            if idd_path:
+                idd = load_idd_file(idd_path)
+            else:
+                version = read_idf_version(data)
+                if version is None:
+                    raise ValueError("The IDF has no Version object.")
+                idd = load_idd_version(version)
+        # parse straight from the uploaded bytes; no temp file, and no eppy
+        with profiler.span("load"):
+            objects = list(parse_idf(data, idd))
+        with profiler.span("graph"):
+            idf_nodes, idf_edges, idf_graph = create_graph(
+                objects, idd, profiler=profiler
+            )
+        with profiler.span("index"):
+            idd.index
+            model = ModelIndex(idf_graph)
+    profiler.close()
+    return idd, model, profiler.report()
+
+
+def load_idf(file, idd_path: str) -> tuple[str, IDD, ModelIndex, ProfileReport]:
+    data = file.getvalue()
+    key = ModelCache.key(data, idd_path)
+    idd, model, profile = model_cache().get(key, lambda: build_model(data, idd_path))
+    return key, idd, model, profile
+
+
+def render_profile(profile: ProfileReport):
+    with st.sidebar:
+        st.subheader("Load profile")
+        st.caption("Measured when the model was built; cached loads reuse it.")
+        st.text(profile.table())
+        with st.expander("Slowest object types"):
+            for stage in ("graph.nodes", "graph.edges"):
+                st.markdown(f"`{stage}`")
+                st.table(
+                    [
+                        {"type": obj_type, "ms": round(seconds * 1000, 2)}
+                        for obj_type, seconds in profile.slowest_types(stage)
+                    ]
+                )
+        st.download_button(
+            "Download profile",
+            profile.model_dump_json(indent=2),
+            file_name="profile.json",
+            mime="application/json",
+        )
+
+
+@st.cache_resource
+def load_idd_schema(idd_path: str):
+    idd = load_idd_file(idd_path)
+    idd.index
+    return idd
 
 
 def render():
@@ -35,15 +95,36 @@ def render():
 
     with st.expander("Upload", expanded="idf_file" not in st.session_state):
         file = st.file_uploader(label="Upload an IDF", type=".idf", key="idf_file")
+        idd_path = st.text_input(
+            label=(
+                "Energy+.idd to browse, or to read uploads with "
+                "(by default, the one for the IDF's version)"
+            ),
+            value=os.environ.get("AIEP_IDD_PATH", ""),
+        )
+    if file is None and idd_path:
+        render_schema_browser(load_idd_schema(idd_path))
     if file is not None:
-        idf, idd, graph, cat_graph, groups, idf_graph = load_idf(file)
+        try:
+            model_key, idd, model, profile = load_idf(file, idd_path)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        render_profile(profile)
+        groups = sorted(idd.index.groups)
+        # cursors point into the graph of the model they were set on, which
+        # may have been evicted and rebuilt since
+        obj_cursor = st.session_state.get("obj_cursor")
+        if st.session_state.get("model_key") != model_key or (
+            obj_cursor is not None and obj_cursor not in model.graph
+        ):
+            st.session_state.model_key = model_key
+            st.session_state.pop("def_cursor", None)
+            st.session_state.pop("obj_cursor", None)
         if "def_cursor" not in st.session_state:
             st.session_state.def_cursor = "ZONE"
         if "obj_cursor" not in st.session_state:
-            st.session_state.obj_cursor = sorted(
-                filter(lambda x: x.type == "ZONE", idf_graph.nodes),
-                key=lambda x: -len(list(idf_graph.successors(x))),
-            )[0]
+            st.session_state.obj_cursor = model.most_referenced("ZONE")
         if st.session_state.def_cursor is None:
             left, right = st.columns(2)
             with left:
@@ -51,18 +132,17 @@ def render():
                     label="Select an object category",
                     options=groups,
                 )
-                cat_objs = cat_graph.successors(selected_category)
+                obj_types = idd.index.types_in_group(selected_category)
             with right:
                 selected_object = st.selectbox(
                     f"{selected_category} Objects",
-                    options=cat_objs,
-                    format_func=lambda obj: obj.object_type,
+                    options=obj_types,
                 )
             clicked = st.button(
                 "Load Object Definition", use_container_width=True, type="primary"
             )
             if clicked:
-                st.session_state.def_cursor = selected_object.object_type
+                st.session_state.def_cursor = selected_object
                 st.experimental_rerun()
 
         else:
@@ -88,29 +168,20 @@ def render():
                         label="Select an object category",
                         options=groups,
                         index=groups.index(
-                            list(
-                                cat_graph.predecessors(idd[st.session_state.def_cursor])
-                            )[0]
+                            idd.index.group_of(st.session_state.def_cursor)
                         ),
                     )
-                    cat_objs = list(cat_graph.successors(selected_category))
-                    obj_types = [obj.object_type for obj in cat_objs]
+                    obj_types = idd.index.types_in_group(selected_category)
                     if st.session_state.def_cursor not in obj_types:
                         st.session_state.def_cursor = obj_types[0]
                     selected_object = st.selectbox(
                         f"{selected_category} Objects",
-                        options=cat_objs,
+                        options=obj_types,
                         index=obj_types.index(st.session_state.def_cursor),
-                        format_func=lambda obj: obj.object_type,
                     )
-                    st.session_state.def_cursor = selected_object.object_type
+                    st.session_state.def_cursor = selected_object
 
-                    objs = list(
-                        filter(
-                            lambda x: x.type.upper() == selected_object.object_type,
-                            idf_graph.nodes,
-                        )
-                    )
+                    objs = model.objects(selected_object)
                     selected_idfobj = st.selectbox(
                         "Select IDF Object",
                         options=objs,
@@ -124,7 +195,7 @@ def render():
                     )
                     if clicked:
                         st.session_state.obj_cursor = selected_idfobj
-                        st.session_state.def_cursor = selected_object.object_type
+                        st.session_state.def_cursor = selected_object
                         st.experimental_rerun()
 
                 else:
@@ -137,12 +208,10 @@ def render():
                         l, r = st.columns(2, gap="large")
                         with l:
                             st.subheader("References")
-                            for source, target, field in nx.reverse(idf_graph).edges(
-                                obj, keys=True
-                            ):
+                            for field, target in model.references(obj):
                                 clicked = st.button(
                                     f"({field.replace('_',' ')}) `{target.name.replace('_',' ')}`",
-                                    key=f"{source}-{target}-{field}",
+                                    key=f"references-{target.id}-{field}",
                                     use_container_width=True,
                                 )
                                 if clicked:
@@ -151,12 +220,10 @@ def render():
                                     st.experimental_rerun()
                         with r:
                             st.subheader("Referenced By")
-                            for source, target, field in idf_graph.edges(
-                                obj, keys=True
-                            ):
+                            for field, target in model.referenced_by(obj):
                                 clicked = st.button(
                                     f"`{target.name.replace('_',' ')} `({field.replace('_',' ')})",
-                                    key=f"{source}-{target}-{field}",
+                                    key=f"referenced-by-{target.id}-{field}",
                                     use_container_width=True,
                                 )
                                 if clicked:
@@ -164,95 +231,120 @@ def render():
                                     st.session_state.def_cursor = target.type.upper()
                                     st.experimental_rerun()
             with right:
-                root = idd[st.session_state.def_cursor]
-                referenced_by = graph.predecessors(root)
-
-                st.header(f"`{root.object_type}`")
-                st.markdown(f"Category: `{root.header.group}`")
-                if root.header.extensible is not None:
-                    st.write(
-                        "Extensible",
-                        list(root.field_definitions.values())[
-                            root.header.extensible
-                        ].name,
+                render_definition(idd)
+
+
+def render_schema_browser(idd: IDD):
+    groups = sorted(idd.index.groups)
+    if st.session_state.get("def_cursor") not in idd.schemas:
+        st.session_state.def_cursor = (
+            "ZONE" if "ZONE" in idd.schemas else next(iter(idd.schemas))
+        )
+    left, right = st.columns(2, gap="large")
+    with left:
+        selected_category = st.selectbox(
+            label="Select an object category",
+            options=groups,
+            index=groups.index(idd.index.group_of(st.session_state.def_cursor)),
+        )
+        obj_types = idd.index.types_in_group(selected_category)
+        if st.session_state.def_cursor not in obj_types:
+            st.session_state.def_cursor = obj_types[0]
+        st.session_state.def_cursor = st.selectbox(
+            f"{selected_category} Objects",
+            options=obj_types,
+            index=obj_types.index(st.session_state.def_cursor),
+        )
+    with right:
+        render_definition(idd)
+
+
+def render_definition(idd: IDD):
+    root = idd[st.session_state.def_cursor]
+    referenced_by = idd.index.referencing_types(root.object_type)
+
+    st.header(f"`{root.object_type}`")
+    st.markdown(f"Category: `{root.header.group}`")
+    if root.header.extensible is not None:
+        st.write(
+            "Extensible",
+            list(root.field_definitions.values())[root.header.extensible].name,
+        )
+    if root.header.memo:
+        st.markdown(f"*{root.header.memo.replace(':', '::')}*")
+    metadata_col, ref_tab = st.tabs(["Schema", "Type References"])
+    with metadata_col:
+        for i, field in enumerate(root):
+            if root.header.extensible is not None:
+                if i > root.header.extensible:
+                    continue
+            l, r = st.columns([0.5, 0.5])
+            with l:
+                st.markdown(
+                    f"{field.name} `{field.type}`{'*required*' if field.required_field else ''}"
+                )
+                if field.begin_extensible:
+                    st.write("(Start of list)")
+            with r:
+                md_str = []
+                if field.default is not None:
+                    md_str.append(f"default: `{field.default}`")
+                if field.minimum is not None:
+                    md_str.append(f"minimum: `{field.minimum}`")
+                if field.maximum is not None:
+                    md_str.append(f"maximum: `{field.maximum}`")
+                if field.key:
+                    md_str.append(f"choices: `{'` | `'.join(field.key)}`")
+
+                if field.reference:
+                    md_str.append(
+                        f"Reference Categories: `{'` | `'.join(field.reference)}`"
                     )
-                if root.header.memo:
-                    st.markdown(f"*{root.header.memo.replace(':', '::')}*")
-                metadata_col, ref_tab = st.tabs(["Schema", "Type References"])
-                with metadata_col:
-                    for i, field in enumerate(root):
-                        if root.header.extensible is not None:
-                            if i > root.header.extensible:
-                                continue
-                        l, r = st.columns([0.5, 0.5])
-                        with l:
-                            st.markdown(
-                                f"{field.name} `{field.type}`{'*required*' if field.required_field else ''}"
-                            )
-                            if field.begin_extensible:
-                                st.write("(Start of list)")
-                        with r:
-                            md_str = []
-                            if field.default is not None:
-                                md_str.append(f"default: `{field.default}`")
-                            if field.minimum is not None:
-                                md_str.append(f"minimum: `{field.minimum}`")
-                            if field.maximum is not None:
-                                md_str.append(f"maximum: `{field.maximum}`")
-                            if field.key:
-                                md_str.append(f"choices: `{'` | `'.join(field.key)}`")
-
-                            if field.reference:
-                                md_str.append(
-                                    f"Reference Categories: `{'` | `'.join(field.reference)}`"
-                                )
-                            if field.autocalculatable:
-                                md_str.append(
-                                    f"autocalculatable: `{field.autocalculatable}`"
-                                )
-                            if field.autosizable:
-                                md_str.append(f"autosizable: `{field.autosizable}`")
-                            if field.object_list is not None:
-                                md_str.append(
-                                    f"references: `{'` | `'.join(field.object_list)}`"
-                                )
-                            st.markdown(", ".join(md_str))
-                            if field.note:
-                                st.markdown(f"*{field.note}*")
-
-                with ref_tab:
-                    ref_to_col, ref_by_col = st.columns(2)
-                    with ref_to_col:
-                        st.subheader("References")
-                        for field in root:
-                            if field.validobjects:
-                                for obj in field.validobjects:
-                                    clicked = st.button(
-                                        f'({field.name}) `{obj.replace(":", "::")}`',
-                                        key=f"{root.object_type}-{field.name}-{obj}",
-                                        use_container_width=True,
-                                    )
-                                    if clicked:
-                                        st.session_state.def_cursor = obj
-                                        st.experimental_rerun()
-                    with ref_by_col:
-                        st.subheader("Referenced By")
-                        for obj in referenced_by:
-                            reference_keys = ", ".join(list(graph[obj][root].keys()))
-                            button_txt = (
-                                f'`{obj.object_type.replace(":", "::")}`'
-                                + "("
-                                + reference_keys[:50]
-                                + ("..." if len(reference_keys) > 50 else "")
-                                + ")"
-                            )
-                            clicked = st.button(
-                                button_txt, type="secondary", use_container_width=True
-                            )
-
-                            if clicked:
-                                st.session_state.def_cursor = obj.object_type
-                                st.experimental_rerun()
+                if field.autocalculatable:
+                    md_str.append(f"autocalculatable: `{field.autocalculatable}`")
+                if field.autosizable:
+                    md_str.append(f"autosizable: `{field.autosizable}`")
+                if field.object_list is not None:
+                    md_str.append(f"references: `{'` | `'.join(field.object_list)}`")
+                st.markdown(", ".join(md_str))
+                if field.note:
+                    st.markdown(f"*{field.note}*")
+
+    with ref_tab:
+        ref_to_col, ref_by_col = st.columns(2)
+        with ref_to_col:
+            st.subheader("References")
+            for field in root:
+                if field.validobjects:
+                    for obj in field.validobjects:
+                        clicked = st.button(
+                            f'({field.name}) `{obj.replace(":", "::")}`',
+                            key=f"{root.object_type}-{field.name}-{obj}",
+                            use_container_width=True,
+                        )
+                        if clicked:
+                            st.session_state.def_cursor = obj
+                            st.experimental_rerun()
+        with ref_by_col:
+            st.subheader("Referenced By")
+            for obj in referenced_by:
+                reference_keys = ", ".join(
+                    idd.index.fields_between(obj, root.object_type)
+                )
+                button_txt = (
+                    f'`{obj.replace(":", "::")}`'
+                    + "("
+                    + reference_keys[:50]
+                    + ("..." if len(reference_keys) > 50 else "")
+                    + ")"
+                )
+                clicked = st.button(
+                    button_txt, type="secondary", use_container_width=True
+                )
+
+                if clicked:
+                    st.session_state.def_cursor = obj
+                    st.experimental_rerun()
 
 
 def old_expander():
@@ -288,4 +380,11 @@ def old_expander():
                 st.experimental_rerun()
 
 
-render()
+def main():
+    timer = st.session_state.setdefault("render_timer", RenderTimer())
+    with timer.measure():
+        render()
+    st.caption(timer.summary())
+
+
+main()
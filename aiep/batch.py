@@ -0,0 +1,238 @@
+"""
+Parse and graph a corpus of IDF files across a pool of processes.
+
+Usage (from the repository root):
+
+    python -m aiep.batch path/to/idfs --out graphs --idd path/to/Energy+.idd
+
+Each file's `GraphStore` is pickled into the output directory as soon as it is
+built, and a line describing the outcome for every file, including any error,
+is appended to `manifest.jsonl` there.
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+from pydantic import BaseModel
+from tqdm.autonotebook import tqdm
+
+from .cache import load_idd_file
+from .idd import read_idd_version
+from .idf import build_graph_store
+from .parser import parse_idf, read_idf_version
+
+
+class IngestResult(BaseModel):
+    path: str
+    version: Optional[str] = None
+    output: Optional[str] = None
+    n_nodes: int = 0
+    n_edges: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def find_idfs(source: Union[str, Path]) -> list[Path]:
+    """
+    Find the IDF files in a directory (recursively), or matching a glob.
+    """
+    if Path(source).is_dir():
+        return sorted(
+            path for path in Path(source).rglob("*") if path.suffix.lower() == ".idf"
+        )
+    return sorted(Path(path) for path in glob.glob(str(source), recursive=True))
+
+
+def short_version(version: str) -> str:
+    """
+    Reduce a version to major.minor, since IDFs say '9.2' where IDDs say '9.2.0'.
+    """
+    return ".".join(version.strip().split(".")[:2])
+
+
+def index_idds(idd_paths: Iterable[Union[str, Path]]) -> dict[str, str]:
+    """
+    Map the major.minor EnergyPlus version of each IDD file to its path.
+    """
+    idds: dict[str, str] = {}
+    for idd_path in idd_paths:
+        version = read_idd_version(idd_path)
+        if version is None:
+            raise ValueError(f"{idd_path} does not declare an '!IDD_Version'.")
+        idds[short_version(version)] = str(idd_path)
+    return idds
+
+
+def output_path(path: Union[str, Path], output_dir: Union[str, Path]) -> Path:
+    # files with the same name in different directories must not collide
+    digest = hashlib.sha1(str(Path(path).resolve()).encode()).hexdigest()[:8]
+    return Path(output_dir) / f"{Path(path).stem}-{digest}.pkl"
+
+
+def ingest_file(
+    path: Union[str, Path], output_dir: Union[str, Path], idds: dict[str, str]
+) -> IngestResult:
+    """
+    Parse and graph a single IDF, and pickle its `GraphStore` to disk.
+
+    Any error is recorded on the result rather than raised, so that one bad
+    file does not abort a batch.
+
+    Args:
+        path (Path): The IDF file
+        output_dir (Path): The directory to write the graph to
+        idds (dict[str, str]): IDD paths keyed by major.minor version, as made
+            by `index_idds`.  If empty, references are resolved untyped.
+
+    Returns:
+        result (IngestResult): What was written, or what went wrong
+    """
+    start = time.perf_counter()
+    result = IngestResult(path=str(path))
+    try:
+        result.version = read_idf_version(path)
+        idd = None
+        if idds:
+            version = short_version(result.version or "")
+            if version not in idds:
+                raise ValueError(
+                    f"No IDD was given for EnergyPlus version {result.version}."
+                )
+            # each worker keeps its own copy, loaded from the shared disk cache
+            idd = load_idd_file(idds[version])
+        store = build_graph_store(parse_idf(path, idd), idd, progress=False)
+
+        output = output_path(path, output_dir)
+        # write to a temp file first so readers never see a partial graph
+        fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, output)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        result.output = str(output)
+        result.n_nodes = store.n_nodes
+        result.n_edges = store.n_edges
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def iter_manifest(output_dir: Union[str, Path]) -> Iterator[IngestResult]:
+    """
+    Read back the results `aiep.batch` recorded for each file it graphed.
+    """
+    with open(Path(output_dir) / "manifest.jsonl") as f:
+        for line in f:
+            if line.strip():
+                yield IngestResult.model_validate_json(line)
+
+
+def ingest_corpus(
+    paths: Iterable[Union[str, Path]],
+    output_dir: Union[str, Path],
+    idd_paths: Iterable[Union[str, Path]] = (),
+    max_workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+) -> Iterator[IngestResult]:
+    """
+    Parse and graph IDF files in parallel, writing each graph as it completes.
+
+    Only `max_pending` files are submitted to the pool at a time, so memory
+    stays bounded however large the corpus is.  Each IDD is parsed once up
+    front into the on-disk IDD cache, from which the workers load it.
+
+    Args:
+        paths (Iterable[Path]): The IDF files, e.g. from `find_idfs`
+        output_dir (Path): The directory to write graphs and the manifest to
+        idd_paths (Iterable[Path]): An IDD file for each EnergyPlus version in
+            the corpus.  If none are given, references are resolved untyped.
+        max_workers (int, optional): The number of processes; defaults to the
+            number of CPUs
+        max_pending (int, optional): The number of files in flight; defaults
+            to twice the number of processes
+
+    Yields:
+        result (IngestResult): The outcome for each file, in completion order
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    idds = index_idds(idd_paths)
+    for idd_path in idds.values():
+        load_idd_file(idd_path)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * max_workers
+    paths = iter(paths)
+    with open(output_dir / "manifest.jsonl", "a") as manifest, ProcessPoolExecutor(
+        max_workers=max_workers
+    ) as pool:
+        pending: set[Future] = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                path = next(paths, None)
+                if path is None:
+                    exhausted = True
+                else:
+                    pending.add(pool.submit(ingest_file, path, output_dir, idds))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                manifest.write(result.model_dump_json() + "\n")
+                manifest.flush()
+                yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", help="A directory of IDF files, or a glob")
+    parser.add_argument("--out", required=True, help="Where to write the graphs")
+    parser.add_argument(
+        "--idd",
+        nargs="*",
+        default=[],
+        help="An Energy+.idd for each EnergyPlus version in the corpus",
+    )
+    parser.add_argument("--workers", type=int, help="The number of processes")
+    args = parser.parse_args()
+
+    paths = find_idfs(args.source)
+    start = time.perf_counter()
+    failures: list[IngestResult] = []
+    for result in tqdm(
+        ingest_corpus(paths, args.out, args.idd, max_workers=args.workers),
+        total=len(paths),
+    ):
+        if not result.ok:
+            failures.append(result)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"Ingested {len(paths) - len(failures)}/{len(paths)} files in "
+        f"{elapsed:.1f}s ({len(paths) / elapsed:.1f} files/s)"
+    )
+    for result in failures:
+        print(f"FAILED {result.path}: {result.error}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import networkx as nx
+
+from .store import Node
+
+
+class ModelIndex:
+    """
+    Lookup tables for browsing a model, built once when the model is loaded
+    so that each interaction only touches the objects it shows.
+
+    The tables are built in one pass over the nodes and one over the edges of
+    a `create_graph` graph, whose edges point from the referenced object to
+    the object referring to it.
+    """
+
+    def __init__(self, graph: nx.MultiDiGraph):
+        """
+        Args:
+            graph (nx.MultiDiGraph): The graph made by `create_graph`
+        """
+        self.graph = graph
+        # upper-cased type -> its objects, in file order
+        self.by_type: dict[str, list[Node]] = {}
+        for node in graph.nodes:
+            self.by_type.setdefault(node.type.upper(), []).append(node)
+        # node -> (field, node) pairs, for the objects it refers to, and the
+        # objects which refer to it through one of their fields
+        self._references: dict[Node, list[tuple[str, Node]]] = {}
+        self._referenced_by: dict[Node, list[tuple[str, Node]]] = {}
+        for target, source, field in graph.edges(keys=True):
+            self._references.setdefault(source, []).append((field, target))
+            self._referenced_by.setdefault(target, []).append((field, source))
+        self._rankings: dict[str, list[Node]] = {}
+
+    def objects(self, obj_type: str) -> list[Node]:
+        return self.by_type.get(obj_type.upper(), [])
+
+    def references(self, node: Node) -> list[tuple[str, Node]]:
+        """
+        The (field, object) pairs for each object a node refers to.
+        """
+        return self._references.get(node, [])
+
+    def referenced_by(self, node: Node) -> list[tuple[str, Node]]:
+        """
+        The (field, object) pairs for each object which refers to a node,
+        through the field.
+        """
+        return self._referenced_by.get(node, [])
+
+    def ranked(self, obj_type: str) -> list[Node]:
+        """
+        The objects of a type, the ones the most objects refer to first.
+        """
+        obj_type = obj_type.upper()
+        if obj_type not in self._rankings:
+            self._rankings[obj_type] = sorted(
+                self.objects(obj_type),
+                key=lambda node: -len(
+                    {source for _, source in self.referenced_by(node)}
+                ),
+            )
+        return self._rankings[obj_type]
+
+    def most_referenced(self, obj_type: str) -> Optional[Node]:
+        ranked = self.ranked(obj_type)
+        return ranked[0] if ranked else None
+
+
+class RenderTimer:
+    """
+    Times each render of the app, keeping the most recent timings to report.
+    """
+
+    def __init__(self, history: int = 50):
+        self.timings: deque[float] = deque(maxlen=history)
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append(time.perf_counter() - start)
+
+    @property
+    def last(self) -> float:
+        return self.timings[-1] if self.timings else 0.0
+
+    @property
+    def median(self) -> float:
+        if not self.timings:
+            return 0.0
+        timings = sorted(self.timings)
+        return timings[len(timings) // 2]
+
+    def summary(self) -> str:
+        return (
+            f"Rendered in {self.last * 1000:.1f} ms "
+            f"(median {self.median * 1000:.1f} ms over {len(self.timings)} renders)"
+        )
@@ -0,0 +1,300 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Generic, Iterator, Optional, TypeVar, Union
+
+from .idd import IDD, read_idd_version
+
+if TYPE_CHECKING:
+    from archetypal.idfclass import IDF
+
+DEFAULT_CACHE_DIR = (
+    Path(os.environ.get("AIEP_CACHE_DIR", Path.home() / ".cache" / "aiep")) / "idd"
+)
+# bump when the pickled IDD changes shape, so that stale pickles are rebuilt
+CACHE_FORMAT = 4
+
+
+def hash_file(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the sha256 hex digest of a file without reading it all at once.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _KeyLocks:
+    """
+    A lock per key, so that threads asking for the same missing value wait for
+    one of them to build it instead of all building it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks: dict[str, tuple[threading.Lock, int]] = {}
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        with self._lock:
+            lock, waiting = self._locks.get(key, (None, 0))
+            lock = lock or threading.Lock()
+            self._locks[key] = (lock, waiting + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, waiting = self._locks[key]
+                if waiting == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, waiting - 1)
+
+
+class IDDCache:
+    """
+    A two level cache of parsed IDDs, keyed by EnergyPlus version and the hash
+    of the IDD file they were built from.
+
+    The first level is an in-process LRU, so that every IDF of a given version
+    shares one IDD instance.  The second level is a directory of pickled IDDs;
+    unpickling restores the pydantic models without re-running validation,
+    which is where nearly all of the time in `IDD.from_idf` goes.
+    """
+
+    def __init__(
+        self, cache_dir: Optional[Union[str, Path]] = DEFAULT_CACHE_DIR, maxsize=8
+    ):
+        """
+        Args:
+            cache_dir (Path, optional): The directory to store pickled IDDs in.
+                If None, only the in-process cache is used.
+            maxsize (int): The number of IDDs to keep in memory
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.maxsize = maxsize
+        self._memory: OrderedDict[str, IDD] = OrderedDict()
+        # hashing a ~4MB IDD file is cheap, but not free on every upload
+        self._file_hashes: dict[tuple[str, int, int], str] = {}
+        # the app serves every session from its own thread
+        self._lock = threading.Lock()
+        self._building = _KeyLocks()
+
+    def key(self, version: str, idd_path: Union[str, Path]) -> str:
+        stat = os.stat(idd_path)
+        file_key = (str(Path(idd_path).resolve()), stat.st_mtime_ns, stat.st_size)
+        if file_key not in self._file_hashes:
+            self._file_hashes[file_key] = hash_file(idd_path)
+        return f"{version}-{self._file_hashes[file_key][:16]}-v{CACHE_FORMAT}"
+
+    def get(
+        self, version: str, idd_path: Union[str, Path], build: Callable[[], IDD]
+    ) -> IDD:
+        """
+        Get the IDD for a version and IDD file, building it if it is not cached.
+
+        Args:
+            version (str): The EnergyPlus version, e.g. '9.2.0'
+            idd_path (Path): The IDD file the IDD is built from
+            build (Callable[[], IDD]): Builds the IDD on a cache miss
+
+        Returns:
+            idd (IDD): The cached or freshly built IDD
+        """
+        key = self.key(version, idd_path)
+        with self._building.hold(key):
+            with self._lock:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    return self._memory[key]
+
+            idd = self.load(key)
+            if idd is None:
+                idd = build()
+                self.save(key, idd)
+            self._remember(key, idd)
+            return idd
+
+    def load(self, key: str) -> Optional[IDD]:
+        if self.cache_dir is None:
+            return None
+        path = self.cache_dir / f"{key}.pkl"
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                idd = pickle.load(f)
+        except Exception as e:
+            print(f"WARNING: Could not load cached IDD {path}, rebuilding: {e}")
+            return None
+        return idd if isinstance(idd, IDD) else None
+
+    def save(self, key: str, idd: IDD):
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # warm the lazily built lookup tables so they are stored with the IDD
+        idd.reference_classes
+        idd.index
+        # write to a temp file first so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(idd, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_dir / f"{key}.pkl")
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir is not None and self.cache_dir.exists():
+            for path in self.cache_dir.glob("*.pkl"):
+                path.unlink()
+
+    def _remember(self, key: str, idd: IDD):
+        with self._lock:
+            self._memory[key] = idd
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+
+default_cache = IDDCache()
+
+
+def load_idd(idf: "IDF", cache: Optional[IDDCache] = None) -> IDD:
+    """
+    Get the IDD for an IDF, shared with every other IDF of the same version.
+
+    Args:
+        idf (IDF): The IDF whose IDD should be loaded
+        cache (IDDCache, optional): The cache to use; defaults to a process-wide
+            cache stored in ~/.cache/aiep/idd (or $AIEP_CACHE_DIR/idd)
+
+    Returns:
+        idd (IDD): The IDD for the IDF's EnergyPlus version
+    """
+    cache = default_cache if cache is None else cache
+    version = ".".join(str(v) for v in idf.idd_version)
+    return cache.get(version, idf.iddname, lambda: IDD.from_idd_file(idf.iddname))
+
+
+def load_idd_file(idd_path: Union[str, Path], cache: Optional[IDDCache] = None) -> IDD:
+    """
+    Get the IDD parsed from an Energy+.idd file, without loading any IDF.
+
+    Args:
+        idd_path (Path): The IDD file
+        cache (IDDCache, optional): The cache to use; defaults to a process-wide
+            cache stored in ~/.cache/aiep/idd (or $AIEP_CACHE_DIR/idd)
+
+    Returns:
+        idd (IDD): The IDD described by the file
+    """
+    cache = default_cache if cache is None else cache
+    version = read_idd_version(idd_path) or "unknown"
+    return cache.get(version, idd_path, lambda: IDD.from_idd_file(idd_path))
+
+
+def load_idd_version(version: str, cache: Optional[IDDCache] = None) -> IDD:
+    """
+    Get the IDD for an EnergyPlus version, from the IDD files of the
+    EnergyPlus installations archetypal finds, without loading any IDF.
+
+    Args:
+        version (str): The EnergyPlus version, e.g. '9.2' or '9.2.0'
+        cache (IDDCache, optional): The cache to use; defaults to a process-wide
+            cache stored in ~/.cache/aiep/idd (or $AIEP_CACHE_DIR/idd)
+
+    Returns:
+        idd (IDD): The IDD for the version
+    """
+    from archetypal.eplus_interface.version import EnergyPlusVersion
+
+    cache = default_cache if cache is None else cache
+    try:
+        ep_version = EnergyPlusVersion(version)
+        idd_path = ep_version.current_idd_path
+    except Exception as e:
+        raise ValueError(
+            f"No Energy+.idd was found for EnergyPlus version {version}."
+        ) from e
+    return cache.get(ep_version.dot, idd_path, lambda: IDD.from_idd_file(idd_path))
+
+
+T = TypeVar("T")
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ModelCache(Generic[T]):
+    """
+    An in-process LRU of whatever is built from a model's contents, e.g. its
+    graph, keyed by a hash of the contents rather than by file name or upload,
+    so that the same model loaded twice, or by two users, is built once.
+
+    Callers share the cached values, so they must not modify them.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        """
+        Args:
+            maxsize (int): The number of models to keep in memory
+        """
+        self.maxsize = maxsize
+        self._memory: OrderedDict[str, T] = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = _KeyLocks()
+
+    @staticmethod
+    def key(data: bytes, *parts: str) -> str:
+        """
+        Make the key for a model's contents, and anything else the built value
+        depends on, e.g. the IDD it was resolved with.
+        """
+        return "-".join([hash_bytes(data), *parts])
+
+    def get(self, key: str, build: Callable[[], T]) -> T:
+        """
+        Get the value for a key, building it if it is not cached.
+
+        Args:
+            key (str): The key, as made by `ModelCache.key`
+            build (Callable[[], T]): Builds the value on a cache miss
+
+        Returns:
+            value (T): The cached or freshly built value
+        """
+        with self._building.hold(key):
+            with self._lock:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    return self._memory[key]
+            value = build()
+            with self._lock:
+                self._memory[key] = value
+                while len(self._memory) > self.maxsize:
+                    self._memory.popitem(last=False)
+            return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
@@ -0,0 +1,271 @@
+"""
+Render the neighbourhood of an object in a model as compact text for an LLM
+agent, within a budget of tokens.
+
+A neighbourhood is found by walking references out from an object, nearest
+objects first, optionally only in one direction or only through objects of
+some types or IDD groups.  Each object is rendered on its own, as one of:
+
+- "idf": compact IDF text, one object per line, with trailing blank fields
+  dropped, e.g. `Zone,Core ZN,0,0,0,0;`
+- "json": one JSON object per object, with its type, name and non-blank
+  fields
+- "summary": the object's type and name and the objects it refers to,
+  e.g. `PEOPLE 'Core People': Zone_or_ZoneList_Name -> ZONE 'Core ZN'`
+
+Rendered objects are memoized, so repeated requests over the same model only
+pay for walking the graph and packing the budget.
+"""
+
+import json
+from collections import Counter, deque
+from math import ceil
+from typing import Callable, Iterable, Literal, Optional, Union
+
+import networkx as nx
+from pydantic import BaseModel
+
+from .browser import ModelIndex
+from .idd import IDD
+from .store import Node
+
+Format = Literal["idf", "json", "summary"]
+Direction = Literal["both", "references", "referenced_by"]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text, at about four characters each,
+    which is close for the English and numbers of IDF files.
+    """
+    return ceil(len(text) / 4)
+
+
+class RenderedContext(BaseModel):
+    text: str
+    n_tokens: int
+    # the objects rendered, and how many references away each one is
+    nodes: list[tuple[Node, int]]
+    # the number of objects in the neighbourhood left out to stay in budget
+    n_omitted: int = 0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class ContextRenderer:
+    """
+    Renders neighbourhoods of the objects of one model.
+    """
+
+    def __init__(
+        self,
+        graph: Union[nx.MultiDiGraph, ModelIndex],
+        idd: Optional[IDD] = None,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        """
+        Args:
+            graph (Union[nx.MultiDiGraph, ModelIndex]): The graph made by
+                `create_graph`, or the `ModelIndex` of one
+            idd (IDD, optional): The model's IDD, to filter by group with
+            count_tokens (Callable[[str], int]): Counts the tokens in a text,
+                e.g. with the agent's own tokenizer
+        """
+        self.model = graph if isinstance(graph, ModelIndex) else ModelIndex(graph)
+        self.idd = idd
+        self.count_tokens = count_tokens
+        self._fragments: dict[tuple[Node, Format], tuple[str, int]] = {}
+
+    def neighbourhood(
+        self,
+        node: Node,
+        hops: int = 1,
+        direction: Direction = "both",
+        types: Optional[Iterable[str]] = None,
+        groups: Optional[Iterable[str]] = None,
+    ) -> list[tuple[Node, int]]:
+        """
+        Find the objects within some number of references of an object.
+
+        Args:
+            node (Node): The object at the centre
+            hops (int): How many references away to look
+            direction (Direction): Whether to follow the references the
+                objects make, the references made to them, or both
+            types (Iterable[str], optional): Only include and walk through
+                objects of these types
+            groups (Iterable[str], optional): Only include and walk through
+                objects of types in these IDD groups; needs an IDD
+
+        Returns:
+            nodes (list[tuple[Node, int]]): Each object, with how many
+                references away it is, nearest first, starting with `node`
+        """
+        allowed_types = {t.upper() for t in types} if types is not None else None
+        allowed_groups = set(groups) if groups is not None else None
+        if allowed_groups is not None and self.idd is None:
+            raise ValueError("Filtering by group needs the model's IDD.")
+
+        def allowed(other: Node) -> bool:
+            obj_type = other.type.upper()
+            if allowed_types is not None and obj_type not in allowed_types:
+                return False
+            if allowed_groups is not None:
+                index = self.idd.index
+                return (
+                    obj_type in index.type_ids
+                    and index.group_of(obj_type) in allowed_groups
+                )
+            return True
+
+        found = {node: 0}
+        queue = deque([node])
+        while queue:
+            current = queue.popleft()
+            distance = found[current]
+            if distance == hops:
+                continue
+            neighbours = []
+            if direction in ("both", "references"):
+                neighbours += self.model.references(current)
+            if direction in ("both", "referenced_by"):
+                neighbours += self.model.referenced_by(current)
+            for _, other in neighbours:
+                if other not in found and allowed(other):
+                    found[other] = distance + 1
+                    queue.append(other)
+        return list(found.items())
+
+    def fragment(self, node: Node, format: Format = "idf") -> tuple[str, int]:
+        """
+        Render one object, memoized.
+
+        Returns:
+            text (str): The rendered object
+            n_tokens (int): The number of tokens in the text
+        """
+        key = (node, format)
+        if key not in self._fragments:
+            text = getattr(self, f"_render_{format}")(node)
+            self._fragments[key] = (text, self.count_tokens(text))
+        return self._fragments[key]
+
+    @staticmethod
+    def _values(node: Node) -> list[str]:
+        values = [str(value) for value in node.object.fieldvalues]
+        while len(values) > 1 and values[-1] == "":
+            values.pop()
+        return values
+
+    def _render_idf(self, node: Node) -> str:
+        values = self._values(node)
+        return ",".join(values) + ";"
+
+    def _render_json(self, node: Node) -> str:
+        obj = node.object
+        return json.dumps(
+            {
+                "type": node.type,
+                "name": node.name,
+                "fields": {
+                    field: str(value)
+                    for field, value in zip(obj.fieldnames[1:], obj.fieldvalues[1:])
+                    if str(value) != "" and field != "Name"
+                },
+            },
+            separators=(",", ":"),
+        )
+
+    def _render_summary(self, node: Node) -> str:
+        references = "; ".join(
+            f"{field} -> {target.type} '{target.name}'"
+            for field, target in self.model.references(node)
+        )
+        line = f"{node.type} '{node.name}'"
+        return f"{line}: {references}" if references else line
+
+    def render(
+        self,
+        node: Node,
+        hops: int = 1,
+        format: Format = "idf",
+        budget: int = 2_000,
+        direction: Direction = "both",
+        types: Optional[Iterable[str]] = None,
+        groups: Optional[Iterable[str]] = None,
+    ) -> RenderedContext:
+        """
+        Render the neighbourhood of an object within a budget of tokens.
+
+        The object itself is always rendered.  Then the rest of the
+        neighbourhood is added nearest first, skipping any object which
+        would go over the budget, and a last line counts the objects of each
+        type which were left out.
+
+        Args:
+            node (Node): The object at the centre
+            hops (int): How many references away to look
+            format (Format): How to render each object
+            budget (int): The most tokens to use, as counted by `count_tokens`
+            direction (Direction): As for `neighbourhood`
+            types (Iterable[str], optional): As for `neighbourhood`
+            groups (Iterable[str], optional): As for `neighbourhood`
+
+        Returns:
+            context (RenderedContext): The text and what went into it
+        """
+        neighbourhood = self.neighbourhood(node, hops, direction, types, groups)
+        lines: list[str] = []
+        included: list[tuple[Node, int]] = []
+        omitted: Counter = Counter()
+        # each fragment also costs the newline joining it to the others
+        n_tokens = 0
+        for other, distance in neighbourhood:
+            text, cost = self.fragment(other, format)
+            if included and n_tokens + cost + 1 > budget:
+                omitted[other.type] += 1
+                continue
+            lines.append(text)
+            included.append((other, distance))
+            n_tokens += cost + 1
+        if omitted:
+            note = self._omitted_note(omitted, format)
+            note_cost = self.count_tokens(note) + 1
+            # make room for the note by dropping the farthest objects
+            while n_tokens + note_cost > budget and len(included) > 1:
+                other, _ = included.pop()
+                n_tokens -= self.fragment(other, format)[1] + 1
+                lines.pop()
+                omitted[other.type] += 1
+                note = self._omitted_note(omitted, format)
+                note_cost = self.count_tokens(note) + 1
+            lines.append(note)
+            n_tokens += note_cost
+        text = "\n".join(lines)
+        return RenderedContext(
+            text=text,
+            n_tokens=self.count_tokens(text),
+            nodes=included,
+            n_omitted=sum(omitted.values()),
+        )
+
+    @staticmethod
+    def _omitted_note(omitted: Counter, format: Format) -> str:
+        counts = ", ".join(f"{n} {obj_type}" for obj_type, n in omitted.most_common())
+        if format == "json":
+            return json.dumps({"omitted": dict(omitted)}, separators=(",", ":"))
+        if format == "idf":
+            return f"! omitted to fit: {counts}"
+        return f"... omitted to fit: {counts}"
+
+    def invalidate(self, node: Optional[Node] = None):
+        """
+        Forget the rendered text of an object which has changed, or of every
+        object.
+        """
+        if node is None:
+            self._fragments.clear()
+        else:
+            for format in ("idf", "json", "summary"):
+                self._fragments.pop((node, format), None)
@@ -0,0 +1,534 @@
+"""
+Store a corpus of graphed IDFs as Parquet datasets, to query without reparsing.
+
+Usage (from the repository root), on the output of `aiep.batch`:
+
+    python -m aiep.corpus graphs --out corpus --idd path/to/Energy+.idd
+
+The corpus directory holds three Hive-partitioned datasets:
+
+    objects/version=9.2/type=MATERIAL/part-*.parquet
+    edges/version=9.2/part-*.parquet
+    models/part-*.parquet
+
+Each object type gets a table whose columns are typed from its fields in the
+IDD: numeric fields are float64 (with a boolean `<field>_auto` column beside
+any autosizable one), choices are dictionary-encoded strings and the rest are
+strings, and each field's IDD type and units are kept in the column metadata.
+The repeating group of an extensible object, e.g. a surface's vertices, is
+stored as one list column per field of the group.  Every row also has the
+`model` it came from, its `node` id in that model's graph and its `name`.
+
+Edges have the `model`, the `source` and `target` node ids, the types and
+names of both ends, and the referring `field`, from the referring object to
+the referenced one, as in a `GraphStore`.
+
+Reading goes through `CorpusStore`, which memory-maps the files and pushes
+column selections and filters down to the Parquet reader, e.g. every
+material's conductivity across the corpus:
+
+    CorpusStore("corpus").objects("MATERIAL", columns=["model", "Conductivity"])
+"""
+
+import argparse
+import pickle
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, Optional, Union
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+from tqdm.autonotebook import tqdm
+
+from .batch import index_idds, iter_manifest, short_version
+from .cache import load_idd_file
+from .idd import IDD, IDDField, IDDObjectSchema, _is_numeric
+from .store import GraphStore
+
+AUTO_WORDS = ("autosize", "autocalculate")
+
+
+def _field_metadata(field: IDDField) -> dict[str, str]:
+    return {
+        "idd_field": field.name,
+        "idd_type": field.type or "",
+        "units": field.units or "",
+    }
+
+
+def _numbers(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a column of field values to floats, with NaN for blanks and
+    anything else which isn't a number.
+
+    Returns:
+        numbers (np.ndarray): The values as float64
+        auto (np.ndarray): Which values were 'autosize' or 'autocalculate'
+    """
+    strings = np.array(values, dtype=str)
+    blank = strings == ""
+    try:
+        # nearly every column is all numbers and blanks
+        return (
+            np.where(blank, "nan", strings).astype(np.float64),
+            np.zeros(len(values), dtype=bool),
+        )
+    except ValueError:
+        pass
+    auto = np.isin(np.char.lower(strings), AUTO_WORDS)
+    numbers = np.full(len(values), np.nan)
+    for i in np.flatnonzero(~(blank | auto)):
+        try:
+            numbers[i] = float(strings[i])
+        except ValueError:
+            pass
+    return numbers, auto
+
+
+def _strip_group_number(name: str) -> str:
+    # the first field of a repeating group is numbered, e.g. 'Vertex_1_Xcoordinate'
+    # or 'Field_1', but its column holds the field of every group
+    return re.sub(r"_1(?=_|$)", "", name, count=1)
+
+
+class _TypeLayout:
+    """
+    The columns of one object type's table, and how to fill them from the
+    field values of its objects.
+    """
+
+    def __init__(self, schema: IDDObjectSchema):
+        fields = list(schema)
+        begin = next(
+            (i for i, field in enumerate(fields) if field.begin_extensible), None
+        )
+        size = schema.header.extensible
+        if begin is None or size is None:
+            begin, size = len(fields), 0
+        self.begin = begin
+        self.size = size
+        self.has_name = bool(fields) and fields[0].name == "Name"
+
+        taken = {"model", "node", "name"}
+
+        def column_name(name: str) -> str:
+            while name in taken:
+                name += "_"
+            taken.add(name)
+            return name
+
+        # (position among the field values, column name, field)
+        self.fixed = [
+            (i, column_name(field.bunch_name), field)
+            for i, field in enumerate(fields[:begin])
+            if not (i == 0 and self.has_name)
+        ]
+        self.repeated = [
+            (j, column_name(_strip_group_number(field.bunch_name)), field)
+            for j, field in enumerate(fields[begin : begin + size])
+        ]
+
+        columns = [
+            pa.field("model", pa.dictionary(pa.int32(), pa.string())),
+            pa.field("node", pa.int32()),
+            pa.field("name", pa.string()),
+        ]
+        for _, name, field in self.fixed:
+            columns += self._fields(name, field, list_of=False)
+        for _, name, field in self.repeated:
+            columns += self._fields(name, field, list_of=True)
+        self.schema = pa.schema(columns)
+
+    @staticmethod
+    def _fields(name: str, field: IDDField, list_of: bool) -> list[pa.Field]:
+        if _is_numeric(field):
+            value_type = pa.float64()
+        elif field.type == "choice":
+            value_type = pa.dictionary(pa.int32(), pa.string())
+        else:
+            value_type = pa.string()
+        if list_of:
+            value_type = pa.list_(value_type)
+        fields = [pa.field(name, value_type, metadata=_field_metadata(field))]
+        if _is_numeric(field) and (field.autosizable or field.autocalculatable):
+            auto_type = pa.list_(pa.bool_()) if list_of else pa.bool_()
+            fields.append(pa.field(f"{name}_auto", auto_type))
+        return fields
+
+    @staticmethod
+    def _arrays(field: IDDField, values: list[str]) -> list[pa.Array]:
+        if _is_numeric(field):
+            numbers, auto = _numbers(values)
+            arrays = [pa.array(numbers, from_pandas=True)]
+            if field.autosizable or field.autocalculatable:
+                arrays.append(pa.array(auto))
+            return arrays
+        array = pa.array(
+            [value if value != "" else None for value in values], pa.string()
+        )
+        return [array.dictionary_encode() if field.type == "choice" else array]
+
+    def table(
+        self,
+        models: list[str],
+        nodes: list[int],
+        names: list[str],
+        rows: list[list[str]],
+    ) -> pa.Table:
+        """
+        Make a table of objects from their field values, not counting the key.
+        """
+        arrays: list[pa.Array] = [
+            pa.array(models, pa.string()).dictionary_encode(),
+            pa.array(nodes, pa.int32()),
+            pa.array(names, pa.string()),
+        ]
+        for position, _, field in self.fixed:
+            arrays += self._arrays(
+                field, [row[position] if position < len(row) else "" for row in rows]
+            )
+        if self.repeated:
+            # every row has the same number of values for each field of the
+            # group, so the lists of a row line up, e.g. as vertices
+            offsets = [0]
+            groups: list[list[str]] = []
+            for row in rows:
+                extra = row[self.begin :]
+                n_groups = -(-len(extra) // self.size)
+                extra = extra + [""] * (n_groups * self.size - len(extra))
+                groups.append(extra)
+                offsets.append(offsets[-1] + n_groups)
+            offsets_array = pa.array(offsets, pa.int32())
+            for j, _, field in self.repeated:
+                values = [value for extra in groups for value in extra[j :: self.size]]
+                arrays += [
+                    pa.ListArray.from_arrays(offsets_array, array)
+                    for array in self._arrays(field, values)
+                ]
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+
+class _TypeBuffer:
+    def __init__(self):
+        self.models: list[str] = []
+        self.nodes: list[int] = []
+        self.names: list[str] = []
+        self.rows: list[list[str]] = []
+
+
+EDGE_SCHEMA = pa.schema(
+    [
+        pa.field("model", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("source", pa.int32()),
+        pa.field("target", pa.int32()),
+        pa.field("source_type", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("source_name", pa.string()),
+        pa.field("target_type", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("target_name", pa.string()),
+        pa.field("field", pa.dictionary(pa.int32(), pa.string())),
+    ]
+)
+
+MODEL_SCHEMA = pa.schema(
+    [
+        pa.field("model", pa.string()),
+        pa.field("version", pa.string()),
+        pa.field("n_nodes", pa.int64()),
+        pa.field("n_edges", pa.int64()),
+    ]
+)
+
+
+class CorpusWriter:
+    """
+    Writes graphs to a corpus directory.
+
+    Rows from many models are buffered per object type and written together
+    once `flush_rows` of them have been buffered, so the corpus is made of a
+    few large files rather than one per model and type.  Each flush writes
+    new files, so a corpus can be added to by later runs.
+    """
+
+    def __init__(self, root: Union[str, Path], flush_rows: int = 500_000):
+        """
+        Args:
+            root (Path): The corpus directory
+            flush_rows (int): The number of buffered objects and edges to
+                write at once
+        """
+        self.root = Path(root)
+        self.flush_rows = flush_rows
+        self._layouts: dict[tuple[str, str], _TypeLayout] = {}
+        self._objects: dict[tuple[str, str], _TypeBuffer] = {}
+        self._edges: dict[str, dict[str, list]] = {}
+        self._models: dict[str, list] = {name: [] for name in MODEL_SCHEMA.names}
+        self._buffered = 0
+
+    def add(self, store: GraphStore, model: str, version: str, idd: IDD):
+        """
+        Add a model's graph to the corpus.
+
+        Args:
+            store (GraphStore): The graph, e.g. from `build_graph_store`
+            model (str): The model the graph was built from, e.g. its path
+            version (str): The model's EnergyPlus version
+            idd (IDD): The IDD of that version
+        """
+        version = short_version(version)
+        for node_id, type_id, _, fieldvalues in store.iter_fields():
+            obj_type = store.types[type_id].upper()
+            key = (version, obj_type)
+            if key not in self._objects:
+                if obj_type not in idd.schemas:
+                    # the validator reports these; there are no fields to type
+                    continue
+                if key not in self._layouts:
+                    self._layouts[key] = _TypeLayout(idd.schemas[obj_type])
+                self._objects[key] = _TypeBuffer()
+            buffer = self._objects[key]
+            buffer.models.append(model)
+            buffer.nodes.append(node_id)
+            buffer.names.append(store.names[node_id])
+            buffer.rows.append(fieldvalues[1:])
+
+        edges = self._edges.setdefault(
+            version, {name: [] for name in EDGE_SCHEMA.names}
+        )
+        types = [store.types[type_id].upper() for type_id in store.node_types]
+        edges["model"] += [model] * store.n_edges
+        edges["source"] += store.edge_sources.tolist()
+        edges["target"] += store.edge_targets.tolist()
+        edges["source_type"] += [types[i] for i in store.edge_sources]
+        edges["source_name"] += [store.names[i] for i in store.edge_sources]
+        edges["target_type"] += [types[i] for i in store.edge_targets]
+        edges["target_name"] += [store.names[i] for i in store.edge_targets]
+        edges["field"] += [store.fields[i] for i in store.edge_fields]
+
+        for column, value in zip(
+            MODEL_SCHEMA.names, (model, version, store.n_nodes, store.n_edges)
+        ):
+            self._models[column].append(value)
+
+        self._buffered += store.n_nodes + store.n_edges
+        if self._buffered >= self.flush_rows:
+            self.flush()
+
+    def _write(self, directory: Path, table: pa.Table):
+        directory.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, directory / f"part-{uuid.uuid4().hex}.parquet")
+
+    def flush(self):
+        """
+        Write everything buffered so far.
+        """
+        for (version, obj_type), buffer in self._objects.items():
+            self._write(
+                self.root
+                / "objects"
+                / f"version={version}"
+                / f"type={quote(obj_type, safe='')}",
+                self._layouts[version, obj_type].table(
+                    buffer.models, buffer.nodes, buffer.names, buffer.rows
+                ),
+            )
+        for version, columns in self._edges.items():
+            self._write(
+                self.root / "edges" / f"version={version}",
+                pa.Table.from_pydict(columns, schema=EDGE_SCHEMA),
+            )
+        if self._models["model"]:
+            self._write(
+                self.root / "models",
+                pa.Table.from_pydict(self._models, schema=MODEL_SCHEMA),
+            )
+        self._objects = {}
+        self._edges = {}
+        self._models = {name: [] for name in MODEL_SCHEMA.names}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+
+
+class CorpusStore:
+    """
+    Reads a corpus directory written by `CorpusWriter`.
+
+    Files are memory-mapped, and only the columns asked for are read, from
+    only the row groups which can match the filter, so a question about one
+    field of one type across thousands of models reads little more than that
+    field's column.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.filesystem = fs.LocalFileSystem(use_mmap=True)
+
+    def _dataset(self, directory: Path) -> ds.Dataset:
+        return ds.dataset(str(directory), format="parquet", filesystem=self.filesystem)
+
+    def versions(self) -> list[str]:
+        return sorted(
+            path.name.split("=", 1)[1]
+            for path in (self.root / "objects").glob("version=*")
+        )
+
+    def types(self, version: Optional[str] = None) -> list[str]:
+        """
+        The object types in the corpus, upper-cased as in the IDD.
+        """
+        pattern = f"version={short_version(version) if version else '*'}/type=*"
+        return sorted(
+            {
+                unquote(path.name.split("=", 1)[1])
+                for path in (self.root / "objects").glob(pattern)
+            }
+        )
+
+    def _read(
+        self,
+        directories: list[tuple[str, Path]],
+        columns: Optional[list[str]],
+        filter: Optional[ds.Expression],
+    ) -> pa.Table:
+        tables = []
+        for version, directory in directories:
+            table = self._dataset(directory).to_table(columns=columns, filter=filter)
+            tables.append(
+                table.append_column(
+                    "version", pa.array([version] * table.num_rows, pa.string())
+                )
+            )
+        return pa.concat_tables(tables, promote_options="permissive")
+
+    def objects(
+        self,
+        obj_type: str,
+        columns: Optional[list[str]] = None,
+        filter: Optional[ds.Expression] = None,
+        version: Optional[str] = None,
+    ) -> pa.Table:
+        """
+        Read the objects of a type from every model in the corpus.
+
+        Args:
+            obj_type (str): The object type, in any case
+            columns (list[str], optional): The columns to read; defaults to all
+            filter (ds.Expression, optional): Which rows to read, e.g.
+                `ds.field("Conductivity") < 0.1`
+            version (str, optional): Only read models of this EnergyPlus
+                version; defaults to all of them
+
+        Returns:
+            table (pa.Table): The objects, with a `version` column added
+        """
+        pattern = f"version={short_version(version) if version else '*'}"
+        directories = [
+            (path.parent.name.split("=", 1)[1], path)
+            for path in sorted((self.root / "objects").glob(pattern))
+            for path in [path / f"type={quote(obj_type.upper(), safe='')}"]
+            if path.is_dir()
+        ]
+        if not directories:
+            raise ValueError(f"There are no '{obj_type}' objects in this corpus.")
+        return self._read(directories, columns, filter)
+
+    def edges(
+        self,
+        columns: Optional[list[str]] = None,
+        filter: Optional[ds.Expression] = None,
+        version: Optional[str] = None,
+    ) -> pa.Table:
+        """
+        Read the edges of every model in the corpus, with the same arguments
+        as `objects`.
+        """
+        pattern = f"version={short_version(version) if version else '*'}"
+        directories = [
+            (path.name.split("=", 1)[1], path)
+            for path in sorted((self.root / "edges").glob(pattern))
+        ]
+        if not directories:
+            raise ValueError("There are no edges in this corpus.")
+        return self._read(directories, columns, filter)
+
+    def models(self) -> pa.Table:
+        return self._dataset(self.root / "models").to_table()
+
+
+def ingest_corpus(
+    output_dir: Union[str, Path],
+    root: Union[str, Path],
+    idd_paths: Iterable[Union[str, Path]],
+    flush_rows: int = 500_000,
+    progress: bool = True,
+) -> tuple[int, int]:
+    """
+    Add every graph `aiep.batch` wrote to a directory to a corpus.  Graphs of
+    EnergyPlus versions without an IDD are skipped, since their fields can't
+    be typed.
+
+    Args:
+        output_dir (Path): The directory holding the graphs and manifest
+        root (Path): The corpus directory
+        idd_paths (Iterable[Path]): An IDD file for each EnergyPlus version
+            in the corpus
+        flush_rows (int): The number of buffered objects and edges to write
+            at once
+        progress (bool): Whether to show a progress bar
+
+    Returns:
+        n_models (int): The number of models added
+        n_skipped (int): The number of models skipped for want of an IDD
+    """
+    idds = index_idds(idd_paths)
+    results = [result for result in iter_manifest(output_dir) if result.ok]
+    writer = CorpusWriter(root, flush_rows)
+    n_models = n_skipped = 0
+    try:
+        for result in tqdm(results, disable=not progress):
+            idd_path = idds.get(short_version(result.version or ""))
+            if idd_path is None:
+                n_skipped += 1
+                continue
+            with open(result.output, "rb") as f:
+                store: GraphStore = pickle.load(f)
+            writer.add(store, result.path, result.version, load_idd_file(idd_path))
+            n_models += 1
+    finally:
+        writer.close()
+    return n_models, n_skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("graphs", help="The output directory of aiep.batch")
+    parser.add_argument("--out", required=True, help="The corpus directory")
+    parser.add_argument(
+        "--idd",
+        nargs="+",
+        required=True,
+        help="An Energy+.idd for each EnergyPlus version in the corpus",
+    )
+    parser.add_argument("--flush-rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    n_models, n_skipped = ingest_corpus(
+        args.graphs, args.out, args.idd, flush_rows=args.flush_rows
+    )
+    print(
+        f"Added {n_models} models to {args.out} in "
+        f"{time.perf_counter() - start:.1f}s"
+        + (f" ({n_skipped} skipped without an IDD)" if n_skipped else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
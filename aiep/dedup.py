@@ -0,0 +1,372 @@
+"""
+Find the objects which models of a corpus share, by hashing their content.
+
+Usage (from the repository root), on the output of `aiep.batch`:
+
+    python -m aiep.dedup graphs --db shared.db
+
+An object's hash covers its type and its normalized field values, with each
+reference replaced by the hash of the object it refers to, so it identifies
+the object together with everything it depends on: two models' "Exterior
+Wall" constructions hash the same if their layers are the same materials,
+whatever the materials are called.  Object names are left out of the hash,
+since they are labels rather than content.
+
+`SharedObjectStore` keeps each distinct object once, however many models it
+appears in, together with a row per occurrence recording the model and the
+name the object has there, so "which models use this construction" is an
+index lookup.
+"""
+
+import argparse
+import hashlib
+import json
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from tqdm.autonotebook import tqdm
+
+from .batch import iter_manifest
+from .idd import strongly_connected
+from .parser import normalize_value
+from .store import GraphStore
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def canonical_fields(
+    store: GraphStore, node_id: int, references: dict[str, list[str]]
+) -> list:
+    """
+    The content of an object which is hashed and stored: its normalized field
+    values after the name, with trailing blanks dropped, and each reference
+    replaced by `{"ref": <hashes of the referenced objects>}`.
+
+    Args:
+        store (GraphStore): The graph the object is in
+        node_id (int): The object's node
+        references (dict[str, list[str]]): The hashes of the objects each of
+            the object's fields refers to
+    """
+    fields = []
+    for fieldname, value in zip(
+        store.fieldnames(node_id)[1:], store.fieldvalues(node_id)[1:]
+    ):
+        if fieldname == "Name":
+            continue
+        if fieldname in references:
+            fields.append({"ref": sorted(references[fieldname])})
+        else:
+            fields.append(normalize_value(str(value)))
+    while fields and fields[-1] == "":
+        fields.pop()
+    return fields
+
+
+def _outgoing(store: GraphStore) -> list[list[tuple[str, int]]]:
+    """
+    For each node, the (field, node) pairs of the objects it refers to.
+    """
+    outgoing: list[list[tuple[str, int]]] = [[] for _ in range(store.n_nodes)]
+    for source, target, field_id in zip(
+        store.edge_sources, store.edge_targets, store.edge_fields
+    ):
+        outgoing[source].append((store.fields[field_id], target))
+    return outgoing
+
+
+def object_hashes(
+    store: GraphStore, outgoing: Optional[list[list[tuple[str, int]]]] = None
+) -> list[str]:
+    """
+    Hash every object of a graph, referenced objects before the objects which
+    refer to them.
+
+    Objects which refer to each other in a cycle, or an object which refers
+    to itself, are hashed together: each is first hashed with the references
+    within the cycle standing in as the referenced object's type, then the
+    cycle's hash, made from all of those, is mixed into each of its objects'
+    hashes.
+
+    Args:
+        store (GraphStore): The graph, e.g. from `build_graph_store`
+        outgoing (list, optional): The references of each node, if they have
+            already been gathered
+
+    Returns:
+        hashes (list[str]): Each node's hash, by node id
+    """
+    if outgoing is None:
+        outgoing = _outgoing(store)
+    adjacency = [tuple(target for _, target in edges) for edges in outgoing]
+
+    hashes: list[Optional[str]] = [None] * store.n_nodes
+    for component in strongly_connected(adjacency):
+        # a single object referring to itself is a cycle too
+        is_cycle = len(component) > 1 or component[0] in adjacency[component[0]]
+        members = set(component) if is_cycle else ()
+        local = {}
+        for node_id in component:
+            references: dict[str, list[str]] = {}
+            for field, target in outgoing[node_id]:
+                references.setdefault(field, []).append(
+                    f"cycle:{store.node_type(target).upper()}"
+                    if target in members
+                    else hashes[target]
+                )
+            local[node_id] = _digest(
+                store.node_type(node_id).upper(),
+                json.dumps(canonical_fields(store, node_id, references)),
+            )
+        if members:
+            cycle = _digest(*sorted(local.values()))
+            for node_id in component:
+                hashes[node_id] = _digest(local[node_id], cycle)
+        else:
+            hashes[component[0]] = local[component[0]]
+    return hashes
+
+
+class SharedObjectStore:
+    """
+    A SQLite file holding each distinct object of a corpus once, and where
+    each one occurs.
+
+    `objects` has a row per hash, with the object's type and canonical
+    fields, and `models` a row per model; `occurrences` has a row per object
+    per model, with its node id and name there, referring to both by their
+    integer ids so that the rows repeated for every model stay small.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                id INTEGER PRIMARY KEY,
+                hash TEXT UNIQUE,
+                type TEXT,
+                fields TEXT
+            );
+            CREATE TABLE IF NOT EXISTS models (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS occurrences (
+                model INTEGER,
+                node INTEGER,
+                name TEXT,
+                object INTEGER,
+                PRIMARY KEY (model, node)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS occurrences_object
+                ON occurrences (object, model);
+            CREATE INDEX IF NOT EXISTS objects_type ON objects (type);
+            """)
+
+    def add(self, store: GraphStore, model: str) -> int:
+        """
+        Add a model's objects, storing those not already in the store.  Adding
+        a model again replaces its occurrences.
+
+        Args:
+            store (GraphStore): The model's graph
+            model (str): The model the graph was built from, e.g. its path
+
+        Returns:
+            n_new (int): The number of objects which were not yet stored
+        """
+        outgoing = _outgoing(store)
+        hashes = object_hashes(store, outgoing)
+        ids = self._ids(hashes)
+        new: dict[str, tuple[str, str, str]] = {}
+        for node_id, digest in enumerate(hashes):
+            if digest in ids or digest in new:
+                continue
+            references: dict[str, list[str]] = {}
+            for field, target in outgoing[node_id]:
+                references.setdefault(field, []).append(hashes[target])
+            new[digest] = (
+                digest,
+                store.node_type(node_id).upper(),
+                json.dumps(canonical_fields(store, node_id, references)),
+            )
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO objects (hash, type, fields) VALUES (?, ?, ?)",
+                new.values(),
+            )
+            ids.update(self._ids(new))
+            self.connection.execute(
+                "INSERT OR IGNORE INTO models (path) VALUES (?)", (model,)
+            )
+            model_id = self._model_id(model)
+            self.connection.execute(
+                "DELETE FROM occurrences WHERE model = ?", (model_id,)
+            )
+            self.connection.executemany(
+                "INSERT INTO occurrences VALUES (?, ?, ?, ?)",
+                (
+                    (model_id, node_id, name, ids[digest])
+                    for node_id, (name, digest) in enumerate(zip(store.names, hashes))
+                ),
+            )
+        return len(new)
+
+    def _ids(self, hashes: Iterable[str]) -> dict[str, int]:
+        """
+        The ids of those of some hashes which are already stored.
+        """
+        hashes = list(set(hashes))
+        ids: dict[str, int] = {}
+        # stay under SQLite's limit on the number of query parameters
+        for i in range(0, len(hashes), 900):
+            chunk = hashes[i : i + 900]
+            ids.update(
+                self.connection.execute(
+                    f"SELECT hash, id FROM objects "
+                    f"WHERE hash IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        return ids
+
+    def _model_id(self, model: str) -> Optional[int]:
+        row = self.connection.execute(
+            "SELECT id FROM models WHERE path = ?", (model,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def __contains__(self, digest: str) -> bool:
+        return bool(self._ids([digest]))
+
+    def get(self, digest: str) -> tuple[str, list]:
+        """
+        The type and canonical fields of a stored object.
+        """
+        row = self.connection.execute(
+            "SELECT type, fields FROM objects WHERE hash = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"There is no object with the hash '{digest}'.")
+        return row[0], json.loads(row[1])
+
+    def hash_of(self, model: str, name: str, obj_type: str) -> Optional[str]:
+        """
+        The hash of a model's object, found by its type and name.
+        """
+        row = self.connection.execute(
+            "SELECT objects.hash FROM occurrences "
+            "JOIN objects ON occurrences.object = objects.id "
+            "WHERE occurrences.model = ? AND UPPER(occurrences.name) = ? "
+            "AND objects.type = ?",
+            (self._model_id(model), name.upper(), obj_type.upper()),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def models_with(self, digest: str) -> list[tuple[str, str]]:
+        """
+        The (model, name) of every occurrence of an object.
+        """
+        return self.connection.execute(
+            "SELECT models.path, occurrences.name FROM objects "
+            "JOIN occurrences ON occurrences.object = objects.id "
+            "JOIN models ON occurrences.model = models.id "
+            "WHERE objects.hash = ? ORDER BY models.path, occurrences.node",
+            (digest,),
+        ).fetchall()
+
+    def shared(
+        self, obj_type: Optional[str] = None, min_models: int = 2
+    ) -> list[tuple[str, int]]:
+        """
+        The objects which occur in at least `min_models` models, with the
+        number of models each occurs in, the most shared first.
+        """
+        query = (
+            "SELECT objects.hash, COUNT(DISTINCT occurrences.model) AS n "
+            "FROM occurrences JOIN objects ON occurrences.object = objects.id "
+        )
+        parameters: list = []
+        if obj_type is not None:
+            query += "WHERE objects.type = ? "
+            parameters.append(obj_type.upper())
+        query += "GROUP BY occurrences.object HAVING n >= ? ORDER BY n DESC"
+        parameters.append(min_models)
+        return self.connection.execute(query, parameters).fetchall()
+
+    def counts(self) -> tuple[int, int]:
+        """
+        Returns:
+            n_occurrences (int): The number of objects across all models
+            n_distinct (int): The number of distinct objects stored
+        """
+        (n_occurrences,) = self.connection.execute(
+            "SELECT COUNT(*) FROM occurrences"
+        ).fetchone()
+        (n_distinct,) = self.connection.execute(
+            "SELECT COUNT(*) FROM objects"
+        ).fetchone()
+        return n_occurrences, n_distinct
+
+    def close(self):
+        self.connection.close()
+
+
+def add_corpus(
+    output_dir: Union[str, Path], shared: SharedObjectStore, progress: bool = True
+) -> tuple[int, int]:
+    """
+    Add every graph `aiep.batch` wrote to a directory to a store.
+
+    Returns:
+        n_models (int): The number of models added
+        n_new (int): The number of objects which were not yet stored
+    """
+    results = [result for result in iter_manifest(output_dir) if result.ok]
+    n_new = 0
+    for result in tqdm(results, disable=not progress):
+        with open(result.output, "rb") as f:
+            store: GraphStore = pickle.load(f)
+        n_new += shared.add(store, result.path)
+    return len(results), n_new
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("graphs", help="The output directory of aiep.batch")
+    parser.add_argument("--db", required=True, help="The SQLite file to store into")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="How many of the most shared objects to list",
+    )
+    args = parser.parse_args()
+
+    shared = SharedObjectStore(args.db)
+    try:
+        start = time.perf_counter()
+        n_models, n_new = add_corpus(args.graphs, shared)
+        n_occurrences, n_distinct = shared.counts()
+        print(
+            f"Added {n_models} models ({n_new} new objects) in "
+            f"{time.perf_counter() - start:.1f}s; {n_occurrences} objects are "
+            f"{n_distinct} distinct ones"
+        )
+        for digest, n in shared.shared()[: args.top]:
+            obj_type, _ = shared.get(digest)
+            name = shared.models_with(digest)[0][1]
+            print(f"{n:>8} models  {obj_type} '{name}'  {digest}")
+    finally:
+        shared.close()
+
+
+if __name__ == "__main__":
+    main()
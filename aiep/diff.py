@@ -0,0 +1,501 @@
+"""
+Compare and merge IDF models structurally, object by object.
+
+Usage (from the repository root):
+
+    python -m aiep.diff old.idf new.idf --idd path/to/Energy+.idd
+    python -m aiep.diff ours.idf theirs.idf --base base.idf --output merged.idf
+
+Objects are matched between models by their type and name, both compared
+case-insensitively as EnergyPlus does, rather than by their place in the
+file, so reordering objects or reformatting the file is not a change.  Each
+object's raw field values are hashed once, and only the matched objects whose
+digests differ are compared field by field.  Field values are compared the
+way EnergyPlus reads them, so '0.160' and '.16' are the same value.
+
+An object which was renamed without other changes is reported as a rename
+rather than as an object removed and another added.
+"""
+
+import argparse
+import hashlib
+import time
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+from .cache import load_idd_file
+from .graph import IDFGraph
+from .idd import IDD
+from .idf import build_graph_store
+from .parser import IDFObject, normalize_value, parse_idf
+from .store import FieldTable, GraphStore
+from .writer import write_idf
+
+# (upper-cased type, upper-cased name)
+ObjectKey = tuple[str, str]
+# (source type, source name, field, target type, target name), as in
+# `IDFGraph.edge_set`
+EdgeKey = tuple[str, str, str, str, str]
+
+
+class FieldChange(BaseModel):
+    field: str
+    old: str
+    new: str
+
+
+class ObjectChange(BaseModel):
+    obj_type: str
+    name: str
+    fields: list[FieldChange]
+
+
+class GraphDiff(BaseModel):
+    # (type, name) of the objects only in the new model, or only in the old
+    added: list[tuple[str, str]] = []
+    removed: list[tuple[str, str]] = []
+    # (type, old name, new name) of objects renamed without other changes
+    renamed: list[tuple[str, str, str]] = []
+    changed: list[ObjectChange] = []
+    edges_added: list[EdgeKey] = []
+    edges_removed: list[EdgeKey] = []
+    n_unchanged: int = 0
+
+    @property
+    def empty(self) -> bool:
+        return not (
+            self.added
+            or self.removed
+            or self.renamed
+            or self.changed
+            or self.edges_added
+            or self.edges_removed
+        )
+
+
+class MergeConflict(BaseModel):
+    obj_type: str
+    name: str
+    # None when the conflict is over the whole object, i.e. one side removed
+    # it and the other changed it
+    field: Optional[str] = None
+    # None where the object is missing on that side
+    base: Optional[str] = None
+    ours: Optional[str] = None
+    theirs: Optional[str] = None
+
+
+class MergeResult(BaseModel):
+    # the merged objects, base objects first in their order, then additions
+    objects: list[IDFObject]
+    conflicts: list[MergeConflict] = []
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def ok(self) -> bool:
+        return not self.conflicts
+
+
+def object_keys(store: GraphStore) -> dict[ObjectKey, int]:
+    """
+    Index a graph's nodes by type and name, case-insensitively.  Where two
+    nodes share a key, the first is indexed.
+    """
+    upper_types = [obj_type.upper() for obj_type in store.types]
+    keys = list(
+        zip(map(upper_types.__getitem__, store.node_types), map(str.upper, store.names))
+    )
+    index = dict(zip(keys, range(len(keys))))
+    if len(index) < len(keys):
+        index = {}
+        for node_id, key in enumerate(keys):
+            index.setdefault(key, node_id)
+    return index
+
+
+def _table_digests(table: FieldTable) -> list[bytes]:
+    blake2b, values, offsets = hashlib.blake2b, table.values, table.offsets
+    try:
+        return [
+            blake2b(
+                "\0".join(values[start + 1 : end]).encode(), digest_size=16
+            ).digest()
+            for start, end in zip(offsets, offsets[1:])
+        ]
+    except TypeError:
+        # eppy loads numeric fields as numbers
+        return [
+            blake2b(
+                "\0".join(map(str, values[start + 1 : end])).encode(), digest_size=16
+            ).digest()
+            for start, end in zip(offsets, offsets[1:])
+        ]
+
+
+def object_digests(store: GraphStore) -> list[bytes]:
+    """
+    Hash each node's raw field values after its key, by node id.  Equal
+    digests mean equal objects; different digests may still be equal once
+    the values are normalized.
+    """
+    by_row = [_table_digests(table) for table in store.tables]
+    return [
+        by_row[type_id][row] for type_id, row in zip(store.node_types, store.node_rows)
+    ]
+
+
+def _same(a, b) -> bool:
+    return a == b or normalize_value(str(a)) == normalize_value(str(b))
+
+
+def _padded(values: list, n: int) -> list:
+    return list(values) + [""] * (n - len(values))
+
+
+def _longest(*fieldname_lists: list[str]) -> list[str]:
+    return max(fieldname_lists, key=len)
+
+
+def field_changes(fieldnames: list[str], old: list, new: list) -> list[FieldChange]:
+    """
+    Compare two objects' field values, after their keys.
+
+    Args:
+        fieldnames (list[str]): The names of the fields, starting with 'key'
+        old (list): The old object's values, starting with its key
+        new (list): The new object's values, starting with its key
+    """
+    n = max(len(old), len(new))
+    old, new = _padded(old, n), _padded(new, n)
+    return [
+        FieldChange(
+            field=fieldnames[i] if i < len(fieldnames) else f"Field_{i}",
+            old=str(old[i]),
+            new=str(new[i]),
+        )
+        for i in range(1, n)
+        if not _same(old[i], new[i])
+    ]
+
+
+def _edge_set(store: GraphStore, nodes: set[int]) -> set[EdgeKey]:
+    """
+    The references made by or to some nodes, by type and name.
+    """
+    keys = {}
+    edges = set()
+    if not nodes:
+        return edges
+    for source, target, field_id in zip(
+        store.edge_sources, store.edge_targets, store.edge_fields
+    ):
+        if source not in nodes and target not in nodes:
+            continue
+        for node_id in (source, target):
+            if node_id not in keys:
+                keys[node_id] = (store.node_type(node_id), store.names[node_id])
+        edges.add((*keys[source], store.fields[field_id], *keys[target]))
+    return edges
+
+
+def _content(store: GraphStore, node_id: int) -> tuple:
+    """
+    An object's normalized values other than its name, to spot renames.
+    """
+    return (
+        store.node_type(node_id).upper(),
+        tuple(
+            normalize_value(str(value))
+            for field, value in zip(
+                store.fieldnames(node_id)[1:], store.fieldvalues(node_id)[1:]
+            )
+            if field != "Name"
+        ),
+    )
+
+
+def diff_graphs(
+    old: GraphStore,
+    new: GraphStore,
+    old_digests: Optional[list[bytes]] = None,
+    new_digests: Optional[list[bytes]] = None,
+) -> GraphDiff:
+    """
+    Find the objects, fields and references which differ between two graphs.
+
+    Args:
+        old (GraphStore): The graph to compare from
+        new (GraphStore): The graph to compare to
+        old_digests (list[bytes], optional): `object_digests(old)`, if it has
+            already been computed, e.g. to diff many variants against one model
+        new_digests (list[bytes], optional): `object_digests(new)`, likewise
+
+    Returns:
+        diff (GraphDiff): The differences
+    """
+    old_keys, new_keys = object_keys(old), object_keys(new)
+    if old_digests is None:
+        old_digests = object_digests(old)
+    if new_digests is None:
+        new_digests = object_digests(new)
+
+    diff = GraphDiff()
+    removed = [node_id for key, node_id in old_keys.items() if key not in new_keys]
+    added = [node_id for key, node_id in new_keys.items() if key not in old_keys]
+    # only the references made by or to these nodes can differ
+    old_touched, new_touched = set(removed), set(added)
+    n_unchanged = 0
+    for key, old_id in old_keys.items():
+        new_id = new_keys.get(key)
+        if new_id is None:
+            continue
+        if old_digests[old_id] == new_digests[new_id]:
+            n_unchanged += 1
+            continue
+        old_touched.add(old_id)
+        new_touched.add(new_id)
+        changes = field_changes(
+            _longest(old.fieldnames(old_id), new.fieldnames(new_id)),
+            old.fieldvalues(old_id),
+            new.fieldvalues(new_id),
+        )
+        if changes:
+            diff.changed.append(
+                ObjectChange(
+                    obj_type=new.node_type(new_id),
+                    name=new.names[new_id],
+                    fields=changes,
+                )
+            )
+        else:
+            n_unchanged += 1
+    diff.n_unchanged = n_unchanged
+
+    # an object removed and one added with the same content is a rename
+    removed_content: dict[tuple, list[int]] = {}
+    for old_id in removed:
+        removed_content.setdefault(_content(old, old_id), []).append(old_id)
+    renamed_old: set[int] = set()
+    for new_id in added:
+        candidates = removed_content.get(_content(new, new_id))
+        if candidates:
+            old_id = candidates.pop(0)
+            renamed_old.add(old_id)
+            diff.renamed.append(
+                (new.node_type(new_id), old.names[old_id], new.names[new_id])
+            )
+        else:
+            diff.added.append((new.node_type(new_id), new.names[new_id]))
+    diff.removed = [
+        (old.node_type(old_id), old.names[old_id])
+        for old_id in removed
+        if old_id not in renamed_old
+    ]
+
+    old_edges = _edge_set(old, old_touched)
+    new_edges = _edge_set(new, new_touched)
+    diff.edges_added = sorted(new_edges - old_edges)
+    diff.edges_removed = sorted(old_edges - new_edges)
+    return diff
+
+
+def merge_graphs(
+    base: GraphStore,
+    ours: GraphStore,
+    theirs: GraphStore,
+    prefer: Literal["ours", "theirs"] = "ours",
+) -> MergeResult:
+    """
+    Merge the changes two graphs made to a common base, object by object and
+    then field by field.
+
+    A change made on one side only is taken.  A field both sides changed
+    differently, an object both sides added differently, or an object one
+    side removed while the other changed it is a conflict, which is resolved
+    in favour of `prefer` and reported.
+
+    Args:
+        base (GraphStore): The graph both sides started from
+        ours (GraphStore): One changed graph
+        theirs (GraphStore): The other changed graph
+        prefer (Literal["ours", "theirs"]): Which side wins conflicts
+
+    Returns:
+        result (MergeResult): The merged objects, e.g. to pass to
+            `build_graph_store` or `IDFGraph.from_idf`, and the conflicts
+    """
+    stores = {"base": base, "ours": ours, "theirs": theirs}
+    keys = {side: object_keys(store) for side, store in stores.items()}
+    digests = {side: object_digests(store) for side, store in stores.items()}
+    result = MergeResult(objects=[])
+
+    def unchanged(side: str, key: ObjectKey) -> bool:
+        base_id, side_id = keys["base"][key], keys[side][key]
+        return digests["base"][base_id] == digests[side][side_id] or not (
+            field_changes(
+                _longest(base.fieldnames(base_id), stores[side].fieldnames(side_id)),
+                base.fieldvalues(base_id),
+                stores[side].fieldvalues(side_id),
+            )
+        )
+
+    def take(side: str, key: ObjectKey):
+        result.objects.append(stores[side].object(keys[side][key]))
+
+    def conflict(key: ObjectKey, field: Optional[str] = None, **values):
+        node_id = next(keys[side][key] for side in stores if key in keys[side])
+        store = next(stores[side] for side in stores if key in keys[side])
+        result.conflicts.append(
+            MergeConflict(
+                obj_type=store.node_type(node_id),
+                name=store.names[node_id],
+                field=field,
+                **values,
+            )
+        )
+
+    def merge_fields(key: ObjectKey):
+        present = [side for side in stores if key in keys[side]]
+        fieldnames = _longest(
+            *(stores[side].fieldnames(keys[side][key]) for side in present)
+        )
+        values = {
+            side: stores[side].fieldvalues(keys[side][key]) if side in present else []
+            for side in stores
+        }
+        n = max(len(side_values) for side_values in values.values())
+        values = {side: _padded(side_values, n) for side, side_values in values.items()}
+        merged = [values[prefer][0] or values["ours"][0] or values["theirs"][0]]
+        for i in range(1, n):
+            b, o, t = values["base"][i], values["ours"][i], values["theirs"][i]
+            if _same(o, b):
+                merged.append(t)
+            elif _same(t, b) or _same(o, t):
+                merged.append(o)
+            else:
+                conflict(
+                    key,
+                    field=fieldnames[i] if i < len(fieldnames) else f"Field_{i}",
+                    base=str(b) if "base" in present else None,
+                    ours=str(o),
+                    theirs=str(t),
+                )
+                merged.append(o if prefer == "ours" else t)
+        while len(merged) > 2 and merged[-1] == "":
+            merged.pop()
+        result.objects.append(IDFObject(merged[0], fieldnames, merged))
+
+    for key in keys["base"]:
+        in_ours, in_theirs = key in keys["ours"], key in keys["theirs"]
+        if not in_ours and not in_theirs:
+            continue
+        if not in_ours or not in_theirs:
+            # removed on one side: fine unless the other side changed it
+            kept = "theirs" if in_theirs else "ours"
+            if unchanged(kept, key):
+                continue
+            conflict(
+                key,
+                base="",
+                **{kept: "changed", ("ours" if kept == "theirs" else "theirs"): None},
+            )
+            if prefer == kept:
+                take(kept, key)
+            continue
+        if unchanged("ours", key):
+            take("theirs", key)
+        elif unchanged("theirs", key):
+            take("ours", key)
+        else:
+            merge_fields(key)
+
+    for key in keys["ours"]:
+        if key in keys["base"]:
+            continue
+        if key not in keys["theirs"]:
+            take("ours", key)
+        elif (
+            digests["ours"][keys["ours"][key]] == digests["theirs"][keys["theirs"][key]]
+        ):
+            take("ours", key)
+        else:
+            merge_fields(key)
+    for key in keys["theirs"]:
+        if key not in keys["base"] and key not in keys["ours"]:
+            take("theirs", key)
+    return result
+
+
+def _load(path: str, idd: Optional[IDD]) -> GraphStore:
+    return build_graph_store(parse_idf(path, idd), idd, progress=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("old", help="The IDF to compare from, or ours to merge")
+    parser.add_argument("new", help="The IDF to compare to, or theirs to merge")
+    parser.add_argument("--idd", help="The Energy+.idd to resolve references with")
+    parser.add_argument("--base", help="Merge old and new, which both came from base")
+    parser.add_argument("--output", help="Where to write the merged IDF")
+    parser.add_argument(
+        "--prefer",
+        choices=["ours", "theirs"],
+        default="ours",
+        help="Which side wins merge conflicts",
+    )
+    args = parser.parse_args()
+    idd = load_idd_file(args.idd) if args.idd else None
+
+    if args.base is not None:
+        if args.output is None:
+            parser.error("--base needs an --output to write the merge to")
+        start = time.perf_counter()
+        result = merge_graphs(
+            _load(args.base, idd),
+            _load(args.old, idd),
+            _load(args.new, idd),
+            prefer=args.prefer,
+        )
+        elapsed = time.perf_counter() - start
+        for c in result.conflicts:
+            where = f"{c.field}: " if c.field else ""
+            print(
+                f"! {c.obj_type} '{c.name}' {where}base={c.base!r} "
+                f"ours={c.ours!r} theirs={c.theirs!r}"
+            )
+        n_objects = write_idf(IDFGraph.from_idf(result.objects, idd), args.output)
+        print(
+            f"Merged {n_objects} objects with {len(result.conflicts)} conflicts "
+            f"in {elapsed:.2f}s"
+        )
+        return 0 if result.ok else 1
+
+    old, new = _load(args.old, idd), _load(args.new, idd)
+    start = time.perf_counter()
+    diff = diff_graphs(old, new)
+    elapsed = time.perf_counter() - start
+    for obj_type, name in diff.removed:
+        print(f"- {obj_type} '{name}'")
+    for obj_type, name in diff.added:
+        print(f"+ {obj_type} '{name}'")
+    for obj_type, old_name, new_name in diff.renamed:
+        print(f"> {obj_type} '{old_name}' -> '{new_name}'")
+    for change in diff.changed:
+        print(f"~ {change.obj_type} '{change.name}'")
+        for field in change.fields:
+            print(f"      {field.field}: {field.old!r} -> {field.new!r}")
+    print(
+        f"{len(diff.added)} added, {len(diff.removed)} removed, "
+        f"{len(diff.renamed)} renamed, {len(diff.changed)} changed and "
+        f"{diff.n_unchanged} unchanged objects; {len(diff.edges_added)} "
+        f"references added and {len(diff.edges_removed)} removed, in "
+        f"{elapsed:.3f}s"
+    )
+    return 0 if diff.empty else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
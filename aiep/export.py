@@ -0,0 +1,501 @@
+"""
+Export IDF graphs to a graph database in large batches.
+
+Usage (from the repository root), on the output of `aiep.batch`:
+
+    python -m aiep.export graphs --csv neo4j-import --idd path/to/Energy+.idd
+    python -m aiep.export graphs --sqlite graphs.db
+    python -m aiep.export graphs --neo4j bolt://localhost:7687 --user neo4j
+
+Every object becomes a node labelled `IDFObject` and with its object type,
+carrying its model, type, name, IDD group and field values as properties,
+and every reference becomes a `REFERENCES` relationship from the referring
+object to the referenced one, carrying the field.  Node ids are derived from
+the model, type and name, so exporting a model again updates its nodes rather
+than duplicating them.
+
+Neo4j is written to with batched `UNWIND` transactions, or, for the fastest
+offline bulk load, as CSV files for `neo4j-admin database import`.  A SQLite
+file with the same nodes and relationships stands in for a database locally.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import pickle
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from tqdm.autonotebook import tqdm
+
+from .batch import index_idds, iter_manifest, short_version
+from .cache import load_idd_file
+from .idd import IDD
+from .store import GraphStore
+
+NODE_LABEL = "IDFObject"
+RELATIONSHIP_TYPE = "REFERENCES"
+
+
+def node_key(model: str, obj_type: str, name: str) -> str:
+    """
+    Make the stable id of an object: the same object of the same model always
+    gets the same id.  Names are matched case-insensitively, as in EnergyPlus.
+    """
+    key = f"{model}\0{obj_type.upper()}\0{name.upper()}"
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def iter_node_rows(
+    store: GraphStore, model: str, idd: Optional[IDD] = None
+) -> Iterator[dict[str, Any]]:
+    """
+    Describe each node of a graph as a row to export.
+
+    Args:
+        store (GraphStore): The graph
+        model (str): The model the graph was built from, e.g. its path
+        idd (IDD, optional): The IDD to look up each type's group in
+
+    Yields:
+        row (dict): The node's `id`, `model`, `type`, `name` and `group`, and
+            its non-blank field values as `properties`
+    """
+    groups: dict[str, str] = {}
+    for node_id, type_id, fieldnames, fieldvalues in store.iter_fields():
+        name = store.names[node_id]
+        obj_type = store.types[type_id]
+        if obj_type not in groups:
+            schema = idd.schemas.get(obj_type.upper()) if idd is not None else None
+            groups[obj_type] = schema.header.group if schema is not None else ""
+        yield {
+            "id": node_key(model, obj_type, name),
+            "model": model,
+            "type": obj_type,
+            "name": name,
+            "group": groups[obj_type],
+            "properties": {
+                field: value
+                for field, value in zip(fieldnames[1:], fieldvalues[1:])
+                if field != "Name" and value != ""
+            },
+        }
+
+
+def iter_edge_rows(store: GraphStore, model: str) -> Iterator[dict[str, Any]]:
+    """
+    Describe each edge of a graph as a row to export, from the id of the
+    referring node to the id of the referenced node.
+    """
+    ids = [
+        node_key(model, store.types[type_id], name)
+        for type_id, name in zip(store.node_types, store.names)
+    ]
+    for source, target, field_id in zip(
+        store.edge_sources, store.edge_targets, store.edge_fields
+    ):
+        yield {
+            "source": ids[source],
+            "target": ids[target],
+            "field": store.fields[field_id],
+            "model": model,
+        }
+
+
+def _batches(rows: Iterable[dict], batch_size: int) -> Iterator[list[dict]]:
+    batch: list[dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class SQLiteSink:
+    """
+    A SQLite file holding nodes and relationships, as a local stand-in for a
+    graph database.  Rows are upserted by id, as `MERGE` would in Neo4j.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        # a bulk load can be re-run if it is interrupted, so trade durability
+        # for speed
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS nodes (
+                id TEXT PRIMARY KEY,
+                model TEXT,
+                type TEXT,
+                name TEXT,
+                "group" TEXT,
+                properties TEXT
+            );
+            CREATE TABLE IF NOT EXISTS edges (
+                source TEXT,
+                target TEXT,
+                field TEXT,
+                model TEXT,
+                PRIMARY KEY (source, target, field)
+            );
+            CREATE INDEX IF NOT EXISTS edges_target ON edges (target);
+            CREATE INDEX IF NOT EXISTS nodes_model_type ON nodes (model, type);
+            """)
+
+    def write_nodes(self, rows: list[dict]):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        row["id"],
+                        row["model"],
+                        row["type"],
+                        row["name"],
+                        row["group"],
+                        json.dumps(row["properties"]),
+                    )
+                    for row in rows
+                ),
+            )
+
+    def write_edges(self, rows: list[dict]):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO edges VALUES (?, ?, ?, ?)",
+                (
+                    (row["source"], row["target"], row["field"], row["model"])
+                    for row in rows
+                ),
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+def _csv_name(obj_type: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", obj_type).strip("_")
+
+
+class Neo4jCSVSink:
+    """
+    CSV files in the format of `neo4j-admin database import`, for loading a
+    whole corpus into an empty database offline, which is much faster than
+    transactions.
+
+    Nodes are written to a file per object type, so that each type's fields
+    can be columns: the type's fields in the IDD up to its extensible group,
+    if one is given, otherwise those of the first object of the type.  The
+    values of any other fields, e.g. a schedule's thousands of extensible
+    fields, go in one `other_fields` array of `field=value` entries.  Rows are
+    appended batch by batch, so files are only open while a batch is written.
+    An import needs an empty database, so files are overwritten, not added to.
+    """
+
+    def __init__(self, directory: Union[str, Path], idd: Optional[IDD] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.idd = idd
+        self.node_files: dict[str, tuple[Path, list[str]]] = {}
+        self.relationship_file = self.directory / "relationships.csv"
+        self._write(
+            self.relationship_file,
+            [":START_ID", ":END_ID", ":TYPE", "field", "model"],
+            [],
+        )
+
+    def _write(self, path: Path, header: Optional[list[str]], rows: Iterable[list]):
+        # a file is started over when its header is written, so exporting to
+        # the same directory again replaces the files rather than extending
+        with open(
+            path, "a" if header is None else "w", newline="", encoding="utf-8"
+        ) as f:
+            writer = csv.writer(f)
+            if header is not None:
+                writer.writerow(header)
+            writer.writerows(rows)
+
+    def write_nodes(self, rows: list[dict]):
+        by_type: dict[str, list[dict]] = {}
+        for row in rows:
+            by_type.setdefault(row["type"], []).append(row)
+        for obj_type, type_rows in by_type.items():
+            header = None
+            if obj_type not in self.node_files:
+                if self.idd is not None and obj_type.upper() in self.idd.schemas:
+                    fields = []
+                    for field in self.idd[obj_type.upper()]:
+                        if field.begin_extensible:
+                            break
+                        if field.bunch_name != "Name":
+                            fields.append(field.bunch_name)
+                else:
+                    fields = list(type_rows[0]["properties"])
+                path = self.directory / f"nodes-{_csv_name(obj_type)}.csv"
+                self.node_files[obj_type] = (path, fields)
+                header = ["id:ID", "model", "type", "name", "group", ":LABEL"]
+                header += fields + ["other_fields:string[]"]
+            path, fields = self.node_files[obj_type]
+            columns = set(fields)
+            label = f"{NODE_LABEL};{obj_type}"
+            self._write(
+                path,
+                header,
+                (
+                    [
+                        row["id"],
+                        row["model"],
+                        row["type"],
+                        row["name"],
+                        row["group"],
+                        label,
+                    ]
+                    + [row["properties"].get(field, "") for field in fields]
+                    + [
+                        ";".join(
+                            f"{field}={value}"
+                            for field, value in row["properties"].items()
+                            if field not in columns
+                        )
+                    ]
+                    for row in type_rows
+                ),
+            )
+
+    def write_edges(self, rows: list[dict]):
+        self._write(
+            self.relationship_file,
+            None,
+            (
+                [
+                    row["source"],
+                    row["target"],
+                    RELATIONSHIP_TYPE,
+                    row["field"],
+                    row["model"],
+                ]
+                for row in rows
+            ),
+        )
+
+    def import_command(self, database: str = "neo4j") -> str:
+        """
+        The `neo4j-admin` command which loads the files into a new database.
+        """
+        nodes = " ".join(f"--nodes={path}" for path, _ in self.node_files.values())
+        return (
+            f"neo4j-admin database import full {nodes} "
+            f"--relationships={self.relationship_file} {database}"
+        )
+
+    def close(self):
+        pass
+
+
+class Neo4jSink:
+    """
+    Writes to a running Neo4j database through the official driver, one
+    `UNWIND` transaction per batch.  Nodes are merged on their id, so the
+    load is idempotent; a uniqueness constraint on the id keeps the merges
+    indexed.
+    """
+
+    def __init__(self, driver, database: Optional[str] = None):
+        """
+        Args:
+            driver (neo4j.Driver): A connected driver, e.g. from `connect`
+            database (str, optional): The database to write to; defaults to
+                the server's default database
+        """
+        self.driver = driver
+        self.database = database
+        self._run(
+            (
+                f"CREATE CONSTRAINT idf_object_id IF NOT EXISTS "
+                f"FOR (n:{NODE_LABEL}) REQUIRE n.id IS UNIQUE",
+                {},
+            )
+        )
+
+    @classmethod
+    def connect(
+        cls, uri: str, auth: tuple[str, str], database: Optional[str] = None
+    ) -> "Neo4jSink":
+        try:
+            from neo4j import GraphDatabase
+        except ImportError as e:
+            raise ImportError(
+                "Exporting to Neo4j needs the neo4j driver: pip install neo4j"
+            ) from e
+        return cls(GraphDatabase.driver(uri, auth=auth), database)
+
+    def _run(self, *queries: tuple[str, dict]):
+        """
+        Run queries, each with its parameters, in a single transaction.
+        """
+
+        def work(tx):
+            for query, parameters in queries:
+                tx.run(query, **parameters).consume()
+
+        with self.driver.session(database=self.database) as session:
+            session.execute_write(work)
+
+    def write_nodes(self, rows: list[dict]):
+        # labels can't be query parameters, so each type gets its own query
+        by_type: dict[str, list[dict]] = {}
+        for row in rows:
+            by_type.setdefault(row["type"], []).append(row)
+        self._run(
+            *(
+                (
+                    f"UNWIND $rows AS row "
+                    f"MERGE (n:{NODE_LABEL} {{id: row.id}}) "
+                    f"SET n:`{obj_type.replace('`', '``')}`, n.model = row.model, "
+                    f"n.type = row.type, n.name = row.name, n.group = row.group, "
+                    f"n += row.properties",
+                    {"rows": type_rows},
+                )
+                for obj_type, type_rows in by_type.items()
+            )
+        )
+
+    def write_edges(self, rows: list[dict]):
+        self._run(
+            (
+                f"UNWIND $rows AS row "
+                f"MATCH (a:{NODE_LABEL} {{id: row.source}}) "
+                f"MATCH (b:{NODE_LABEL} {{id: row.target}}) "
+                f"MERGE (a)-[r:{RELATIONSHIP_TYPE} {{field: row.field}}]->(b) "
+                f"SET r.model = row.model",
+                {"rows": rows},
+            )
+        )
+
+    def close(self):
+        self.driver.close()
+
+
+Sink = Union[SQLiteSink, Neo4jCSVSink, Neo4jSink]
+
+
+def export_graph(
+    store: GraphStore,
+    sink: Sink,
+    model: str,
+    idd: Optional[IDD] = None,
+    batch_size: int = 10_000,
+) -> tuple[int, int]:
+    """
+    Export a graph's nodes, then its edges, in batches.
+
+    Args:
+        store (GraphStore): The graph, e.g. from `build_graph_store`
+        sink (Sink): Where to write it
+        model (str): The model the graph was built from, e.g. its path, which
+            keeps the ids of different models apart
+        idd (IDD, optional): The IDD to look up each type's group in
+        batch_size (int): The number of rows per batch
+
+    Returns:
+        n_nodes (int): The number of nodes written
+        n_edges (int): The number of edges written
+    """
+    for batch in _batches(iter_node_rows(store, model, idd), batch_size):
+        sink.write_nodes(batch)
+    for batch in _batches(iter_edge_rows(store, model), batch_size):
+        sink.write_edges(batch)
+    return store.n_nodes, store.n_edges
+
+
+def export_corpus(
+    output_dir: Union[str, Path],
+    sink: Sink,
+    idd_paths: Iterable[Union[str, Path]] = (),
+    batch_size: int = 10_000,
+    progress: bool = True,
+) -> tuple[int, int]:
+    """
+    Export every graph `aiep.batch` wrote to a directory, one at a time.
+
+    Args:
+        output_dir (Path): The directory holding the graphs and manifest
+        sink (Sink): Where to write them
+        idd_paths (Iterable[Path]): An IDD file for each EnergyPlus version
+            in the corpus, to look up groups in
+        batch_size (int): The number of rows per batch
+        progress (bool): Whether to show a progress bar
+
+    Returns:
+        n_nodes (int): The number of nodes written
+        n_edges (int): The number of edges written
+    """
+    idds = index_idds(idd_paths)
+    results = [result for result in iter_manifest(output_dir) if result.ok]
+    n_nodes = n_edges = 0
+    for result in tqdm(results, disable=not progress):
+        with open(result.output, "rb") as f:
+            store: GraphStore = pickle.load(f)
+        idd_path = idds.get(short_version(result.version or ""))
+        idd = load_idd_file(idd_path) if idd_path is not None else None
+        nodes, edges = export_graph(store, sink, result.path, idd, batch_size)
+        n_nodes += nodes
+        n_edges += edges
+    return n_nodes, n_edges
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("graphs", help="The output directory of aiep.batch")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--csv", help="Write neo4j-admin import CSVs here")
+    target.add_argument("--sqlite", help="Write to this SQLite file")
+    target.add_argument("--neo4j", help="Write to the Neo4j database at this URI")
+    parser.add_argument("--user", default="neo4j")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", help="The Neo4j database to write to")
+    parser.add_argument(
+        "--idd",
+        nargs="*",
+        default=[],
+        help="An Energy+.idd for each EnergyPlus version in the corpus",
+    )
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.csv:
+        # every version shares one set of files, so the columns come from the
+        # first IDD
+        idd = load_idd_file(args.idd[0]) if args.idd else None
+        sink = Neo4jCSVSink(args.csv, idd)
+    elif args.sqlite:
+        sink = SQLiteSink(args.sqlite)
+    else:
+        sink = Neo4jSink.connect(
+            args.neo4j, (args.user, args.password), database=args.database
+        )
+    start = time.perf_counter()
+    try:
+        n_nodes, n_edges = export_corpus(
+            args.graphs, sink, args.idd, batch_size=args.batch_size
+        )
+    finally:
+        sink.close()
+    print(
+        f"Exported {n_nodes} nodes and {n_edges} relationships in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+    if isinstance(sink, Neo4jCSVSink):
+        print(f"Load them with:\n{sink.import_command()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+import networkx as nx
+
+from .idd import IDD
+from .idf import iter_objects
+from .parser import IDFObject, format_object
+
+if TYPE_CHECKING:
+    from archetypal.idfclass import IDF
+    from geomeppy.patches import EpBunch
+
+# The reference class used for every name when references are resolved
+# without an IDD, i.e. any field value may refer to any object's name.
+UNTYPED = ""
+
+
+class IDFGraph:
+    """
+    An IDF graph which can be edited in place.
+
+    The graph is a `nx.MultiDiGraph` over integer node ids, whose nodes carry
+    the `name`, `type` and `object` of each IDF object.  As with
+    `create_graph`, edges point from the referenced object to the object
+    which references it, are keyed by field name, and carry their `type`.
+
+    Alongside the graph, two indexes are kept up to date: the nodes
+    registered under each name in each reference class, and the (node, field)
+    pairs whose value is each name.  An edit only re-resolves the references
+    to the names it touches, so its cost is proportional to the number of
+    objects referring to those names rather than to the size of the file.
+    References are resolved exactly as `build_graph_store` resolves them, so
+    the edges always match those of a full rebuild.
+
+    The graph also tracks which objects were added, edited or removed since
+    it was loaded (or since `mark_clean`), keeping the original text of edited
+    and removed objects, so that only the changes need to be written out.
+    """
+
+    def __init__(self, idd: Optional[IDD] = None):
+        """
+        Args:
+            idd (IDD, optional): The IDD to resolve typed references with
+        """
+        self.idd = idd
+        self.graph = nx.MultiDiGraph()
+        # reference class -> upper-cased name -> node ids
+        self.names: dict[str, dict[str, set[int]]] = {}
+        # upper-cased name -> (node id, field) pairs whose value is the name
+        self.referrers: dict[str, set[tuple[int, str]]] = {}
+        # what each node is currently registered under, to undo it on edits
+        self._registered: dict[int, list[tuple[str, str]]] = {}
+        self._references: dict[int, dict[str, str]] = {}
+        self._targets: dict[tuple[int, str], int] = {}
+        self._keys: dict[tuple[str, str], int] = {}
+        self._type_counts: dict[str, int] = {}
+        self._next_id = 0
+        # bumped on every edit, so that derived results know to recompute
+        self.version = 0
+        # changes since load: nodes added, the original (name, text) of nodes
+        # edited, and the (type, original name, original text) of nodes removed
+        self.added: set[int] = set()
+        self.original: dict[int, tuple[str, str]] = {}
+        self.removed: dict[int, tuple[str, str, str]] = {}
+
+    @classmethod
+    def from_idf(
+        cls, idf: Union["IDF", Iterable[IDFObject]], idd: Optional[IDD] = None
+    ) -> "IDFGraph":
+        """
+        Build an editable graph of a loaded IDF or a stream of parsed objects.
+        """
+        graph = cls(idd)
+        for objtype, obj in iter_objects(idf):
+            graph.add_object(obj, objtype)
+        graph.mark_clean()
+        return graph
+
+    def __len__(self) -> int:
+        return self.graph.number_of_nodes()
+
+    def find(self, obj_type: str, name: str) -> Optional[int]:
+        """
+        Find the node for the object of the given type and name.
+        """
+        return self._keys.get((obj_type.upper(), name))
+
+    def object(self, node_id: int) -> Union["EpBunch", IDFObject]:
+        return self.graph.nodes[node_id]["object"]
+
+    @property
+    def changed(self) -> set[int]:
+        """
+        The nodes which were added or edited since the graph was loaded.
+        """
+        return self.added | self.original.keys()
+
+    def mark_clean(self):
+        """
+        Forget the changes made so far, e.g. once they have been saved.
+        """
+        self.added.clear()
+        self.original.clear()
+        self.removed.clear()
+
+    def add_object(
+        self, obj: Union["EpBunch", IDFObject], obj_type: Optional[str] = None
+    ) -> int:
+        """
+        Add an object, resolving its references and any references to it.
+
+        Args:
+            obj (Union[EpBunch, IDFObject]): The object to add
+            obj_type (str, optional): Its upper-cased type; defaults to the
+                object's key
+
+        Returns:
+            node_id (int): The id of the new node
+        """
+        obj_type = (obj_type or obj.key).upper()
+        try:
+            name = obj.Name
+        # eppy's BadEPFieldError is an AttributeError
+        except AttributeError as e:
+            count = self._type_counts.get(obj_type, -1) + 1
+            self._type_counts[obj_type] = count
+            name = f"{obj_type}_{count:03d}"
+        if (obj_type, name) in self._keys:
+            raise ValueError(f"There is already a {obj_type} named '{name}'.")
+
+        node_id = self._next_id
+        self._next_id += 1
+        self.version += 1
+        self.graph.add_node(node_id, name=name, type=obj_type, object=obj)
+        self._keys[(obj_type, name)] = node_id
+        self.added.add(node_id)
+        self._references[node_id] = {}
+        for field, fieldvalue in zip(obj.fieldnames, obj.fieldvalues):
+            if self._is_reference(obj_type, field, fieldvalue):
+                self._add_reference(node_id, field, fieldvalue)
+        self._register(node_id)
+        return node_id
+
+    def remove_object(self, node_id: int):
+        """
+        Remove an object; references to it are left dangling in the IDF.
+        """
+        self.version += 1
+        for field in list(self._references[node_id]):
+            self._remove_reference(node_id, field)
+        del self._references[node_id]
+        names = self._unregister(node_id)
+        attrs = self.graph.nodes[node_id]
+        del self._keys[(attrs["type"], attrs["name"])]
+        if node_id in self.added:
+            self.added.discard(node_id)
+        else:
+            name, text = self.original.pop(node_id, None) or (
+                attrs["name"],
+                format_object(attrs["object"]),
+            )
+            self.removed[node_id] = (attrs["type"], name, text)
+        self.graph.remove_node(node_id)
+        for name in names:
+            self._resolve_referrers(name)
+
+    def set_field(self, node_id: int, field: str, value: Union[str, float, int]):
+        """
+        Set a field of an object and update the edges it affects.
+
+        Setting a name field does not update the objects which referred to
+        the old name; use `rename` for that.
+        """
+        attrs = self.graph.nodes[node_id]
+        if (
+            field == "Name"
+            and self._keys.get((attrs["type"], value), node_id) != node_id
+        ):
+            raise ValueError(f"There is already a {attrs['type']} named '{value}'.")
+        obj = attrs["object"]
+        self.version += 1
+        if node_id not in self.added and node_id not in self.original:
+            self.original[node_id] = (attrs["name"], format_object(obj))
+        obj[field] = value
+        if field in self._references[node_id]:
+            self._remove_reference(node_id, field)
+        if self._is_reference(attrs["type"], field, value):
+            self._add_reference(node_id, field, value)
+        if field == "Name" or field in self._reference_fields(attrs["type"]):
+            if field == "Name":
+                del self._keys[(attrs["type"], attrs["name"])]
+                attrs["name"] = value
+                self._keys[(attrs["type"], value)] = node_id
+            names = self._unregister(node_id)
+            self._register(node_id)
+            for name in names:
+                self._resolve_referrers(name)
+
+    def rename(self, node_id: int, new_name: str):
+        """
+        Rename an object, and re-point every object which refers to it.
+        """
+        # edges point from the referenced object to its referrers
+        referrers = [
+            (source, field)
+            for _, source, field in self.graph.out_edges(node_id, keys=True)
+        ]
+        self.set_field(node_id, "Name", new_name)
+        for source, field in referrers:
+            self.set_field(source, field, new_name)
+
+    def references(self, node_id: int) -> dict[str, str]:
+        """
+        The fields of an object which may refer to another, with the
+        upper-cased names they hold.
+        """
+        return dict(self._references[node_id])
+
+    def target(self, node_id: int, field: str) -> Optional[int]:
+        """
+        The node a field of an object refers to, or None if no single object
+        has the name it holds.
+        """
+        return self._targets.get((node_id, field))
+
+    def edge_set(self) -> set[tuple[str, str, str, str, str]]:
+        """
+        Describe every edge by name, as (source type, source name, field,
+        target type, target name), e.g. to compare against a rebuild.
+        """
+        nodes = self.graph.nodes
+        return {
+            (
+                nodes[source]["type"],
+                nodes[source]["name"],
+                field,
+                nodes[target]["type"],
+                nodes[target]["name"],
+            )
+            for target, source, field in self.graph.edges(keys=True)
+        }
+
+    def _reference_fields(self, obj_type: str) -> dict[str, list[str]]:
+        if self.idd is None:
+            return {}
+        return self.idd[obj_type].reference_fields
+
+    def _is_reference(self, obj_type: str, field: str, fieldvalue) -> bool:
+        if field == "Name" or not isinstance(fieldvalue, str):
+            return False
+        if self.idd is None:
+            return True
+        return field in self.idd[obj_type].object_list_fields
+
+    def _reference_classes(self, obj_type: str, field: str) -> list[str]:
+        if self.idd is None:
+            return [UNTYPED]
+        return self.idd[obj_type].object_list_fields[field]
+
+    def _register(self, node_id: int):
+        attrs = self.graph.nodes[node_id]
+        if self.idd is None:
+            registered = [(UNTYPED, attrs["name"].upper())]
+        else:
+            reference_fields = self._reference_fields(attrs["type"])
+            obj = attrs["object"]
+            registered = [
+                (reference_class, fieldvalue.upper())
+                for field, fieldvalue in zip(obj.fieldnames, obj.fieldvalues)
+                if field in reference_fields and isinstance(fieldvalue, str)
+                for reference_class in reference_fields[field]
+            ]
+        self._registered[node_id] = registered
+        for reference_class, name in registered:
+            self.names.setdefault(reference_class, {}).setdefault(name, set()).add(
+                node_id
+            )
+        for name in {name for _, name in registered}:
+            self._resolve_referrers(name)
+
+    def _unregister(self, node_id: int) -> set[str]:
+        registered = self._registered.pop(node_id)
+        for reference_class, name in registered:
+            nodes = self.names[reference_class][name]
+            nodes.discard(node_id)
+            if not nodes:
+                del self.names[reference_class][name]
+        return {name for _, name in registered}
+
+    def _add_reference(self, node_id: int, field: str, fieldvalue: str):
+        name = fieldvalue.upper()
+        self._references[node_id][field] = name
+        self.referrers.setdefault(name, set()).add((node_id, field))
+        self._resolve(node_id, field)
+
+    def _remove_reference(self, node_id: int, field: str):
+        name = self._references[node_id].pop(field)
+        referrers = self.referrers[name]
+        referrers.discard((node_id, field))
+        if not referrers:
+            del self.referrers[name]
+        target = self._targets.pop((node_id, field), None)
+        if target is not None and self.graph.has_edge(target, node_id, field):
+            self.graph.remove_edge(target, node_id, field)
+
+    def _resolve_referrers(self, name: str):
+        for node_id, field in list(self.referrers.get(name, ())):
+            self._resolve(node_id, field)
+
+    def _resolve(self, node_id: int, field: str):
+        """
+        Point the edge for a (node, field) reference at the single object
+        with that name in the field's reference classes, or drop it if there
+        is no such object or more than one.
+        """
+        name = self._references[node_id][field]
+        obj_type = self.graph.nodes[node_id]["type"]
+        candidates: set[int] = set()
+        for reference_class in self._reference_classes(obj_type, field):
+            candidates.update(self.names.get(reference_class, {}).get(name, ()))
+        target = next(iter(candidates)) if len(candidates) == 1 else None
+
+        previous = self._targets.get((node_id, field))
+        if previous == target:
+            return
+        if previous is not None:
+            del self._targets[(node_id, field)]
+            if self.graph.has_edge(previous, node_id, field):
+                self.graph.remove_edge(previous, node_id, field)
+        if target is not None:
+            self._targets[(node_id, field)] = target
+            self.graph.add_edge(
+                target,
+                node_id,
+                field,
+                type=(obj_type, self.graph.nodes[target]["type"]),
+            )
@@ -0,0 +1,669 @@
+"""
+Model the fluid nodes of an IDF's HVAC systems and trace loops through them.
+
+Usage (from the repository root):
+
+    python -m aiep.hvac model.idf --idd path/to/Energy+.idd
+
+EnergyPlus connects HVAC components through named fluid nodes rather than by
+referring to each other: a fan's outlet node is the next coil's inlet node.
+These nodes are not objects, so in the object graph they are only edges to
+NodeLists, or nothing at all.  `HVACNetwork` is a second graph layer over the
+same `GraphStore`, whose vertices are the fluid nodes and whose edges are the
+flows between them, each carried by the object which joins them.
+
+The node fields of each type are the fields the IDD gives `\\type node` (and
+so the NodeList object-list).  Which way fluid flows through an object is
+read from its field names: each `..._Inlet_...` field flows to the matching
+`..._Outlet_...` field, and any inlets and outlets left unmatched, e.g. a
+splitter's one inlet and numbered outlets, flow to each other.  The few
+types whose fields do not say, like `OutdoorAir:Mixer`, are listed in
+`STREAMS`.  Plant connectors join branches rather than nodes, so they flow
+from the outlet node of each inlet branch to the inlet node of each outlet
+branch.  Branches name the inlet and outlet node of each component they list,
+which must be the component's own, and any which are not are reported.
+Loops, controllers, setpoint managers and the like only name nodes to watch
+or bound, so their fields are recorded without carrying flow.
+
+Tracing a side of a loop is then a breadth first search from its inlet
+nodes, linear in the size of the network, which reports the outlets it
+reaches, and for those it does not, where the flow stops and where the
+flow into the missing outlet starts, leaving out the nodes where fluid
+enters or leaves the model (`EXITS` and declared outdoor air nodes).
+"""
+
+import argparse
+import re
+import time
+from array import array
+from collections import deque
+from typing import Iterator, Optional
+
+import networkx as nx
+from pydantic import BaseModel
+
+from .analysis import _Adjacency
+from .cache import load_idd_file
+from .idd import IDD, NODELIST_REFERENCE_CLASS
+from .idf import build_graph_store
+from .parser import parse_idf
+from .store import GraphStore
+
+# The node fields bounding each side of each loop type, as (side, inlet
+# field, outlet field); either may name a NodeList.
+LOOP_SIDES: dict[str, list[tuple[str, str, str]]] = {
+    "AIRLOOPHVAC": [
+        ("supply", "Supply_Side_Inlet_Node_Name", "Supply_Side_Outlet_Node_Names"),
+        ("demand", "Demand_Side_Inlet_Node_Names", "Demand_Side_Outlet_Node_Name"),
+    ],
+    "PLANTLOOP": [
+        ("supply", "Plant_Side_Inlet_Node_Name", "Plant_Side_Outlet_Node_Name"),
+        ("demand", "Demand_Side_Inlet_Node_Name", "Demand_Side_Outlet_Node_Name"),
+    ],
+    "CONDENSERLOOP": [
+        (
+            "supply",
+            "Condenser_Side_Inlet_Node_Name",
+            "Condenser_Side_Outlet_Node_Name",
+        ),
+        ("demand", "Demand_Side_Inlet_Node_Name", "Demand_Side_Outlet_Node_Name"),
+    ],
+}
+
+# The flows through types whose field names do not say which way they run,
+# as (inlet fields, outlet fields) pairs.
+STREAMS: dict[str, list[tuple[tuple[str, ...], tuple[str, ...]]]] = {
+    "OUTDOORAIR:MIXER": [
+        (
+            ("Outdoor_Air_Stream_Node_Name", "Return_Air_Stream_Node_Name"),
+            ("Mixed_Air_Node_Name",),
+        ),
+        (("Return_Air_Stream_Node_Name",), ("Relief_Air_Stream_Node_Name",)),
+    ],
+    "ZONEHVAC:EQUIPMENTCONNECTIONS": [
+        (("Zone_Air_Inlet_Node_or_NodeList_Name",), ("Zone_Air_Node_Name",)),
+        (
+            ("Zone_Air_Node_Name",),
+            (
+                "Zone_Air_Exhaust_Node_or_NodeList_Name",
+                "Zone_Return_Air_Node_or_NodeList_Name",
+            ),
+        ),
+    ],
+}
+
+# The node fields through which fluid leaves the model, e.g. relief air to
+# outdoors; outdoor air nodes declared by `OutdoorAir:Node` and
+# `OutdoorAir:NodeList` are boundaries too.
+EXITS: dict[str, tuple[str, ...]] = {
+    "OUTDOORAIR:MIXER": ("Relief_Air_Stream_Node_Name",),
+}
+
+# Objects in these groups name nodes to sense, set or report conditions at,
+# rather than to carry fluid through.
+CONTROL_GROUPS = {
+    "Controllers",
+    "Energy Management System (EMS)",
+    "Internal Gains",
+    "Output Reporting",
+    "Setpoint Managers",
+    "System Availability Managers",
+}
+
+# Types which only declare nodes
+_DECLARATIONS = {"NODELIST", "OUTDOORAIR:NODE", "OUTDOORAIR:NODELIST"}
+
+_OUTDOOR_DECLARATIONS = {"OUTDOORAIR:NODE", "OUTDOORAIR:NODELIST"}
+
+_CONNECTORS = {"CONNECTOR:SPLITTER", "CONNECTOR:MIXER"}
+
+
+_BRANCH_FIELD = re.compile(
+    r"Component_(\d+)_(Object_Type|Name|Inlet_Node_Name|Outlet_Node_Name)"
+)
+
+
+def _branch_components(fieldnames: list[str]) -> list[tuple[int, dict[str, str]]]:
+    """
+    Group a branch's fields by component, e.g. 'Component_2_Inlet_Node_Name'
+    under (2, 'Inlet_Node_Name').
+    """
+    components: dict[int, dict[str, str]] = {}
+    for field in fieldnames:
+        match = _BRANCH_FIELD.fullmatch(field)
+        if match is not None:
+            components.setdefault(int(match[1]), {})[match[2]] = field
+    return [
+        (component, fields)
+        for component, fields in sorted(components.items())
+        if len(fields) == 4
+    ]
+
+
+def _words(field: str) -> list[str]:
+    return field.lower().split("_")
+
+
+def _streams(node_fields: list[str]) -> list[tuple[tuple[str, ...], tuple[str, ...]]]:
+    """
+    Work out which of a type's node fields flow into which from their names.
+    """
+    inlets: dict[tuple[str, ...], str] = {}
+    outlets: dict[tuple[str, ...], str] = {}
+    for field in node_fields:
+        words = _words(field)
+        key = tuple(word for word in words if word not in ("inlet", "outlet"))
+        if "inlet" in words:
+            inlets.setdefault(key, field)
+        elif "outlet" in words:
+            outlets.setdefault(key, field)
+    streams = [((inlets[key],), (outlets[key],)) for key in inlets if key in outlets]
+    unmatched_inlets = tuple(f for key, f in inlets.items() if key not in outlets)
+    unmatched_outlets = tuple(f for key, f in outlets.items() if key not in inlets)
+    if unmatched_inlets and unmatched_outlets:
+        streams.append((unmatched_inlets, unmatched_outlets))
+    return streams
+
+
+class ComponentMismatch(BaseModel):
+    # the branch listing the component, and the component, by node id in the
+    # `GraphStore`
+    branch: int
+    component: int
+    # 'inlet' or 'outlet'
+    end: str
+    # the node the branch names for the component
+    branch_node: str
+    # the nodes the component's own fields name at that end
+    component_nodes: list[str]
+
+
+class SideTrace(BaseModel):
+    side: str
+    inlets: list[str]
+    outlets: list[str]
+    # the fluid nodes reached from the inlets, nearest first
+    nodes: list[str]
+    # the objects the flow passes through, by node id in the `GraphStore`
+    objects: list[int]
+    # the outlets the flow does not reach
+    missing: list[str] = []
+    # where the flow stops short of an outlet
+    dead_ends: list[str] = []
+    # where the flow into a missing outlet starts
+    sources: list[str] = []
+    # branch components whose own nodes differ from the branch's
+    mismatched: list[ComponentMismatch] = []
+
+    @property
+    def ok(self) -> bool:
+        return (
+            bool(self.inlets)
+            and bool(self.outlets)
+            and not self.missing
+            and not self.mismatched
+        )
+
+
+class LoopTrace(BaseModel):
+    node: int
+    obj_type: str
+    name: str
+    sides: list[SideTrace]
+
+    @property
+    def ok(self) -> bool:
+        return all(side.ok for side in self.sides)
+
+
+class HVACNetwork:
+    """
+    The fluid nodes of a model, and the flows between them.
+
+    Fluid nodes are numbered from 0 and matched by name case-insensitively.
+    Each flow runs from one fluid node to another through an object, and
+    each use of a fluid node by an object's field is recorded as a
+    connection, whether or not fluid flows through it.
+    """
+
+    def __init__(self, store: GraphStore, idd: IDD):
+        """
+        Args:
+            store (GraphStore): The model's graph, e.g. from `build_graph_store`
+            idd (IDD): The IDD the graph was resolved with
+        """
+        self.store = store
+        self.names: list[str] = []
+        self._node_ids: dict[str, int] = {}
+        self.fields: list[str] = []
+        self._field_ids: dict[str, int] = {}
+        self.flow_sources = array("I")
+        self.flow_targets = array("I")
+        self.flow_objects = array("I")
+        self.connection_nodes = array("I")
+        self.connection_objects = array("I")
+        self.connection_fields = array("I")
+        # the nodes where fluid enters or leaves the model
+        self.boundary: set[int] = set()
+        # each loop object's sides, as (side, inlet nodes, outlet nodes)
+        self.loops: dict[int, list[tuple[str, list[int], list[int]]]] = {}
+        # branch components whose own nodes differ from the branch's
+        self.mismatches: list[ComponentMismatch] = []
+        self._build(idd)
+        self._downstream = _Adjacency(
+            self.n_nodes, self.flow_sources.tolist(), range(self.n_flows)
+        )
+        self._upstream = _Adjacency(
+            self.n_nodes, self.flow_targets.tolist(), range(self.n_flows)
+        )
+        self._connections = _Adjacency(
+            self.n_nodes,
+            self.connection_nodes.tolist(),
+            range(len(self.connection_nodes)),
+        )
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.names)
+
+    @property
+    def n_flows(self) -> int:
+        return len(self.flow_sources)
+
+    def node_id(self, name: str) -> Optional[int]:
+        return self._node_ids.get(name.upper())
+
+    def _node(self, name: str) -> int:
+        key = name.upper()
+        if key not in self._node_ids:
+            self._node_ids[key] = len(self.names)
+            self.names.append(name)
+        return self._node_ids[key]
+
+    def _field(self, field: str) -> int:
+        if field not in self._field_ids:
+            self._field_ids[field] = len(self.fields)
+            self.fields.append(field)
+        return self._field_ids[field]
+
+    def _node_fields(self, idd: IDD, obj_type: str) -> list[str]:
+        if obj_type not in self._type_node_fields:
+            schema = idd.schemas.get(obj_type)
+            object_list_fields = schema.object_list_fields if schema else {}
+            self._type_node_fields[obj_type] = [
+                field
+                for field, classes in object_list_fields.items()
+                if classes == [NODELIST_REFERENCE_CLASS]
+            ]
+        return self._type_node_fields[obj_type]
+
+    def _streams_of(
+        self, idd: IDD, obj_type: str
+    ) -> list[tuple[tuple[str, ...], tuple[str, ...]]]:
+        """
+        The flows through the objects of a type, as (inlet fields, outlet
+        fields) pairs.
+        """
+        if obj_type not in self._type_streams:
+            schema = idd.schemas.get(obj_type)
+            node_fields = self._node_fields(idd, obj_type)
+            if obj_type in STREAMS:
+                streams = STREAMS[obj_type]
+            elif (
+                not node_fields
+                or obj_type in LOOP_SIDES
+                or obj_type in _DECLARATIONS
+                or obj_type == "BRANCH"
+                or schema.header.group in CONTROL_GROUPS
+            ):
+                streams = []
+            else:
+                streams = _streams(node_fields)
+            self._type_streams[obj_type] = streams
+        return self._type_streams[obj_type]
+
+    def _build(self, idd: IDD):
+        store = self.store
+        self._type_node_fields: dict[str, list[str]] = {}
+        self._type_streams: dict[str, list] = {}
+
+        # NodeLists are expanded wherever a field may name one, so gather them
+        # first; their own name field is not a fluid node.
+        nodelists: dict[str, list[str]] = {}
+        # the first inlet and last outlet node of each branch, for connectors
+        branch_ends: dict[str, tuple[str, str]] = {}
+        # every object by upper-cased type and name, to find branch components
+        objects: dict[tuple[str, str], int] = {}
+        for node_id, type_id, fieldnames, fieldvalues in store.iter_fields():
+            obj_type = store.types[type_id].upper()
+            objects[(obj_type, store.names[node_id].upper())] = node_id
+            if obj_type == "NODELIST":
+                nodelists[store.names[node_id].upper()] = [
+                    value
+                    for value in fieldvalues[2:]
+                    if isinstance(value, str) and value
+                ]
+            elif obj_type == "BRANCH":
+                inlets = [
+                    value
+                    for field, value in zip(fieldnames, fieldvalues)
+                    if value and field.endswith("_Inlet_Node_Name")
+                ]
+                outlets = [
+                    value
+                    for field, value in zip(fieldnames, fieldvalues)
+                    if value and field.endswith("_Outlet_Node_Name")
+                ]
+                if inlets and outlets:
+                    branch_ends[store.names[node_id].upper()] = (inlets[0], outlets[-1])
+
+        def expand(value) -> list[str]:
+            if not isinstance(value, str) or not value:
+                return []
+            return nodelists.get(value.upper(), [value])
+
+        for node_id, type_id, fieldnames, fieldvalues in store.iter_fields():
+            obj_type = store.types[type_id].upper()
+            values = dict(zip(fieldnames, fieldvalues))
+            for field in self._node_fields(idd, obj_type):
+                if obj_type == "NODELIST" and field == "Name":
+                    continue
+                field_id = self._field(field)
+                for name in expand(values.get(field)):
+                    self.connection_nodes.append(self._node(name))
+                    self.connection_objects.append(node_id)
+                    self.connection_fields.append(field_id)
+                    if obj_type in _OUTDOOR_DECLARATIONS or field in EXITS.get(
+                        obj_type, ()
+                    ):
+                        self.boundary.add(self._node(name))
+
+            for inlet_fields, outlet_fields in self._streams_of(idd, obj_type):
+                sources = [
+                    self._node(name)
+                    for field in inlet_fields
+                    for name in expand(values.get(field))
+                ]
+                targets = [
+                    self._node(name)
+                    for field in outlet_fields
+                    for name in expand(values.get(field))
+                ]
+                self._add_flows(sources, targets, node_id)
+
+            if obj_type == "BRANCH":
+                # a branch's components carry their own flow, read from their
+                # own node fields; EnergyPlus requires the nodes the branch
+                # names for a component to be the component's own, so those
+                # are checked against them.  The branch only carries the flow
+                # of components whose fields do not say how they flow.
+                for component, fields in _branch_components(fieldnames):
+                    component_type = values.get(fields["Object_Type"])
+                    if not isinstance(component_type, str):
+                        continue
+                    inlets = expand(values.get(fields["Inlet_Node_Name"]))
+                    outlets = expand(values.get(fields["Outlet_Node_Name"]))
+                    streams = self._streams_of(idd, component_type.upper())
+                    if not streams:
+                        self._add_flows(
+                            [self._node(name) for name in inlets],
+                            [self._node(name) for name in outlets],
+                            node_id,
+                        )
+                        continue
+                    component_name = values.get(fields["Name"])
+                    component_id = objects.get(
+                        (component_type.upper(), str(component_name).upper())
+                    )
+                    if component_id is None:
+                        continue
+                    component_values = dict(
+                        zip(
+                            store.fieldnames(component_id),
+                            store.fieldvalues(component_id),
+                        )
+                    )
+                    for end, branch_nodes, component_fields in (
+                        ("inlet", inlets, [f for ins, _ in streams for f in ins]),
+                        ("outlet", outlets, [f for _, outs in streams for f in outs]),
+                    ):
+                        component_nodes = [
+                            name
+                            for field in component_fields
+                            for name in expand(component_values.get(field))
+                        ]
+                        own = {name.upper() for name in component_nodes}
+                        for name in branch_nodes:
+                            if name.upper() not in own:
+                                self.mismatches.append(
+                                    ComponentMismatch(
+                                        branch=node_id,
+                                        component=component_id,
+                                        end=end,
+                                        branch_node=name,
+                                        component_nodes=component_nodes,
+                                    )
+                                )
+
+            if obj_type in _CONNECTORS:
+                sources, targets = [], []
+                for field, value in zip(fieldnames, fieldvalues):
+                    words = _words(field)
+                    ends = branch_ends.get(value.upper()) if value else None
+                    if "branch" not in words or ends is None:
+                        continue
+                    if "inlet" in words:
+                        sources.append(self._node(ends[1]))
+                    elif "outlet" in words:
+                        targets.append(self._node(ends[0]))
+                self._add_flows(sources, targets, node_id)
+
+            if obj_type in LOOP_SIDES:
+                self.loops[node_id] = [
+                    (
+                        side,
+                        [self._node(name) for name in expand(values.get(inlet))],
+                        [self._node(name) for name in expand(values.get(outlet))],
+                    )
+                    for side, inlet, outlet in LOOP_SIDES[obj_type]
+                ]
+
+    def _add_flows(self, sources: list[int], targets: list[int], node_id: int):
+        for source in sources:
+            for target in targets:
+                if source != target:
+                    self.flow_sources.append(source)
+                    self.flow_targets.append(target)
+                    self.flow_objects.append(node_id)
+
+    def downstream(self, node: int) -> Iterator[tuple[int, int]]:
+        """
+        The (fluid node, object) pairs the fluid at a node flows on to.
+        """
+        for flow in self._downstream[node]:
+            yield self.flow_targets[flow], self.flow_objects[flow]
+
+    def upstream(self, node: int) -> Iterator[tuple[int, int]]:
+        """
+        The (fluid node, object) pairs the fluid at a node flows in from.
+        """
+        for flow in self._upstream[node]:
+            yield self.flow_sources[flow], self.flow_objects[flow]
+
+    def connections(self, node: int) -> list[tuple[int, str]]:
+        """
+        The (object, field) pairs which name a fluid node.
+        """
+        return [
+            (
+                self.connection_objects[connection],
+                self.fields[self.connection_fields[connection]],
+            )
+            for connection in self._connections[node]
+        ]
+
+    def _reach(
+        self, starts: list[int], adjacency: _Adjacency, ends: list[int]
+    ) -> tuple[list[int], list[int], list[int]]:
+        """
+        Walk the flows from some nodes, without walking on past `ends`.
+
+        Returns:
+            nodes (list[int]): The nodes reached, nearest first
+            objects (list[int]): The objects passed through, in order
+            stops (list[int]): The nodes reached with nowhere to go on to
+        """
+        ends = set(ends)
+        seen = set(starts)
+        queue = deque(starts)
+        nodes: list[int] = []
+        objects: dict[int, None] = {}
+        stops: list[int] = []
+        if adjacency is self._downstream:
+            endpoints = self.flow_targets
+        else:
+            endpoints = self.flow_sources
+        while queue:
+            node = queue.popleft()
+            nodes.append(node)
+            if node in ends:
+                continue
+            flows = adjacency[node]
+            if not flows:
+                stops.append(node)
+            for flow in flows:
+                objects[self.flow_objects[flow]] = None
+                other = endpoints[flow]
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        return nodes, list(objects), stops
+
+    def trace_side(self, side: str, inlets: list[int], outlets: list[int]) -> SideTrace:
+        """
+        Trace the flow from a side's inlet nodes towards its outlet nodes.
+        """
+        nodes, objects, stops = self._reach(inlets, self._downstream, outlets)
+        reached = set(nodes)
+        missing = [outlet for outlet in outlets if outlet not in reached]
+        sources: list[int] = []
+        if missing:
+            # walk back from the missing outlets to where their flow starts
+            _, _, sources = self._reach(missing, self._upstream, inlets)
+        passed = set(objects)
+        mismatched = [
+            mismatch
+            for mismatch in self.mismatches
+            if mismatch.component in passed
+            or self.node_id(mismatch.branch_node) in reached
+        ]
+        return SideTrace(
+            side=side,
+            inlets=[self.names[node] for node in inlets],
+            outlets=[self.names[node] for node in outlets],
+            nodes=[self.names[node] for node in nodes],
+            objects=objects,
+            missing=[self.names[node] for node in missing],
+            dead_ends=[
+                self.names[node]
+                for node in stops
+                if node not in outlets and node not in self.boundary
+            ],
+            sources=[
+                self.names[node]
+                for node in sources
+                if node not in inlets and node not in self.boundary
+            ],
+            mismatched=mismatched,
+        )
+
+    def find_loop(self, name: str) -> Optional[int]:
+        """
+        Find a loop object by name.
+        """
+        for node_id in self.loops:
+            if self.store.names[node_id].upper() == name.upper():
+                return node_id
+        return None
+
+    def trace(self, loop: int) -> LoopTrace:
+        """
+        Trace both sides of a loop end to end.
+
+        Args:
+            loop (int): The loop object's node id in the `GraphStore`
+        """
+        return LoopTrace(
+            node=loop,
+            obj_type=self.store.node_type(loop),
+            name=self.store.names[loop],
+            sides=[
+                self.trace_side(side, inlets, outlets)
+                for side, inlets, outlets in self.loops[loop]
+            ],
+        )
+
+    def trace_all(self) -> list[LoopTrace]:
+        return [self.trace(loop) for loop in self.loops]
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        """
+        Build a multi-edge directed graph over the fluid node names, with an
+        edge for each flow keyed by the node id of the object carrying it.
+        """
+        g = nx.MultiDiGraph()
+        g.add_nodes_from(self.names)
+        g.add_edges_from(
+            (
+                self.names[source],
+                self.names[target],
+                object_id,
+                {"type": self.store.node_type(object_id)},
+            )
+            for source, target, object_id in zip(
+                self.flow_sources, self.flow_targets, self.flow_objects
+            )
+        )
+        return g
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("idf", help="The IDF file to trace")
+    parser.add_argument("--idd", required=True, help="The Energy+.idd to read with")
+    args = parser.parse_args()
+
+    idd = load_idd_file(args.idd)
+    store = build_graph_store(parse_idf(args.idf, idd), idd, progress=False)
+    start = time.perf_counter()
+    network = HVACNetwork(store, idd)
+    traces = network.trace_all()
+    elapsed = time.perf_counter() - start
+    for trace in traces:
+        print(f"{trace.obj_type} '{trace.name}': {'ok' if trace.ok else 'BROKEN'}")
+        for side in trace.sides:
+            print(
+                f"    {side.side}: {len(side.nodes)} nodes, "
+                f"{len(side.objects)} objects"
+            )
+            if side.missing:
+                print(f"        does not reach {', '.join(side.missing)}")
+                print(f"        flow stops at {', '.join(side.dead_ends) or '-'}")
+                print(f"        which is fed from {', '.join(side.sources) or '-'}")
+            for mismatch in side.mismatched:
+                print(
+                    f"        branch '{store.names[mismatch.branch]}' names "
+                    f"'{mismatch.branch_node}' as the {mismatch.end} of "
+                    f"{store.node_type(mismatch.component)} "
+                    f"'{store.names[mismatch.component]}', which has "
+                    f"{', '.join(mismatch.component_nodes) or '-'}"
+                )
+    print(
+        f"Traced {len(traces)} loops over {network.n_nodes} fluid nodes and "
+        f"{network.n_flows} flows in {elapsed:.3f}s"
+    )
+    return 0 if all(trace.ok for trace in traces) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,20 @@
-from archetypal.idfclass import IDF
 import networkx as nx
-from typing import Optional, Annotated, Iterator, Union
-from pydantic import BaseModel, Field, BeforeValidator
+import re
+from os import PathLike
+from typing import (
+    TYPE_CHECKING,
+    ClassVar,
+    Literal,
+    Optional,
+    Annotated,
+    Iterator,
+    Union,
+)
+from pydantic import BaseModel, Field, BeforeValidator, PrivateAttr, create_model
+from string import ascii_letters, digits
+
+if TYPE_CHECKING:
+    from archetypal.idfclass import IDF
 
 
 # TODO: automatically define IDDField rather than
@@ -43,15 +56,366 @@ def join_arr_to_str(v):
     return " ".join(v)
 
 
+def make_bunch_name(field_name: str) -> str:
+    """
+    Convert an IDD field name to the attribute name eppy uses on an EpBunch,
+    e.g. 'Vertex 1 X-coordinate' becomes 'Vertex_1_Xcoordinate'.
+    """
+    legal_chars = ascii_letters + digits + " "
+    return "".join(c for c in field_name if c in legal_chars).replace(" ", "_")
+
+
+# Fields of type node may name either a single node or a NodeList, but the IDD
+# does not register NodeList names under any reference class, so they are
+# given a synthetic one.
+NODELIST_REFERENCE_CLASS = "NODELISTNAMES"
+
+
+# IDD directives look like '\field Name', '\minimum> 0' or '\extensible:4 ...'
+_IDD_DIRECTIVE = re.compile(r"\\([\w\-:]+[<>]?)\s*(.*)")
+_IDD_SEPARATORS = re.compile(r"[,;]")
+
+# How the native IDD parser stores each directive, keyed by its lower-cased
+# name, as (attribute name, kind).  Directives which are not listed, e.g.
+# \deprecated, are ignored, as the schema models have nowhere to put them.
+_HEADER_DIRECTIVES = {
+    "memo": ("memo", "text"),
+    "unique-object": ("unique_object", "flag"),
+    "format": ("format", "single"),
+    "min-fields": ("min_fields", "single"),
+    "required-object": ("required_object", "flag"),
+    "obsolete": ("obsolete", "single"),
+}
+_FIELD_DIRECTIVES = {
+    "field": ("name", "single"),
+    "default": ("default", "single"),
+    "note": ("note", "text"),
+    "type": ("type", "single"),
+    "key": ("key", "list"),
+    "minimum": ("minimum", "single"),
+    "maximum": ("maximum", "single"),
+    "minimum>": ("minimum_strict", "single"),
+    "maximum<": ("maximum_strict", "single"),
+    "retaincase": ("retaincase", "flag"),
+    "object-list": ("object_list", "list"),
+    "begin-extensible": ("begin_extensible", "flag"),
+    "required-field": ("required_field", "flag"),
+    "reference": ("reference", "list"),
+    "units": ("units", "single"),
+    "ip-units": ("ip_units", "single"),
+    "unitsbasedonfield": ("unitsbasedonfield", "single"),
+    "autocalculatable": ("autocalculatable", "flag"),
+    "reference-class-name": ("reference_class_name", "list"),
+    "autosizable": ("autosizable", "flag"),
+    "external-list": ("external_list", "single"),
+}
+
+
+def _apply_directive(
+    values: dict, directives: dict[str, tuple[str, str]], name: str, value: str
+):
+    if name not in directives:
+        return
+    attr, kind = directives[name]
+    if kind == "flag":
+        values[attr] = True
+    elif kind == "single":
+        if name == "field":
+            # eppy collapses runs of spaces in field names, e.g. in
+            # 'Temperature Gradient Upper  Bound', so bunch names match
+            value = " ".join(value.split())
+        # keep the first of duplicated singletons, e.g. '\units W' twice
+        values.setdefault(attr, value)
+    elif kind == "list":
+        values.setdefault(attr, []).append(value)
+    elif kind == "text":
+        # memo and note lines are joined into one paragraph
+        value = " ".join(value.split())
+        values[attr] = f"{values[attr]} {value}" if attr in values else value
+
+
+def _fill_extensible_gaps(fields: list[dict], field_ids: list[str]):
+    """
+    Name the fields which the IDD leaves unnamed, in place.
+
+    Extensible objects like Schedule:Compact only name their first few
+    repetitions.  As in eppy, the repetition is recovered from the names after
+    'begin-extensible' which contain a number, e.g. 'Vertex 1 X-coordinate',
+    and every field from the first repetition onwards is a copy of its
+    template with the number replaced.  Where there is no numbered name to go
+    on, the gaps are named by their IDD ids, e.g. 'N7', as eppy does, so the
+    field names match those of eppy's EpBunch objects.
+    """
+    if sum(1 for field in fields if "name" not in field) <= 2:
+        return
+    named = [field for field in fields if "name" in field]
+    start = next(
+        (i for i, field in enumerate(named) if field.get("begin_extensible")),
+        len(named) - 1,
+    )
+
+    def words(name: str) -> list[str]:
+        return make_bunch_name(name).split("_")
+
+    patterns: list[str] = []
+    templates: list[dict] = []
+    for field in named[max(start, 0) :]:
+        field_words = words(field["name"])
+        if not any(word.isdigit() for word in field_words):
+            continue
+        pattern = " ".join("{}" if word.isdigit() else word for word in field_words)
+        if pattern in patterns:
+            break
+        patterns.append(pattern)
+        templates.append(field)
+
+    first = next(
+        (
+            i
+            for i, field in enumerate(fields)
+            if patterns
+            and "name" in field
+            and words(field["name"]) == words(patterns[0].format(1))
+        ),
+        None,
+    )
+    if first is None:
+        gap = next(i for i, field in enumerate(fields) if "name" not in field)
+        for i in range(gap, len(fields)):
+            fields[i]["name"] = field_ids[i]
+        return
+
+    for j in range(len(fields) - first):
+        template = templates[j % len(templates)]
+        repetition = j // len(templates) + 1
+        if "name" in fields[first + j]:
+            continue
+        field = dict(template)
+        field["name"] = " ".join(
+            str(repetition) if word.isdigit() else word
+            for word in template["name"].split()
+        )
+        fields[first + j] = field
+
+
+def read_idd_version(path: Union[str, PathLike]) -> Optional[str]:
+    """
+    Read the EnergyPlus version from the '!IDD_Version' line of an IDD file.
+
+    Args:
+        path (Path): The IDD file
+
+    Returns:
+        version (str, optional): The version, e.g. '9.2.0', or None if the file
+            does not declare one before its first object
+    """
+    with open(path, encoding="latin-1") as f:
+        for line in f:
+            line = line.strip()
+            if line.upper().startswith("!IDD_VERSION"):
+                return line.split(maxsplit=1)[-1]
+            if line and not line.startswith("!"):
+                return None
+    return None
+
+
 # Type Alias for Singleton Lists
 ListAsJoinedStr = Optional[Annotated[str, BeforeValidator(join_arr_to_str)]]
 ListAsSingletonStr = Optional[Annotated[str, BeforeValidator(is_singleton)]]
 ListAsSingletonBoolean = Annotated[bool, BeforeValidator(is_boolean_singleton)]
 
 
+def strongly_connected(adjacency: list[tuple[int, ...]]) -> list[list[int]]:
+    """
+    Find the strongly connected components of a graph with Tarjan's algorithm,
+    without recursion.  Components come out in reverse topological order, i.e.
+    every component comes after all of the components it can reach.
+    """
+    n = len(adjacency)
+    order = [-1] * n
+    lowlink = [0] * n
+    on_stack = [False] * n
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+    for root in range(n):
+        if order[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, i = work.pop()
+            if i == 0:
+                order[v] = lowlink[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack[v] = True
+            recursed = False
+            for j in range(i, len(adjacency[v])):
+                w = adjacency[v][j]
+                if order[w] == -1:
+                    work.append((v, j + 1))
+                    work.append((w, 0))
+                    recursed = True
+                    break
+                if on_stack[w]:
+                    lowlink[v] = min(lowlink[v], order[w])
+            if recursed:
+                continue
+            if lowlink[v] == order[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component.append(w)
+                    if w == v:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[v])
+    return components
+
+
+def _transitive_closure(adjacency: list[tuple[int, ...]]) -> list[int]:
+    """
+    Compute, for each node, the bitset of the nodes reachable from it by one
+    or more steps.
+    """
+    closure = [0] * len(adjacency)
+    for component in strongly_connected(adjacency):
+        members = 0
+        for v in component:
+            members |= 1 << v
+        reach = 0
+        for v in component:
+            for w in adjacency[v]:
+                if not members >> w & 1:
+                    reach |= closure[w] | 1 << w
+        # nodes in a cycle can reach every node in it, themselves included
+        v = component[0]
+        if len(component) > 1 or v in adjacency[v]:
+            reach |= members
+        for v in component:
+            closure[v] = reach
+    return closure
+
+
+def _bits(bitset: int) -> Iterator[int]:
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+class IDDIndex:
+    """
+    Precomputed navigation tables over the object types of an IDD.
+
+    Types are numbered in IDD order.  Direct references, in both directions,
+    are tuples of type ids, and the types each type can reach through any
+    chain of references, in both directions, are bitsets held as Python ints,
+    so a reachability test is a single bit test.
+    """
+
+    __slots__ = (
+        "types",
+        "type_ids",
+        "type_groups",
+        "groups",
+        "references",
+        "referenced_by",
+        "reference_fields",
+        "reaches",
+        "reached_by",
+    )
+
+    def __init__(self, idd: "IDD"):
+        self.types: list[str] = list(idd.schemas)
+        self.type_ids: dict[str, int] = {t: i for i, t in enumerate(self.types)}
+        self.type_groups: list[str] = [idd.schemas[t].header.group for t in self.types]
+        # group -> type ids, with groups in the order they first appear
+        self.groups: dict[str, list[int]] = {}
+        for type_id, group in enumerate(self.type_groups):
+            self.groups.setdefault(group, []).append(type_id)
+
+        # (source, target) -> the fields of source which may refer to target
+        self.reference_fields: dict[tuple[int, int], list[str]] = {}
+        for source, schema in enumerate(idd.schemas.values()):
+            for field in schema:
+                for target in field.validobjects or ():
+                    target_id = self.type_ids.get(target.upper())
+                    if target_id is not None:
+                        self.reference_fields.setdefault(
+                            (source, target_id), []
+                        ).append(field.name)
+
+        forward: list[list[int]] = [[] for _ in self.types]
+        backward: list[list[int]] = [[] for _ in self.types]
+        for source, target in self.reference_fields:
+            forward[source].append(target)
+            backward[target].append(source)
+        self.references: list[tuple[int, ...]] = [tuple(v) for v in forward]
+        self.referenced_by: list[tuple[int, ...]] = [tuple(v) for v in backward]
+        self.reaches: list[int] = _transitive_closure(self.references)
+        self.reached_by: list[int] = _transitive_closure(self.referenced_by)
+
+    def _id(self, obj_type: str) -> int:
+        try:
+            return self.type_ids[obj_type.upper()]
+        except KeyError:
+            raise ValueError(
+                f"There is no object schema for '{obj_type}' registered in this IDD."
+            ) from None
+
+    def referenced_types(self, obj_type: str) -> list[str]:
+        """
+        The types which the fields of `obj_type` may refer to directly.
+        """
+        return [self.types[i] for i in self.references[self._id(obj_type)]]
+
+    def referencing_types(self, obj_type: str) -> list[str]:
+        """
+        The types with a field which may refer to `obj_type` directly.
+        """
+        return [self.types[i] for i in self.referenced_by[self._id(obj_type)]]
+
+    def fields_between(self, source: str, target: str) -> list[str]:
+        """
+        The fields of `source` which may refer to `target`.
+        """
+        return self.reference_fields.get((self._id(source), self._id(target)), [])
+
+    def can_reference(self, source: str, target: str) -> bool:
+        """
+        Whether `source` can refer to `target` through any chain of references.
+        """
+        return bool(self.reaches[self._id(source)] >> self._id(target) & 1)
+
+    def reachable_types(self, obj_type: str) -> list[str]:
+        """
+        The types `obj_type` can refer to through any chain of references.
+        """
+        return [self.types[i] for i in _bits(self.reaches[self._id(obj_type)])]
+
+    def referencing_closure(self, obj_type: str) -> list[str]:
+        """
+        The types which can ultimately refer to `obj_type`.
+        """
+        return [self.types[i] for i in _bits(self.reached_by[self._id(obj_type)])]
+
+    def types_in_group(self, group: str) -> list[str]:
+        return [self.types[i] for i in self.groups.get(group, [])]
+
+    def group_of(self, obj_type: str) -> str:
+        return self.type_groups[self._id(obj_type)]
+
+
 class IDD(BaseModel, extra="forbid"):
     schemas: dict[str, "IDDObjectSchema"] = {}
 
+    _reference_classes: Optional[dict[str, set[str]]] = PrivateAttr(default=None)
+    _index: Optional[IDDIndex] = PrivateAttr(default=None)
+
     def __len__(self) -> int:
         return len(self.schemas)
 
@@ -66,22 +430,162 @@ class IDD(BaseModel, extra="forbid"):
     def __iter__(self) -> Iterator["IDDObjectSchema"]:
         return iter(self.schemas.values())
 
+    @property
+    def reference_classes(self) -> dict[str, set[str]]:
+        """
+        Map from each (upper-cased) reference class name, e.g. 'ZONENAMES', to
+        the object types whose names are registered under that class.
+        """
+        if self._reference_classes is None:
+            reference_classes: dict[str, set[str]] = {}
+            for schema in self:
+                for classes in schema.reference_fields.values():
+                    for reference_class in classes:
+                        reference_classes.setdefault(reference_class, set()).add(
+                            schema.object_type
+                        )
+            self._reference_classes = reference_classes
+        return self._reference_classes
+
+    def names_objects(self, reference_classes: list[str]) -> bool:
+        """
+        Whether a field pointing into the given reference classes holds object
+        names, rather than node names or object types (e.g. a Branch's
+        component types), which no object is registered under.
+        """
+        registered = self.reference_classes
+        return reference_classes != [NODELIST_REFERENCE_CLASS] and any(
+            reference_class in registered for reference_class in reference_classes
+        )
+
+    @property
+    def index(self) -> IDDIndex:
+        """
+        Navigation tables over the object types, built on first access.
+        """
+        if self._index is None:
+            self._index = IDDIndex(self)
+        return self._index
+
     def make_graph(self):
         graph = nx.MultiDiGraph()
-        for source in self:
-            graph.add_node(source)
-
-        for source in self:
-            for field in source:
-                if field.validobjects is not None:
-                    for target in field.validobjects:
-                        assert target.upper() in self.schemas
-                        target = self.schemas[target.upper()]
-                        graph.add_edge(source, target, key=field.name)
+        schemas = list(self.schemas.values())
+        graph.add_nodes_from(schemas)
+        index = self.index
+        graph.add_edges_from(
+            (schemas[source], schemas[target], field)
+            for (source, target), fields in index.reference_fields.items()
+            for field in fields
+        )
         return graph
 
     @classmethod
-    def from_idf(cls, idf: IDF):
+    def from_idd_file(cls, path: Union[str, PathLike]) -> "IDD":
+        """
+        Parse an Energy+.idd file directly, in a single pass over its lines.
+
+        Directive values are stored in their final form as they are read, so
+        the schema models are built with `model_construct` and skip the
+        validators which `from_idf` needs to repair eppy's list-valued
+        `idd_info`.  No IDF needs to be loaded.
+
+        The `validobjects` of each field are filled in the same way as eppy
+        does: the object types whose 'Name' field is registered under the
+        field's first object-list.
+
+        Args:
+            path (Path): The IDD file to parse
+
+        Returns:
+            idd (IDD): The parsed IDD
+        """
+        idd = cls()
+        group = ""
+        # the directives of the object and field currently being read; an
+        # object's directives continue after its ';' until the next object
+        header_values: Optional[dict] = None
+        field_values: Optional[dict] = None
+        closed = True
+        fields: list[dict] = []
+        field_ids: list[str] = []
+        headers: list[tuple[str, dict, list[dict], list[str]]] = []
+
+        with open(path, encoding="latin-1") as f:
+            for line in f:
+                # '!' starts a comment unless it is part of a directive's text
+                comment_start = line.find("!")
+                directive_start = line.find("\\")
+                if comment_start >= 0 and not 0 <= directive_start < comment_start:
+                    line = line[:comment_start]
+                code, _, directive = line.partition("\\")
+                match = _IDD_DIRECTIVE.match("\\" + directive) if directive else None
+                if match is not None:
+                    name, value = match.group(1).lower(), match.group(2).strip()
+
+                if code.strip():
+                    tokens = [
+                        token.strip() for token in _IDD_SEPARATORS.split(code.strip())
+                    ]
+                    if not tokens[-1]:
+                        tokens.pop()
+                    if closed:
+                        # the first token names a new object; any further
+                        # tokens are fields listed on the same line
+                        object_type = tokens.pop(0)
+                        header_values = {"object_type": object_type, "group": group}
+                        fields, field_ids = [], []
+                        headers.append((object_type, header_values, fields, field_ids))
+                        field_values = None
+                    for field_id in tokens:
+                        field_values = {}
+                        fields.append(field_values)
+                        field_ids.append(field_id)
+                    closed = code.rstrip().endswith(";")
+
+                if match is None:
+                    continue
+                if name == "group":
+                    group = value
+                elif field_values is not None:
+                    _apply_directive(field_values, _FIELD_DIRECTIVES, name, value)
+                elif header_values is not None:
+                    if name.startswith("extensible:"):
+                        header_values["extensible"] = int(name.split(":")[-1])
+                    else:
+                        _apply_directive(header_values, _HEADER_DIRECTIVES, name, value)
+
+        # resolving the defaults of every field dominates model_construct, so
+        # fields are shallow copies of a prototype, which is safe as all of
+        # the defaults are immutable
+        field_prototype = IDDField.model_construct(name="")
+        for object_type, header_values, fields, field_ids in headers:
+            _fill_extensible_gaps(fields, field_ids)
+            schema = IDDObjectSchema.model_construct(
+                object_type=object_type.upper(),
+                header=IDDObjectHeader.model_construct(**header_values),
+                field_definitions={},
+            )
+            for field_values in fields:
+                if "name" in field_values:
+                    field = field_prototype.model_copy(update=field_values)
+                    schema.field_definitions[field.name] = field
+            idd.schemas[schema.object_type] = schema
+
+        # fill in validobjects like eppy's idd_index does
+        name_references: dict[str, set[str]] = {}
+        for schema in idd:
+            first_field = next(iter(schema), None)
+            if first_field is not None and first_field.name == "Name":
+                for reference in first_field.reference or []:
+                    name_references.setdefault(reference, set()).add(schema.object_type)
+        for schema in idd:
+            for field in schema:
+                if field.object_list and field.object_list[0] in name_references:
+                    field.validobjects = sorted(name_references[field.object_list[0]])
+        return idd
+
+    @classmethod
+    def from_idf(cls, idf: "IDF"):
         idd = cls()
         for idfobj_schema in idf.idd_info:
             idfobj_type = idfobj_schema[0]["idfobj"]
@@ -134,9 +638,21 @@ class IDDObjectSchema(BaseModel, extra="forbid"):
     header: IDDObjectHeader
     field_definitions: dict[str, "IDDField"] = {}
 
+    _reference_fields: Optional[dict[str, list[str]]] = PrivateAttr(default=None)
+    _object_list_fields: Optional[dict[str, list[str]]] = PrivateAttr(default=None)
+    _object_model: Optional[type["IDFObjectModel"]] = PrivateAttr(default=None)
+
     def __hash__(self):
         return hash(self.object_type)
 
+    def __getstate__(self):
+        # models made by `create_model` cannot be pickled; they are rebuilt
+        state = super().__getstate__()
+        private = state.get("__pydantic_private__")
+        if private and private.get("_object_model") is not None:
+            state["__pydantic_private__"] = {**private, "_object_model": None}
+        return state
+
     def __getitem__(self, field_name: str) -> "IDDField":
         if field_name in self.field_definitions:
             return self.field_definitions[field_name]
@@ -152,6 +668,41 @@ class IDDObjectSchema(BaseModel, extra="forbid"):
     def fields(self) -> set[str]:
         return set(self.field_definitions.keys())
 
+    @property
+    def reference_fields(self) -> dict[str, list[str]]:
+        """
+        Map from the EpBunch name of each field whose value is registered as a
+        reference (usually just 'Name') to its upper-cased reference classes.
+        """
+        if self._reference_fields is None:
+            self._reference_fields = {
+                field.bunch_name: [ref.upper() for ref in field.reference]
+                for field in self
+                if field.reference
+            }
+            if self.object_type == "NODELIST":
+                self._reference_fields["Name"] = [NODELIST_REFERENCE_CLASS]
+        return self._reference_fields
+
+    @property
+    def object_list_fields(self) -> dict[str, list[str]]:
+        """
+        Map from the EpBunch name of each field which points at another object
+        to the upper-cased reference classes it may point into.  Node fields
+        point into the NodeList names.
+        """
+        if self._object_list_fields is None:
+            object_list_fields: dict[str, list[str]] = {}
+            for field in self:
+                if field.object_list:
+                    object_list_fields[field.bunch_name] = [
+                        ref.upper() for ref in field.object_list
+                    ]
+                elif field.type == "node" and self.object_type != "NODELIST":
+                    object_list_fields[field.bunch_name] = [NODELIST_REFERENCE_CLASS]
+            self._object_list_fields = object_list_fields
+        return self._object_list_fields
+
 
 class IDDField(BaseModel, extra="forbid"):
     name: Annotated[
@@ -188,3 +739,107 @@ class IDDField(BaseModel, extra="forbid"):
     )
     autosizable: ListAsSingletonBoolean = Field(default=False)
     external_list: ListAsSingletonStr = Field(default=None, alias="external-list")
+
+    @property
+    def bunch_name(self) -> str:
+        return make_bunch_name(self.name)
+
+
+def _is_numeric(field: IDDField) -> bool:
+    if field.type in ("real", "integer"):
+        return True
+    # fields without a \type are usually numeric ones, and the bounds and
+    # autosizing directives are only used on numeric fields
+    return field.type is None and (
+        field.minimum is not None
+        or field.maximum is not None
+        or field.minimum_strict is not None
+        or field.maximum_strict is not None
+        or field.autosizable
+        or field.autocalculatable
+    )
+
+
+def _numeric_value(v):
+    if isinstance(v, str):
+        v = v.strip()
+        if v == "":
+            return None
+        if v.lower() in ("autosize", "autocalculate"):
+            return v.lower()
+    return v
+
+
+def _text_value(v):
+    v = str(v)
+    return v if v.strip() != "" else None
+
+
+NumericValue = Annotated[
+    Optional[Union[float, Literal["autosize", "autocalculate"]]],
+    BeforeValidator(_numeric_value),
+]
+TextValue = Annotated[Optional[str], BeforeValidator(_text_value)]
+
+
+class IDFObjectModel(BaseModel, extra="forbid", populate_by_name=True):
+    """
+    The base of the typed models built by `object_model`.
+
+    Blank fields are None, numeric fields are floats or 'autosize' or
+    'autocalculate', and the values of the extensible groups, which the IDD
+    does not bound, are kept as text in `extensible`.
+    """
+
+    # the model's field for each of the type's fields before its extensible
+    # groups, in IDD order
+    value_fields: ClassVar[tuple[str, ...]] = ()
+
+    extensible: list[TextValue] = []
+
+    @classmethod
+    def from_values(cls, fieldvalues: list) -> "IDFObjectModel":
+        """
+        Build a typed object from its raw field values, after its key.
+        """
+        n_fixed = len(cls.value_fields)
+        data = dict(zip(cls.value_fields, fieldvalues))
+        data["extensible"] = list(fieldvalues[n_fixed:])
+        return cls.model_validate(data)
+
+
+def object_model(schema: IDDObjectSchema) -> type[IDFObjectModel]:
+    """
+    Build a pydantic model of the objects of a type, with a typed field for
+    each of its fields.  The model is kept on the schema, so it lives as long
+    as the IDD does.
+
+    Fields are named as on an EpBunch, except that names pydantic cannot use
+    are prefixed with 'field_' and accept the EpBunch name as an alias.
+    """
+    if schema._object_model is not None:
+        return schema._object_model
+    fields = list(schema)
+    n_fixed = next(
+        (i for i, field in enumerate(fields) if field.begin_extensible), len(fields)
+    )
+    definitions = {}
+    for field in fields[:n_fixed]:
+        value_type = NumericValue if _is_numeric(field) else TextValue
+        name = field.bunch_name
+        if (
+            name.isidentifier()
+            and not name.startswith(("_", "model_"))
+            and not hasattr(IDFObjectModel, name)
+        ):
+            definitions[name] = (value_type, None)
+        else:
+            definitions[f"field_{name}"] = (value_type, Field(None, alias=name))
+    model = create_model(
+        re.sub(r"\W", "_", schema.object_type.title()),
+        __base__=IDFObjectModel,
+        **definitions,
+    )
+    model.value_fields = tuple(definitions)
+    schema._object_model = model
+    return model
@@ -1,164 +1,344 @@
 from tqdm.autonotebook import tqdm
-from archetypal.idfclass import IDF
 import networkx as nx
-from eppy.idf_msequence import Idf_MSequence as idfm
-from eppy.bunch_subclass import BadEPFieldError
-from geomeppy.patches import EpBunch
-from pydantic import BaseModel, UUID4, Field
-from uuid import uuid4
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
+
+from .idd import IDD
+from .parser import IDFObject
+from .profiling import Profiler, TypeTimer, profiled
+from .store import Edge, GraphStore, Node
+
+if TYPE_CHECKING:
+    # only for annotations; building a graph from parsed objects must not
+    # need archetypal or eppy
+    from archetypal.idfclass import IDF
+    from eppy.idf_msequence import Idf_MSequence as idfm
+    from geomeppy.patches import EpBunch
 
 
 # TODO: use data from pydantic IDD to setup dynamic object models
 
-# TODO: consider representing non-object entities in a separate graph,
-# e.g. supply/demand inlet/outlet nodes
+# Non-object entities, i.e. the fluid nodes joining HVAC components, are
+# modelled in a separate layer by `aiep.hvac.HVACNetwork`
 
-# TODO: consider adding utilities for analyzing orphans, disjoint subgraphs
-# etc.
 
+def build_name_index(store: GraphStore) -> dict[str, list[int]]:
+    """
+    Build a lookup table from object names to the nodes which carry them.
 
-class Node(BaseModel):
-    id: UUID4 = Field(..., default_factory=lambda: uuid4())
-    name: str
-    type: str
-    object: EpBunch
+    EnergyPlus treats object names case-insensitively, so the keys are the
+    upper-cased names.  Names are not unique across object types, so each key
+    maps to every node with that name.
 
-    class Config:
-        arbitrary_types_allowed = True
+    Args:
+        store (GraphStore): The nodes to index
 
-    def __hash__(self):
-        return hash(self.id.int)
+    Returns:
+        name_index (dict[str, list[int]]): A map from upper-cased names to node ids
+    """
+    name_index: dict[str, list[int]] = {}
+    for node_id, name in enumerate(store.names):
+        name_index.setdefault(name.upper(), []).append(node_id)
+    return name_index
 
 
-class Edge(BaseModel):
-    source: Node
-    target: Node
-    type: tuple[str, str]
-    field: str
+def build_reference_index(
+    store: GraphStore, idd: IDD
+) -> dict[str, dict[str, list[int]]]:
+    """
+    Build a lookup table from reference classes to the names registered in them.
 
-    def __hash__(self):
-        return hash(f"SOURCE:{self.source}_TARGET:{self.target}_FIELD:{self.field}")
+    The IDD marks fields (usually 'Name') with one or more reference classes,
+    e.g. a Zone's name is registered under 'ZoneNames' and
+    'ZoneAndZoneListNames'.  Fields which point at other objects declare the
+    reference classes they may point into with an object-list, so a field value
+    only needs to be looked up in the names of those classes.
 
+    Args:
+        store (GraphStore): The nodes to index
+        idd (IDD): The IDD describing the nodes' object types
 
-def create_graph(idf: IDF) -> tuple[list[Node], list[Edge], nx.MultiDiGraph]:
+    Returns:
+        reference_index (dict[str, dict[str, list[int]]]): A map from
+            upper-cased reference class names to a map from upper-cased names
+            to node ids
     """
-    Convert an IDF file to a graph represented as two lists, nodes and edges.
+    reference_index: dict[str, dict[str, list[int]]] = {}
+    type_reference_fields = [
+        idd[obj_type.upper()].reference_fields for obj_type in store.types
+    ]
+    for node_id, type_id, fieldnames, fieldvalues in store.iter_fields():
+        reference_fields = type_reference_fields[type_id]
+        if not reference_fields:
+            continue
+        for field, fieldvalue in zip(fieldnames, fieldvalues):
+            if field not in reference_fields or not isinstance(fieldvalue, str):
+                continue
+            for reference_class in reference_fields[field]:
+                reference_index.setdefault(reference_class, {}).setdefault(
+                    fieldvalue.upper(), []
+                ).append(node_id)
+    return reference_index
 
-    Each node stores its name, object type, and the original EpBunch object.
-    If the IDF object does not have a name (e.g. the 'VERSION' object), it is
-    named as the object type followed by an incrementing index.
 
-    Edges store the name of the source and the name of the target, as well as the
-    type of the edge, which is a tuple of the source and target object types,
-    as well as the field name associated with the connection.  This is useful for
-    distinguishing multi-edges, i.e. when a day is used in multiple schedules.
+def lookup_reference(
+    reference_index: dict[str, dict[str, list[int]]],
+    reference_classes: list[str],
+    fieldvalue: str,
+) -> list[int]:
+    """
+    Find the nodes named `fieldvalue` in any of the given reference classes.
 
     Args:
-        idf (IDF): The IDF to convert
+        reference_index (dict[str, dict[str, list[int]]]): The index built by
+            `build_reference_index`
+        reference_classes (list[str]): The upper-cased classes to search
+        fieldvalue (str): The name to look up
 
     Returns:
-        nodes (list[Node]): A list of the node objects
-        edges (list[Edge]): A list of the edge objects
-        graph (nx.MultiDiGraph): A multi-edge directed graph representing the IDF file.
+        candidates (list[int]): The distinct matching node ids
+    """
+    name = fieldvalue.upper()
+    if len(reference_classes) == 1:
+        return reference_index.get(reference_classes[0], {}).get(name, [])
+    candidates: dict[int, None] = {}
+    for reference_class in reference_classes:
+        for node_id in reference_index.get(reference_class, {}).get(name, []):
+            candidates[node_id] = None
+    return list(candidates)
+
+
+def iter_objects(
+    idf: Union["IDF", Iterable[IDFObject]], progress: bool = True
+) -> Iterator[tuple[str, Union["EpBunch", IDFObject]]]:
+    """
+    Iterate over the objects in a loaded IDF, or in a stream of parsed objects.
+
+    Args:
+        idf (Union[IDF, Iterable[IDFObject]]): A loaded IDF, or the objects
+            yielded by `aiep.parser.parse_idf`
+        progress (bool): Whether to show a progress bar
+
+    Yields:
+        objtype (str): The upper-cased object type
+        obj (Union[EpBunch, IDFObject]): The object
+    """
+    if hasattr(idf, "idfobjects"):
+        # iterate over all object types in file
+        for objtype in tqdm(idf.idfobjects.keys(), disable=not progress):
+            # get the associated objects for a particular type
+            objs: "idfm" = idf.idfobjects[objtype]
+            for obj in objs:
+                yield objtype, obj
+    else:
+        for obj in tqdm(idf, disable=not progress):
+            yield obj.type, obj
+
+
+def build_graph_store(
+    idf: Union["IDF", Iterable[IDFObject]],
+    idd: Optional[IDD] = None,
+    progress: bool = True,
+    profiler: Optional[Profiler] = None,
+) -> GraphStore:
+    """
+    Convert an IDF file to a graph held in a compact `GraphStore`.
+
+    Each node stores its name, object type, and the raw values of the
+    object's fields, which are copied into the store so that the original
+    objects (and, for a loaded IDF, eppy's object model) need not be kept
+    alive.  If the IDF object does not have a name (e.g. the 'VERSION'
+    object), it is named as the object type followed by an incrementing index.
+
+    Each edge runs from the node whose field holds a reference to the node it
+    refers to, and records the field name.  This is useful for distinguishing
+    multi-edges, i.e. when a day is used in multiple schedules.
+
+    Field values are matched against object names case-insensitively through a
+    name index built once up front, so edge building is linear in the number of
+    fields in the file.
+
+    If an IDD is provided, only fields with an object-list are treated as
+    references, and they are only matched against the names of objects in the
+    reference classes they list.  Otherwise any field value which happens to be
+    the name of some object is assumed to be a reference to it.
 
+    Instead of a loaded IDF, the objects streamed by `aiep.parser.parse_idf`
+    can be passed directly, which avoids loading the file through eppy.
 
+    Args:
+        idf (Union[IDF, Iterable[IDFObject]]): The IDF to convert
+        idd (IDD, optional): The IDD to resolve typed references with
+        progress (bool): Whether to show a progress bar
+        profiler (Profiler, optional): Records the time spent on the nodes,
+            the reference index and the edges, split by object type, and
+            counts the objects, fields, edges and unresolved references to
+            objects
+
+    Returns:
+        store (GraphStore): The nodes and edges of the IDF
     """
-    nodes: list[Node] = []
+    store = GraphStore()
     type_counts: dict[str, int] = {}
-    edges: list[Edge] = []
+    duped_nodes: list[int] = []
 
-    # iterate over all object types in file
-    for objtype in tqdm(idf.idfobjects.keys()):
-        # get the associated objects for a particular type
-        objs: idfm = idf.idfobjects[objtype]
-        for obj in objs:
+    with profiled(profiler, "graph.nodes") as span:
+        # when objects are streamed from the parser, this includes parsing
+        by_type = None if span is None else TypeTimer(span)
+        for objtype, obj in iter_objects(idf, progress=progress):
+            if by_type is not None and objtype != by_type.obj_type:
+                by_type.switch(objtype)
             # If the object has a name, use it, otherwise
             # use the objects type along with an incrementer
             try:
                 name = obj.Name
-            except BadEPFieldError as e:
+            # eppy's BadEPFieldError is an AttributeError
+            except AttributeError as e:
                 if objtype in type_counts:
                     type_counts[objtype] += 1
                 else:
                     type_counts[objtype] = 0
                 name = f"{objtype}_{type_counts[objtype]:03d}"
 
+            if store.find_node(objtype, name) is not None:
+                duped_nodes.append(store.n_nodes)
             # Save the node
-            node = Node(
-                name=name,
-                type=objtype,
-                object=obj,
-            )
-            nodes.append(node)
-
-    # make a hashmap for easy lookup
-    nodes_dict = {(obj.type, obj.name): obj for obj in nodes}
-    if len(nodes_dict) != len(nodes):
-        duped_nodes: list[Node] = []
-        node_counts = {}
-        for node in nodes:
-            if (node.type, node.name) in node_counts:
-                duped_nodes.append(node)
-                node_counts[node.name] += 1
-            else:
-                node_counts[node.name] = 1
-        for node in duped_nodes:
-            print(f"There are multiple nodes with the name {node.name}")
-
-    assert len(nodes_dict) == len(
-        nodes
-    ), f"There are multiple nodes with the same name!"
-    # Iterate over all nodes
-    for source in nodes:
-        # get the epbunch object
-        obj = source.object
-        # Iterate over field names
-        for field in obj.fieldnames:
-            # skip the name field
-            if field == "Name":
-                continue
-            # get the field value
-            fieldvalue = obj[field]
-            # make sure there's no weirdness...
-            assert type(fieldvalue) in [
-                str,
-                float,
-                int,
-            ], f"Found a field with an unsupported type: {field},{fieldvalue}"
-            # check that the field value is in the hashmap; if so, assume it
-            # is a reference to another object.
-            if fieldvalue in [
-                node_name for (node_type, node_name) in nodes_dict.keys()
-            ]:
-                # get the referenced object
-                # TODO: check the IDD for duplicate name case
-                candidate_nodes = list(
-                    filter(lambda obj: obj.name == fieldvalue, nodes_dict.values())
-                )
+            store.add_node(name, objtype, obj)
+        if by_type is not None:
+            by_type.stop()
+
+    for node_id in duped_nodes:
+        print(f"There are multiple nodes with the name {store.names[node_id]}")
+
+    assert len(duped_nodes) == 0, f"There are multiple nodes with the same name!"
+
+    # index the nodes by name once so that each field resolves in constant time
+    with profiled(profiler, "graph.index"):
+        if idd is None:
+            name_index = build_name_index(store)
+        else:
+            reference_index = build_reference_index(store, idd)
+            type_object_list_fields = [
+                idd[obj_type.upper()].object_list_fields for obj_type in store.types
+            ]
+            # node fields and fields naming object types are not expected to
+            # resolve to an object, so they are not counted as unresolved
+            type_counted_fields = [
+                {
+                    field
+                    for field, reference_classes in object_list_fields.items()
+                    if idd.names_objects(reference_classes)
+                }
+                for object_list_fields in type_object_list_fields
+            ]
+
+    n_fields = n_ambiguous = n_unresolved = 0
+    with profiled(profiler, "graph.edges") as span:
+        by_type = None if span is None else TypeTimer(span)
+        # Iterate over all nodes' raw field values
+        for source, type_id, fieldnames, fieldvalues in store.iter_fields():
+            if by_type is not None and store.types[type_id] != by_type.obj_type:
+                by_type.switch(store.types[type_id])
+            n_fields += len(fieldvalues)
+            if idd is not None:
+                object_list_fields = type_object_list_fields[type_id]
+                counted_fields = type_counted_fields[type_id]
+            # Iterate over field names and values together; indexing by field
+            # name is a linear scan over the field names.  Trailing fields which
+            # are not stored are blank and cannot be references.
+            for field, fieldvalue in zip(fieldnames, fieldvalues):
+                # skip the name field
+                if field == "Name":
+                    continue
+                # make sure there's no weirdness...
+                assert type(fieldvalue) in [
+                    str,
+                    float,
+                    int,
+                ], f"Found a field with an unsupported type: {field},{fieldvalue}"
+                # names are always strings, so numeric fields can never be references
+                if not isinstance(fieldvalue, str):
+                    continue
+                if idd is None:
+                    # check that the field value is in the index; if so, assume it
+                    # is a reference to another object.
+                    candidate_nodes = name_index.get(fieldvalue.upper())
+                else:
+                    # only fields with an object-list can be references, and only
+                    # to objects in the listed reference classes.
+                    reference_classes = object_list_fields.get(field)
+                    if reference_classes is None:
+                        continue
+                    candidate_nodes = lookup_reference(
+                        reference_index, reference_classes, fieldvalue
+                    )
+                    if not candidate_nodes and fieldvalue and field in counted_fields:
+                        n_unresolved += 1
+                if not candidate_nodes:
+                    continue
                 if len(candidate_nodes) > 1:
+                    n_ambiguous += 1
                     print(
-                        f"WARNING: Source Node {source.type}:{source.name} has multiple targets "
-                        f"for field:{field}! Candidates:"
+                        f"WARNING: Source Node {store.types[type_id]}:{store.names[source]} "
+                        f"has multiple targets for field:{field}! Candidates:"
                     )
                     for candidate in candidate_nodes:
-                        print(candidate)
+                        print(store.node(candidate))
                     continue
 
-                target = candidate_nodes[0]
                 # save the edge
-                edge = Edge(
-                    source=source,
-                    target=target,
-                    type=(source.type, target.type),
-                    field=field,
-                )
-                edges.append(edge)
-
-    # Create the multi-digraph
-    g = nx.MultiDiGraph()
-    for node in nodes:
-        g.add_node(node)
-    for edge in edges:
-        g.add_edge(edge.target, edge.source, edge.field, type=edge.type)
-
-    return nodes, edges, g
+                store.add_edge(source, candidate_nodes[0], field)
+        if by_type is not None:
+            by_type.stop()
+
+    if profiler is not None:
+        profiler.count("objects", store.n_nodes)
+        profiler.count("fields_scanned", n_fields)
+        profiler.count("edges", store.n_edges)
+        profiler.count("ambiguous_references", n_ambiguous)
+        if idd is not None:
+            profiler.count("unresolved_references", n_unresolved)
+    return store
+
+
+def create_graph(
+    idf: Union["IDF", Iterable[IDFObject]],
+    idd: Optional[IDD] = None,
+    profiler: Optional[Profiler] = None,
+    progress: bool = True,
+) -> tuple[list[Node], list[Edge], nx.MultiDiGraph]:
+    """
+    Convert an IDF file to a graph represented as two lists, nodes and edges.
+
+    Each node stores its name, object type, and the object itself: for a
+    loaded IDF, the original EpBunch object, and for parsed objects, an
+    `IDFObject` copy of its values.
+    Edges store the source and the target nodes, as well as the type of the
+    edge, which is a tuple of the source and target object types, and the
+    field name associated with the connection.
+
+    The graph is built with `build_graph_store` and then materialized as
+    pydantic models; working with the `GraphStore` directly avoids the cost of
+    the models on large files.
+
+    Args:
+        idf (Union[IDF, Iterable[IDFObject]]): The IDF to convert
+        idd (IDD, optional): The IDD to resolve typed references with
+        profiler (Profiler, optional): Records the time spent building the
+            store, as in `build_graph_store`, and materializing it
+        progress (bool): Whether to show a progress bar
+
+    Returns:
+        nodes (list[Node]): A list of the node objects
+        edges (list[Edge]): A list of the edge objects
+        graph (nx.MultiDiGraph): A multi-edge directed graph representing the IDF file.
+
+
+    """
+    store = build_graph_store(idf, idd, progress=progress, profiler=profiler)
+    with profiled(profiler, "graph.materialize"):
+        if hasattr(idf, "idfobjects"):
+            # the store copies the objects' values; hand back eppy's objects,
+            # which are iterated in the same order the nodes were added in
+            objects = [obj for _, obj in iter_objects(idf, progress=False)]
+            return store.materialize(objects)
+        return store.materialize()
@@ -0,0 +1,257 @@
+import io
+import re
+from functools import lru_cache
+from os import PathLike
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Iterator, Optional, Union
+
+from .idd import IDD, make_bunch_name
+
+if TYPE_CHECKING:
+    # only for annotations; parsing must not need eppy
+    from geomeppy.patches import EpBunch
+
+IDFSource = Union[str, PathLike, bytes, IO[str], IO[bytes]]
+
+_SEPARATORS = re.compile(r"([,;])")
+_UNITS = re.compile(r"\{.*?\}")
+
+
+class IDFObject:
+    """
+    A lightweight record of a single object parsed from an IDF file.
+
+    The record mimics the small part of the `EpBunch` interface used by
+    `create_graph`: `fieldnames` and `fieldvalues` both start with the object's
+    key, fields can be read by name with `obj[field]` or as attributes and set
+    with `obj[field] = value`, and `str(obj)` renders the object as IDF text.
+    Values are kept as the raw strings from the file.
+
+    `fieldnames` may be longer than `fieldvalues`, since objects of the same
+    type share one list of field names; as with eppy, fields which are not
+    stored read as blank.
+    """
+
+    __slots__ = ("key", "fieldnames", "fieldvalues")
+
+    def __init__(self, key: str, fieldnames: list[str], fieldvalues: list[str]):
+        self.key = key
+        self.fieldnames = fieldnames
+        self.fieldvalues = fieldvalues
+
+    @property
+    def type(self) -> str:
+        return self.key.upper()
+
+    def __getitem__(self, field: str) -> str:
+        try:
+            i = self.fieldnames.index(field)
+        except ValueError:
+            raise KeyError(f"{self.key} does not have a field called '{field}'.")
+        return self.fieldvalues[i] if i < len(self.fieldvalues) else ""
+
+    def __setitem__(self, field: str, value: str):
+        try:
+            i = self.fieldnames.index(field)
+        except ValueError:
+            raise KeyError(f"{self.key} does not have a field called '{field}'.")
+        if i >= len(self.fieldvalues):
+            self.fieldvalues.extend([""] * (i + 1 - len(self.fieldvalues)))
+        self.fieldvalues[i] = value
+
+    def __getattr__(self, field: str) -> str:
+        # only called for names which aren't slots, but slots can be unset
+        # while copying or unpickling
+        if field.startswith("__") or field in IDFObject.__slots__:
+            raise AttributeError(field)
+        try:
+            return self[field]
+        except KeyError as e:
+            raise AttributeError(str(e)) from None
+
+    def __len__(self) -> int:
+        return len(self.fieldvalues)
+
+    def __repr__(self) -> str:
+        return f"IDFObject({self.key!r}, {self.fieldvalues[1:3]!r}...)"
+
+    def __str__(self) -> str:
+        return format_object(self)
+
+
+def format_object(obj: Union[IDFObject, "EpBunch"]) -> str:
+    """
+    Render an object as IDF text, with each field on its own line followed by
+    a '!-' comment naming it.  The text starts with a newline, as eppy's does,
+    so that objects written one after another are separated by a blank line.
+
+    Args:
+        obj (Union[IDFObject, EpBunch]): The object to render
+
+    Returns:
+        text (str): The object's IDF text
+    """
+    fieldvalues = obj.fieldvalues
+    n_fields = len(fieldvalues) - 1
+    if n_fields == 0:
+        return f"\n{fieldvalues[0]};"
+    lines = ["", f"{fieldvalues[0]},"]
+    fieldnames = obj.fieldnames
+    for i in range(1, n_fields + 1):
+        line = f"    {fieldvalues[i]}{';' if i == n_fields else ','}"
+        line = line.ljust(30) if len(line) < 30 else line + "    "
+        lines.append(f"{line}!- {fieldnames[i].replace('_', ' ')}")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=1 << 16)
+def normalize_value(value: str) -> str:
+    """
+    Normalize a field value so that values EnergyPlus reads the same way
+    compare equal, e.g. '0.160' and '.16', or 'Yes' and 'YES'.
+    """
+    value = value.strip()
+    try:
+        return repr(float(value))
+    except ValueError:
+        return value.upper()
+
+
+def _open_source(source: IDFSource, encoding: str) -> IO[str]:
+    if isinstance(source, bytes):
+        return io.TextIOWrapper(io.BytesIO(source), encoding=encoding, errors="replace")
+    if isinstance(source, (str, PathLike)):
+        return open(Path(source), encoding=encoding, errors="replace")
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding=encoding, errors="replace")
+
+
+def tokenize_idf(
+    source: IDFSource, encoding: str = "utf-8"
+) -> Iterator[tuple[list[str], list[Optional[str]]]]:
+    """
+    Split an IDF into objects, one at a time.
+
+    Comments run from '!' to the end of the line.  The '!-' comments which
+    EnergyPlus and eppy write after each field are kept as field names, with
+    any units in curly braces removed.  Only the fields of the current object
+    are ever held in memory, so arbitrarily large files can be streamed.
+
+    Args:
+        source (IDFSource): A path, raw bytes, or an open text or binary file
+        encoding (str): The encoding to decode the file with
+
+    Yields:
+        values (list[str]): The object key followed by its field values
+        comments (list[Optional[str]]): The field name comment for each value,
+            or None where there wasn't one
+    """
+    f = _open_source(source, encoding)
+    try:
+        values: list[str] = []
+        comments: list[Optional[str]] = []
+        partial = ""
+        for line in f:
+            comment = None
+            comment_start = line.find("!")
+            if comment_start >= 0:
+                if line.startswith("!-", comment_start):
+                    comment = _UNITS.sub("", line[comment_start + 2 :]).strip()
+                line = line[:comment_start]
+            if not partial and not line.strip():
+                continue
+
+            n_terminated = 0
+            pieces = _SEPARATORS.split(line)
+            # pieces alternate between text and the separator which ends it
+            for i in range(0, len(pieces) - 1, 2):
+                values.append((partial + pieces[i]).strip())
+                comments.append(None)
+                partial = ""
+                n_terminated += 1
+                if pieces[i + 1] == ";":
+                    if comment and n_terminated == 1:
+                        comments[-1] = comment
+                    yield values, comments
+                    values, comments = [], []
+                    n_terminated = 0
+            partial += pieces[-1]
+
+            # the comment on a line names the last field completed on that line
+            if comment and n_terminated == 1 and len(values) > 1:
+                comments[-1] = comment
+        if values or partial.strip():
+            key = values[0] if values else partial.strip()
+            raise ValueError(
+                f"The IDF ends in the middle of a '{key}' object; is it missing a ';'?"
+            )
+    finally:
+        if f is not source:
+            f.close()
+
+
+def parse_idf(
+    source: IDFSource, idd: Optional[IDD] = None, encoding: str = "utf-8"
+) -> Iterator[IDFObject]:
+    """
+    Stream the objects of an IDF file without going through eppy.
+
+    Field names come from the IDD if one is given, falling back to the '!-'
+    comments in the file, and finally to 'Field_N'.  Extensible fields beyond
+    those listed in the IDD are named the same way.
+
+    Values are kept as written, as eppy reads them: case is preserved and
+    trailing blank fields are kept, so objects have the same fields as their
+    EpBunch.  Unlike eppy, numeric fields are not converted to floats.
+
+    Args:
+        source (IDFSource): A path, raw bytes, or an open text or binary file
+        idd (IDD, optional): The IDD to name the fields with
+        encoding (str): The encoding to decode the file with
+
+    Yields:
+        obj (IDFObject): Each object in the file, in file order
+    """
+    # field names are shared between all objects of a type
+    idd_fieldnames: dict[str, list[str]] = {}
+    for values, comments in tokenize_idf(source, encoding=encoding):
+        key = values[0]
+        obj_type = key.upper()
+        fieldnames = None
+        if idd is not None and obj_type in idd.schemas:
+            if obj_type not in idd_fieldnames:
+                idd_fieldnames[obj_type] = ["key"] + [
+                    field.bunch_name for field in idd.schemas[obj_type]
+                ]
+            fieldnames = idd_fieldnames[obj_type]
+            if len(fieldnames) < len(values):
+                fieldnames = fieldnames + [
+                    f"Field_{i}" for i in range(len(fieldnames), len(values))
+                ]
+        if fieldnames is None:
+            fieldnames = ["key"] + [
+                make_bunch_name(comment) if comment else f"Field_{i}"
+                for i, comment in enumerate(comments[1:], start=1)
+            ]
+        yield IDFObject(key, fieldnames, values)
+
+
+def read_idf_version(source: IDFSource, encoding: str = "utf-8") -> Optional[str]:
+    """
+    Find the EnergyPlus version an IDF was written for, from its Version object.
+
+    The file is only read up to the Version object, which is normally first.
+
+    Args:
+        source (IDFSource): A path, raw bytes, or an open text or binary file
+        encoding (str): The encoding to decode the file with
+
+    Returns:
+        version (str, optional): The version, e.g. '9.2', or None if the file
+            has no Version object
+    """
+    for values, _ in tokenize_idf(source, encoding=encoding):
+        if values[0].upper() == "VERSION":
+            return values[1] if len(values) > 1 else None
+    return None
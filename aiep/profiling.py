@@ -0,0 +1,467 @@
+"""
+Time and count the stages of loading a model and building its graph.
+
+Usage (from the repository root):
+
+    python -m aiep.profiling model.idf --idd path/to/Energy+.idd
+    python -m aiep.profiling model.idf --idd path/to/Energy+.idd --eppy
+    python -m aiep.profiling model.idf --jsonl profile.jsonl --trace-memory
+
+A `Profiler` records timed spans, which nest: e.g. the 'graph' span of a
+pipeline holds its 'graph.nodes', 'graph.index' and 'graph.edges' stages, and
+the stages which go over every object split their time by object type.  It
+also keeps counters, e.g. of the objects, fields scanned, edges and ambiguous
+references, and can record the peak memory allocated in each span through
+tracemalloc, which slows the traced code down severalfold.
+
+Each finished span is passed to the profiler's sinks: `LoggingSink` logs it,
+`JSONLinesSink` appends it to a file as a line of JSON, and
+`OpenTelemetrySink` exports it as an OpenTelemetry span, or keeps it in
+memory in OpenTelemetry's shape when the opentelemetry package is not
+installed.  Any object with an `emit(span)` method can be a sink.
+
+The pipeline's functions, e.g. `build_graph_store`, take an optional profiler
+and skip their instrumentation without one.
+"""
+
+import argparse
+import logging
+import secrets
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from itertools import count
+from pathlib import Path
+from typing import (
+    ContextManager,
+    Iterable,
+    Iterator,
+    Literal,
+    Optional,
+    Protocol,
+    Union,
+)
+
+from pydantic import BaseModel
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+Attribute = Union[str, int, float, bool]
+
+
+class Span(BaseModel):
+    name: str
+    span_id: int
+    parent_id: Optional[int] = None
+    # seconds since the epoch
+    start: float
+    seconds: float = 0.0
+    attributes: dict[str, Attribute] = {}
+    # the seconds spent on each object type, for stages which go over objects
+    type_seconds: dict[str, float] = {}
+    # the most memory allocated during the span, over what was allocated when
+    # it started, if the profiler traces memory
+    peak_bytes: Optional[int] = None
+
+
+class ProfileReport(BaseModel):
+    spans: list[Span]
+    counters: dict[str, int]
+    # the peak resident memory of the whole process so far
+    max_rss_bytes: Optional[int] = None
+
+    def seconds(self, name: str) -> float:
+        """
+        The total seconds spent in the spans with a name.
+        """
+        return sum(span.seconds for span in self.spans if span.name == name)
+
+    def slowest_types(self, name: str, n: int = 10) -> list[tuple[str, float]]:
+        """
+        The object types which took the longest in the spans with a name.
+        """
+        totals: Counter = Counter()
+        for span in self.spans:
+            if span.name == name:
+                totals.update(span.type_seconds)
+        return totals.most_common(n)
+
+    def table(self) -> str:
+        """
+        Render the spans as an indented table, in the order they started.
+        """
+        depths: dict[int, int] = {}
+        lines = [f"{'stage':<28} {'ms':>10} {'peak MB':>8}"]
+        for span in sorted(self.spans, key=lambda span: span.span_id):
+            depth = depths[span.span_id] = (
+                depths.get(span.parent_id, -1) + 1 if span.parent_id else 0
+            )
+            peak = "" if span.peak_bytes is None else f"{span.peak_bytes / 1e6:.2f}"
+            lines.append(
+                f"{'  ' * depth + span.name:<28} {span.seconds * 1000:>10.1f} "
+                f"{peak:>8}"
+            )
+        lines += [f"{name}: {value}" for name, value in self.counters.items()]
+        if self.max_rss_bytes is not None:
+            lines.append(f"max RSS: {self.max_rss_bytes / 1e6:.1f} MB")
+        return "\n".join(lines)
+
+
+class SpanSink(Protocol):
+    def emit(self, span: Span):
+        """
+        Record a finished span.  Spans finish innermost first.
+        """
+        ...
+
+
+class LoggingSink:
+    """
+    Logs each span as one line, e.g. `graph.edges 12.3 ms objects=410`.
+    """
+
+    def __init__(
+        self, logger: Optional[logging.Logger] = None, level: int = logging.INFO
+    ):
+        self.logger = logger or logging.getLogger("aiep.profiling")
+        self.level = level
+
+    def emit(self, span: Span):
+        attributes = " ".join(
+            f"{key}={value}" for key, value in span.attributes.items()
+        )
+        self.logger.log(
+            self.level, "%s %.1f ms %s", span.name, span.seconds * 1000, attributes
+        )
+
+
+class JSONLinesSink:
+    """
+    Appends each span to a file as a line of JSON.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.f = open(self.path, "a")
+
+    def emit(self, span: Span):
+        self.f.write(span.model_dump_json() + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class OpenTelemetrySink:
+    """
+    Exports spans through OpenTelemetry's tracing API, to whatever exporter
+    the tracer provider is configured with, e.g. an OTLP collector.
+
+    Without the opentelemetry package, or with `local=True`, each span is
+    instead kept in `records` as a dict in the shape of an OTLP span, as a
+    local stand-in.  Spans are held until their root span finishes, since
+    OpenTelemetry needs a span's parent before the span itself.
+    """
+
+    def __init__(self, tracer=None, local: bool = False):
+        """
+        Args:
+            tracer (opentelemetry.trace.Tracer, optional): The tracer to
+                export through; defaults to the global tracer provider's
+            local (bool): Keep the records in memory even if opentelemetry is
+                installed
+        """
+        self.trace = None
+        if not local:
+            try:
+                from opentelemetry import trace
+
+                self.trace = trace
+            except ImportError:
+                pass
+        self.tracer = tracer
+        if self.trace is not None and self.tracer is None:
+            self.tracer = self.trace.get_tracer("aiep")
+        self.records: list[dict] = []
+        self._pending: list[Span] = []
+
+    @staticmethod
+    def attributes(span: Span) -> dict[str, Attribute]:
+        attributes = dict(span.attributes)
+        for obj_type, seconds in span.type_seconds.items():
+            attributes[f"aiep.type_seconds.{obj_type}"] = seconds
+        if span.peak_bytes is not None:
+            attributes["aiep.peak_bytes"] = span.peak_bytes
+        return attributes
+
+    def emit(self, span: Span):
+        self._pending.append(span)
+        if span.parent_id is None:
+            spans, self._pending = self._pending, []
+            # parents finish after their children, so start with the root
+            spans.sort(key=lambda span: span.span_id)
+            if self.trace is not None:
+                self._export(spans)
+            else:
+                self._record(spans)
+
+    def _export(self, spans: list[Span]):
+        exported = {}
+        for span in spans:
+            parent = exported.get(span.parent_id)
+            context = None if parent is None else self.trace.set_span_in_context(parent)
+            start = int(span.start * 1e9)
+            otel_span = self.tracer.start_span(
+                span.name,
+                context=context,
+                start_time=start,
+                attributes=self.attributes(span),
+            )
+            otel_span.end(end_time=start + int(span.seconds * 1e9))
+            exported[span.span_id] = otel_span
+
+    def _record(self, spans: list[Span]):
+        trace_id = secrets.token_hex(16)
+        span_ids = {span.span_id: secrets.token_hex(8) for span in spans}
+        for span in spans:
+            start = int(span.start * 1e9)
+            self.records.append(
+                {
+                    "trace_id": trace_id,
+                    "span_id": span_ids[span.span_id],
+                    "parent_span_id": span_ids.get(span.parent_id),
+                    "name": span.name,
+                    "start_time_unix_nano": start,
+                    "end_time_unix_nano": start + int(span.seconds * 1e9),
+                    "attributes": self.attributes(span),
+                }
+            )
+
+
+class TypeTimer:
+    """
+    Splits a span's time by object type.  Objects of one type mostly come
+    together, so the clock is read when the type changes rather than for
+    every object.
+    """
+
+    def __init__(self, span: Span):
+        self.span = span
+        self.obj_type: Optional[str] = None
+        self.start = time.perf_counter()
+
+    def switch(self, obj_type: Optional[str]):
+        now = time.perf_counter()
+        if self.obj_type is not None:
+            type_seconds = self.span.type_seconds
+            type_seconds[self.obj_type] = (
+                type_seconds.get(self.obj_type, 0.0) + now - self.start
+            )
+        self.obj_type = obj_type
+        self.start = now
+
+    def stop(self):
+        self.switch(None)
+
+
+class Profiler:
+    """
+    Records spans and counters, and passes finished spans to its sinks.
+    """
+
+    def __init__(self, sinks: Iterable[SpanSink] = (), trace_memory: bool = False):
+        """
+        Args:
+            sinks (Iterable[SpanSink]): Where to send finished spans
+            trace_memory (bool): Whether to record each span's peak memory
+                through tracemalloc
+        """
+        self.sinks = list(sinks)
+        self.trace_memory = trace_memory
+        self.spans: list[Span] = []
+        self.counters: Counter = Counter()
+        self._ids = count(1)
+        # the open spans, each with the peak memory seen in it so far
+        self._open: list[tuple[Span, int]] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes: Attribute) -> Iterator[Span]:
+        """
+        Time a block as a span, nested in the innermost open span.
+        """
+        span = Span(
+            name=name,
+            span_id=next(self._ids),
+            parent_id=self._open[-1][0].span_id if self._open else None,
+            start=time.time(),
+            attributes=attributes,
+        )
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            current, peak = tracemalloc.get_traced_memory()
+            if self._open:
+                # resetting the peak loses the enclosing span's, so keep it
+                parent, parent_peak = self._open[-1]
+                self._open[-1] = (parent, max(parent_peak, peak))
+            tracemalloc.reset_peak()
+            baseline = current
+        self._open.append((span, 0))
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - start
+            _, span_peak = self._open.pop()
+            if self.trace_memory:
+                peak = max(span_peak, tracemalloc.get_traced_memory()[1])
+                span.peak_bytes = max(0, peak - baseline)
+                if self._open:
+                    parent, parent_peak = self._open[-1]
+                    self._open[-1] = (parent, max(parent_peak, peak))
+                if started_tracing:
+                    tracemalloc.stop()
+            self.spans.append(span)
+            for sink in self.sinks:
+                sink.emit(span)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def report(self) -> ProfileReport:
+        max_rss = None
+        if resource is not None:
+            # kilobytes on Linux
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return ProfileReport(
+            spans=list(self.spans), counters=dict(self.counters), max_rss_bytes=max_rss
+        )
+
+    def close(self):
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+
+def profiled(
+    profiler: Optional[Profiler], name: str, **attributes: Attribute
+) -> ContextManager[Optional[Span]]:
+    """
+    Open a span on a profiler, or do nothing without one; the block gets the
+    span, or None.
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.span(name, **attributes)
+
+
+def profile_pipeline(
+    path: Union[str, Path],
+    idd_path: Optional[Union[str, Path]] = None,
+    loader: Literal["parser", "eppy"] = "parser",
+    profiler: Optional[Profiler] = None,
+    materialize: bool = True,
+):
+    """
+    Load a model and build its graph, as the app does, timing each stage.
+
+    Args:
+        path (Union[str, Path]): The IDF file
+        idd_path (Union[str, Path], optional): The Energy+.idd; by default,
+            the one for the IDF's version.  Needed to load through eppy.
+        loader (Literal["parser", "eppy"]): Whether to read the file with
+            `aiep.parser.parse_idf`, or to load it with eppy and read its
+            IDD with `IDD.from_idf`
+        profiler (Profiler, optional): The profiler to record into; defaults
+            to a new one without sinks
+        materialize (bool): Whether to also build the pydantic models and the
+            networkx graph, as `create_graph` does
+
+    Returns:
+        store (GraphStore): The model's graph
+        report (ProfileReport): The profile
+    """
+    # imported here since the pipeline's modules import this one
+    from .cache import load_idd_file, load_idd_version
+    from .idd import IDD
+    from .idf import build_graph_store
+    from .parser import parse_idf, read_idf_version
+
+    profiler = profiler or Profiler()
+    with profiler.span("pipeline", path=str(path), loader=loader):
+        if loader == "eppy":
+            from eppy.modeleditor import IDF
+
+            if idd_path is None:
+                raise ValueError("Loading through eppy needs an Energy+.idd.")
+            with profiler.span("load"):
+                IDF.setiddname(str(idd_path))
+                loaded = IDF(str(path))
+            with profiler.span("idd"):
+                idd = IDD.from_idf(loaded)
+        else:
+            with profiler.span("idd"):
+                if idd_path is not None:
+                    idd = load_idd_file(idd_path)
+                else:
+                    version = read_idf_version(path)
+                    if version is None:
+                        raise ValueError("The IDF has no Version object.")
+                    idd = load_idd_version(version)
+            with profiler.span("load"):
+                loaded = list(parse_idf(path, idd))
+        with profiler.span("graph"):
+            store = build_graph_store(loaded, idd, progress=False, profiler=profiler)
+        if materialize:
+            with profiler.span("graph.materialize"):
+                store.materialize()
+    return store, profiler.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("idf", help="The IDF to load")
+    parser.add_argument(
+        "--idd", help="The Energy+.idd; by default, the IDF's version's"
+    )
+    parser.add_argument(
+        "--eppy", action="store_true", help="Load through eppy rather than the parser"
+    )
+    parser.add_argument("--jsonl", help="Also append the spans to this JSON lines file")
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Record each stage's peak memory, which slows it down",
+    )
+    parser.add_argument(
+        "--types", type=int, default=5, help="How many of the slowest types to list"
+    )
+    args = parser.parse_args()
+
+    sinks = [JSONLinesSink(args.jsonl)] if args.jsonl else []
+    profiler = Profiler(sinks, trace_memory=args.trace_memory)
+    _, report = profile_pipeline(
+        args.idf,
+        args.idd,
+        loader="eppy" if args.eppy else "parser",
+        profiler=profiler,
+    )
+    profiler.close()
+    print(report.table())
+    for stage in ("graph.nodes", "graph.edges"):
+        slowest = ", ".join(
+            f"{obj_type} {seconds * 1000:.1f} ms"
+            for obj_type, seconds in report.slowest_types(stage, args.types)
+        )
+        print(f"slowest in {stage}: {slowest}")
+
+
+if __name__ == "__main__":
+    main()
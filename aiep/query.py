@@ -0,0 +1,815 @@
+"""
+Query the objects of a model by type and field values, and follow their
+references.
+
+Usage (from the repository root):
+
+    python -m aiep.query model.idf "ZONE[Floor_Area > 100]" --idd path/to/Energy+.idd
+    python -m aiep.query model.idf "CONSTRUCTION <- BUILDINGSURFACE:DETAILED.Construction_Name" --explain
+
+Queries can be built in Python:
+
+    engine = QueryEngine(store)
+    zones = engine.select("Zone").where("Floor_Area", ">", 100)
+    walls = (
+        engine.select("BuildingSurface:Detailed")
+        .where("Surface_Type", "=", "Wall")
+        .where("Outside_Boundary_Condition", "=", "Outdoors")
+        .where_refers("Zone_Name", zones)
+    )
+    walls.follow("Construction_Name").names()
+
+or written as text, which is easier for an agent:
+
+    BUILDINGSURFACE:DETAILED[Surface_Type = Wall,
+        Outside_Boundary_Condition = Outdoors,
+        Zone_Name -> ZONE[Floor_Area > 100]] -> Construction_Name
+
+A query starts from the objects of a type, filtered by the predicates in
+brackets: `field op value`, where op is one of = != < <= > >=, or `in` with
+values separated by '|', or `field -> query` for the objects whose field
+refers to an object the inner query finds.  Then `-> field` moves to the
+objects referred to through a field, and `<- TYPE.field` to the objects of a
+type which refer to them through a field, each optionally filtered in turn.
+
+Values are compared as EnergyPlus reads them: text case-insensitively and
+numbers by value, so '.16' = 0.160, and range predicates only match numbers.
+Fields are named as on an EpBunch, e.g. 'Zone_Name', or as in the IDD, e.g.
+'Zone Name'.
+
+The engine reads the store's per-type tables, and the first time a query
+filters on a field it builds that field's column, and a hash index for
+equality predicates or a sorted index for range predicates, which later
+queries reuse.  The references through a field are gathered into arrays the
+first time a query follows one, and following them, either way, is a numpy
+set operation over those arrays.  Each query is compiled once into a
+plan, which starts from an index where one of its predicates can use one and
+checks the rest only on the objects found, and plans are cached by query.
+"""
+
+import argparse
+import math
+import operator
+import time
+from functools import lru_cache
+from typing import Any, Callable, Optional, Union
+
+import networkx as nx
+import numpy as np
+
+from .cache import load_idd_file
+from .idd import IDD, make_bunch_name
+from .parser import IDFObject, normalize_value
+from .store import GraphStore, Node
+
+OPS = ("=", "!=", "<", "<=", ">", ">=", "in")
+RANGE_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+# the order a stage's predicates are checked in, most selective and cheapest
+# first; callables and references go last
+PREDICATE_ORDER = {"=": 0, "in": 1, "<": 2, "<=": 2, ">": 2, ">=": 2, "!=": 3}
+
+Value = Union[str, float, int]
+Step = tuple
+EMPTY = np.array([], dtype=np.int64)
+
+
+@lru_cache(maxsize=1 << 16)
+def _parse_number(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _number(value: Value) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return _parse_number(value)
+
+
+def _key(value: Value) -> str:
+    return normalize_value(str(value))
+
+
+def _predicate(
+    op: Union[str, Callable[[Value], bool]], value: Any
+) -> tuple[str, Callable[[np.ndarray], np.ndarray]]:
+    """
+    Make the function checking a column of values against a predicate.
+
+    Returns:
+        column (str): Which column of the field the function checks: 'raw'
+            values, normalized 'key's or 'number's
+        check (Callable[[np.ndarray], np.ndarray]): The function, returning
+            whether each value matches
+    """
+    if callable(op):
+        return "raw", lambda column: np.fromiter(
+            map(op, column), dtype=bool, count=len(column)
+        )
+    if op == "=":
+        key = _key(value)
+        return "key", lambda column: column == key
+    if op == "!=":
+        key = _key(value)
+        return "key", lambda column: column != key
+    if op == "in":
+        keys = {_key(v) for v in value}
+        return "key", lambda column: np.fromiter(
+            map(keys.__contains__, column), dtype=bool, count=len(column)
+        )
+    bound = _number(value)
+    if bound is None:
+        raise ValueError(f"'{op}' needs a number, not '{value}'.")
+    # comparisons with NaN, i.e. values which are not numbers, are false
+    compare = RANGE_OPS[op]
+    return "number", lambda column: compare(column, bound)
+
+
+def _describe(step: Step) -> str:
+    if step[0] == "refers":
+        return f"{step[1]} -> ({_text(step[2])})"
+    _, field, op, value = step
+    if callable(op):
+        return f"{field} matches {getattr(op, '__name__', 'predicate')}"
+    if op == "in":
+        return f"{field} in {'|'.join(map(str, value))}"
+    return f"{field} {op} {value}"
+
+
+def _text(steps: tuple[Step, ...]) -> str:
+    """
+    Render steps back as a text query.
+    """
+    parts: list[str] = []
+    for step in steps:
+        if step[0] in ("where", "refers"):
+            predicate = _describe(step)
+            if parts[-1].endswith("]"):
+                parts[-1] = parts[-1][:-1] + f", {predicate}]"
+            else:
+                parts[-1] += f"[{predicate}]"
+        elif step[0] == "select":
+            parts.append(step[1])
+        elif step[0] == "follow":
+            parts.append(f"-> {step[1]}")
+        else:
+            parts.append(f"<- {step[1]}.{step[2]}")
+    return " ".join(parts)
+
+
+class _Parser:
+    """
+    Reads a text query into steps, by recursive descent.
+    """
+
+    STOPS = ("[", "]", ",", "->", "<-")
+    COMPARISONS = (">=", "<=", "!=", "==", "=", ">", "<")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(
+            f"{message} at character {self.pos} of the query: "
+            f"{self.text[:self.pos]}<here>{self.text[self.pos:]}"
+        )
+
+    def skip_space(self):
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def take(self, token: str) -> bool:
+        self.skip_space()
+        if self.text.startswith(token, self.pos):
+            self.pos += len(token)
+            return True
+        return False
+
+    def read_until(self, *stops: str) -> str:
+        end = min(
+            (i for i in (self.text.find(stop, self.pos) for stop in stops) if i >= 0),
+            default=len(self.text),
+        )
+        text, self.pos = self.text[self.pos : end], end
+        return text.strip()
+
+    def parse(self) -> tuple[Step, ...]:
+        steps = self.query()
+        self.skip_space()
+        if self.pos != len(self.text):
+            raise self.error("Unexpected text")
+        return steps
+
+    def query(self) -> tuple[Step, ...]:
+        obj_type = self.read_until(*self.STOPS)
+        if not obj_type:
+            raise self.error("Expected an object type")
+        steps: list[Step] = [("select", obj_type.upper())]
+        steps += self.filters()
+        while True:
+            if self.take("->"):
+                field = self.read_until(*self.STOPS)
+                if not field:
+                    raise self.error("Expected a field to follow")
+                steps.append(("follow", field))
+            elif self.take("<-"):
+                obj_type, _, field = self.read_until(*self.STOPS).rpartition(".")
+                if not obj_type or not field:
+                    raise self.error("Expected TYPE.field to follow back")
+                steps.append(("back", obj_type.strip().upper(), field.strip()))
+            else:
+                return tuple(steps)
+            steps += self.filters()
+
+    def filters(self) -> list[Step]:
+        if not self.take("["):
+            return []
+        steps = [self.predicate()]
+        while self.take(","):
+            steps.append(self.predicate())
+        if not self.take("]"):
+            raise self.error("Expected ']'")
+        return steps
+
+    def predicate(self) -> Step:
+        field = self.read_until("->", " in ", *self.COMPARISONS, ",", "]")
+        if not field:
+            raise self.error("Expected a field")
+        if self.take("->"):
+            return ("refers", field, self.query())
+        for op in self.COMPARISONS:
+            if self.take(op):
+                return ("where", field, "=" if op == "==" else op, self.value())
+        if self.take("in"):
+            values = [self.value("|")]
+            while self.take("|"):
+                values.append(self.value("|"))
+            return ("where", field, "in", tuple(values))
+        raise self.error(f"Expected one of {', '.join(OPS)} or '->'")
+
+    def value(self, *stops: str) -> str:
+        """
+        Read a value, quoted or running up to the end of the predicate or
+        any of the given stops.
+        """
+        self.skip_space()
+        quote = self.text[self.pos : self.pos + 1]
+        if quote in ("'", '"'):
+            end = self.text.find(quote, self.pos + 1)
+            if end < 0:
+                raise self.error("Unclosed quote")
+            value, self.pos = self.text[self.pos + 1 : end], end + 1
+            return value
+        return self.read_until(",", "]", *stops)
+
+
+@lru_cache(maxsize=1024)
+def parse_query(text: str) -> tuple[Step, ...]:
+    """
+    Parse a text query into the steps of a `Query`.
+    """
+    return _Parser(text).parse()
+
+
+class Query:
+    """
+    A query over the objects of one model.  Queries are immutable; each
+    method returns a new query with one more step.
+    """
+
+    def __init__(self, engine: "QueryEngine", steps: tuple[Step, ...]):
+        self.engine = engine
+        self.steps = steps
+
+    def _then(self, step: Step) -> "Query":
+        return Query(self.engine, self.steps + (step,))
+
+    def where(
+        self,
+        field: str,
+        op: Union[str, Callable[[Value], bool]],
+        value: Any = None,
+    ) -> "Query":
+        """
+        Keep the objects whose field matches.
+
+        Args:
+            field (str): The field to check
+            op (Union[str, Callable[[Value], bool]]): One of `OPS`, or a
+                function of the raw field value
+            value (Any): What to compare with; an iterable of values for 'in'
+        """
+        if callable(op):
+            return self._then(("where", field, op, None))
+        op = "=" if op == "==" else op
+        if op not in OPS:
+            raise ValueError(f"Unknown operator '{op}'; expected one of {OPS}.")
+        if op == "in":
+            value = tuple(value)
+        return self._then(("where", field, op, value))
+
+    def where_refers(self, field: str, query: "Query") -> "Query":
+        """
+        Keep the objects whose field refers to an object the query finds.
+        """
+        return self._then(("refers", field, query.steps))
+
+    def follow(self, field: str) -> "Query":
+        """
+        Move to the objects referred to through a field.
+        """
+        return self._then(("follow", field))
+
+    def referenced_by(self, obj_type: str, field: str) -> "Query":
+        """
+        Move to the objects of a type which refer to these through a field.
+        """
+        return self._then(("back", obj_type.upper(), field))
+
+    def ids(self) -> list[int]:
+        """
+        The ids of the objects found, in the order of the store.
+        """
+        return self.engine.run(self.steps).tolist()
+
+    def count(self) -> int:
+        return len(self.engine.run(self.steps))
+
+    def names(self) -> list[str]:
+        names = self.engine.store.names
+        return [names[node_id] for node_id in self.ids()]
+
+    def objects(self) -> list[IDFObject]:
+        return [self.engine.store.object(node_id) for node_id in self.ids()]
+
+    def nodes(self) -> list[Node]:
+        return [self.engine.node(node_id) for node_id in self.ids()]
+
+    def rows(self, *fields: str) -> list[dict[str, Value]]:
+        """
+        The type, name and the given fields of each object found, with ''
+        for the fields an object's type does not have.
+        """
+        store = self.engine.store
+        rows = []
+        for node_id in self.ids():
+            row = {"type": store.node_type(node_id), "name": store.names[node_id]}
+            for field in fields:
+                try:
+                    row[field] = self.engine.value(node_id, field)
+                except KeyError:
+                    row[field] = ""
+            rows.append(row)
+        return rows
+
+    def explain(self) -> str:
+        """
+        Describe how the query runs, one operation per line.
+        """
+        return "\n".join(self.engine.plan(self.steps).describe())
+
+    def __str__(self) -> str:
+        return _text(self.steps)
+
+    def __repr__(self) -> str:
+        return f"Query({str(self)!r})"
+
+
+class _Plan:
+    """
+    A compiled query: operations from an array of node ids to another, each
+    with a description, and the plan of the subquery it runs, if any.
+    """
+
+    def __init__(self):
+        self.operations: list[
+            tuple[Callable[[np.ndarray], np.ndarray], str, Optional["_Plan"]]
+        ] = []
+
+    def add(
+        self,
+        operation: Callable[[np.ndarray], np.ndarray],
+        description: str,
+        subplan: Optional["_Plan"] = None,
+    ):
+        self.operations.append((operation, description, subplan))
+
+    def run(self) -> np.ndarray:
+        ids = EMPTY
+        for operation, _, _ in self.operations:
+            ids = operation(ids)
+        return ids
+
+    def describe(self, depth: int = 0) -> list[str]:
+        lines = []
+        for _, description, subplan in self.operations:
+            lines.append("  " * depth + description)
+            if subplan is not None:
+                lines += subplan.describe(depth + 1)
+        return lines
+
+
+class QueryEngine:
+    """
+    Runs queries over a `GraphStore`, building indexes as queries need them.
+    The indexes reflect the store when they are built, so make a new engine
+    after changing the store.
+    """
+
+    def __init__(
+        self,
+        store: GraphStore,
+        idd: Optional[IDD] = None,
+        max_plans: int = 256,
+    ):
+        """
+        Args:
+            store (GraphStore): The model's graph, e.g. from `build_graph_store`
+            idd (IDD, optional): The model's IDD, so that fields no object
+                of a type has filled in can still be queried
+            max_plans (int): The number of compiled plans to keep
+        """
+        self.store = store
+        self.idd = idd
+        self.max_plans = max_plans
+        self._graph_nodes: Optional[list[Node]] = None
+        self._type_ids = {obj_type.upper(): i for i, obj_type in enumerate(store.types)}
+        self._node_types = np.array(store.node_types, dtype=np.int64)
+        self._node_rows = np.array(store.node_rows, dtype=np.int64)
+        # the node ids of each type, by row of its table
+        by_type = np.argsort(self._node_types, kind="stable")
+        counts = np.bincount(self._node_types, minlength=len(store.types))
+        self._ids_by_type: list[np.ndarray] = np.split(by_type, np.cumsum(counts)[:-1])
+        self._positions: dict[tuple[int, str], Optional[int]] = {}
+        self._columns: dict[tuple[int, str, str], np.ndarray] = {}
+        self._hash_indexes: dict[tuple[int, str], dict[str, list[int]]] = {}
+        self._sorted_indexes: dict[tuple[int, str], tuple[np.ndarray, np.ndarray]] = {}
+        self._edges: dict[Optional[int], tuple[np.ndarray, np.ndarray]] = {}
+        self._plans: dict[tuple[Step, ...], _Plan] = {}
+
+    @classmethod
+    def from_graph(
+        cls, graph: nx.MultiDiGraph, idd: Optional[IDD] = None
+    ) -> "QueryEngine":
+        """
+        Make an engine over the graph made by `create_graph`, whose edges
+        point from the referenced object to the object referring to it.
+        Queries return its `Node`s from `Query.nodes`.
+        """
+        store = GraphStore()
+        node_ids = {}
+        for node in graph.nodes:
+            node_ids[node] = store.add_node(node.name, node.type, node.object)
+        for target, source, field in graph.edges(keys=True):
+            store.add_edge(node_ids[source], node_ids[target], field)
+        engine = cls(store, idd)
+        engine._graph_nodes = list(node_ids)
+        return engine
+
+    def select(self, obj_type: str) -> Query:
+        """
+        Start a query from the objects of a type.
+        """
+        return Query(self, (("select", obj_type.upper()),))
+
+    def query(self, text: str) -> Query:
+        """
+        Parse a text query; see the module's documentation for the syntax.
+        """
+        return Query(self, parse_query(text))
+
+    def node(self, node_id: int) -> Node:
+        if self._graph_nodes is not None:
+            return self._graph_nodes[node_id]
+        return self.store.node(node_id)
+
+    def _type_id(self, obj_type: str) -> Optional[int]:
+        return self._type_ids.get(obj_type.upper())
+
+    def _position(self, type_id: int, field: str) -> Optional[int]:
+        """
+        The position of a field in the values of a type's objects, or None
+        if the IDD names the field but no object of the type fills it in.
+        """
+        key = (type_id, field)
+        if key not in self._positions:
+            fieldnames = self.store.tables[type_id].fieldnames
+            obj_type = self.store.types[type_id]
+            for name in (field, make_bunch_name(field)):
+                if name in fieldnames:
+                    self._positions[key] = fieldnames.index(name)
+                    break
+            else:
+                schema = None
+                if self.idd is not None and obj_type.upper() in self.idd.schemas:
+                    schema = self.idd[obj_type.upper()]
+                if schema is None or make_bunch_name(field) not in {
+                    f.bunch_name for f in schema
+                }:
+                    raise KeyError(f"{obj_type} has no field '{field}'.")
+                self._positions[key] = None
+        return self._positions[key]
+
+    def column(self, type_id: int, field: str, kind: str = "raw") -> np.ndarray:
+        """
+        A field of each object of a type, by row.
+
+        Args:
+            type_id (int): The type's index in the store
+            field (str): The field
+            kind (str): 'raw' for the values as stored, 'key' for them
+                normalized to compare for equality, or 'number' for them as
+                numbers, with NaN where they are not numbers
+        """
+        key = (type_id, field, kind)
+        if key not in self._columns:
+            if kind == "key":
+                column = np.array(
+                    list(map(_key, self.column(type_id, field))), dtype=object
+                )
+            elif kind == "number":
+                column = np.array(
+                    [
+                        math.nan if number is None else number
+                        for number in map(_number, self.column(type_id, field))
+                    ],
+                    dtype=float,
+                )
+            else:
+                position = self._position(type_id, field)
+                table = self.store.tables[type_id]
+                values, offsets = table.values, table.offsets
+                column = np.empty(len(table), dtype=object)
+                if position is None:
+                    column[:] = ""
+                else:
+                    column[:] = [
+                        values[start + position] if start + position < end else ""
+                        for start, end in zip(offsets, offsets[1:])
+                    ]
+            self._columns[key] = column
+        return self._columns[key]
+
+    def value(self, node_id: int, field: str) -> Value:
+        type_id = self.store.node_types[node_id]
+        return self.column(type_id, field)[self.store.node_rows[node_id]]
+
+    def _hash_index(self, type_id: int, field: str) -> dict[str, list[int]]:
+        key = (type_id, field)
+        if key not in self._hash_indexes:
+            index: dict[str, list[int]] = {}
+            for node_id, value in zip(
+                self._ids_by_type[type_id].tolist(),
+                self.column(type_id, field, "key").tolist(),
+            ):
+                index.setdefault(value, []).append(node_id)
+            self._hash_indexes[key] = index
+        return self._hash_indexes[key]
+
+    def _sorted_index(self, type_id: int, field: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The numbers in a field of a type's objects, sorted, and the ids of
+        the objects they are in.
+        """
+        key = (type_id, field)
+        if key not in self._sorted_indexes:
+            numbers = self.column(type_id, field, "number")
+            order = np.argsort(numbers, kind="stable")
+            # NaNs sort last
+            order = order[: np.count_nonzero(~np.isnan(numbers))]
+            self._sorted_indexes[key] = (
+                numbers[order],
+                self._ids_by_type[type_id][order],
+            )
+        return self._sorted_indexes[key]
+
+    def _field_id(self, field: str) -> Optional[int]:
+        field_id = self.store.find_field(field)
+        if field_id is None:
+            field_id = self.store.find_field(make_bunch_name(field))
+        return field_id
+
+    def _references(self, field_id: Optional[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The nodes referring to others through a field, and the nodes they
+        refer to, as arrays of the same length.
+        """
+        if field_id not in self._edges:
+            store = self.store
+            if field_id is None:
+                # no object refers to another through the field
+                through = np.zeros(len(store.edge_fields), dtype=bool)
+            else:
+                through = np.array(store.edge_fields, dtype=np.int64) == field_id
+            self._edges[field_id] = (
+                np.array(store.edge_sources, dtype=np.int64)[through],
+                np.array(store.edge_targets, dtype=np.int64)[through],
+            )
+        return self._edges[field_id]
+
+    def plan(self, steps: tuple[Step, ...]) -> _Plan:
+        """
+        Get the compiled plan of a query, compiling it on first use.
+        """
+        plan = self._plans.get(steps)
+        if plan is None:
+            plan = self._compile(steps)
+            if len(self._plans) >= self.max_plans:
+                del self._plans[next(iter(self._plans))]
+            self._plans[steps] = plan
+        return plan
+
+    def run(self, steps: tuple[Step, ...]) -> np.ndarray:
+        return self.plan(steps).run()
+
+    def _compile(self, steps: tuple[Step, ...]) -> _Plan:
+        plan = _Plan()
+        i = 0
+        while i < len(steps):
+            step = steps[i]
+            # the predicates filtering this stage's objects
+            j = i + 1
+            while j < len(steps) and steps[j][0] in ("where", "refers"):
+                j += 1
+            predicates = sorted(
+                steps[i + 1 : j],
+                key=lambda s: (
+                    4 if s[0] == "refers" or callable(s[2]) else PREDICATE_ORDER[s[2]]
+                ),
+            )
+            if step[0] == "select":
+                predicates = self._compile_select(plan, step[1], predicates)
+            elif step[0] == "follow":
+                self._compile_follow(plan, step[1])
+            elif step[0] == "back":
+                self._compile_back(plan, step[1], step[2])
+            else:
+                raise ValueError(f"A query must start by selecting a type: {step}")
+            for predicate in predicates:
+                if predicate[0] == "refers":
+                    self._compile_refers(plan, predicate[1], predicate[2])
+                else:
+                    self._compile_filter(plan, predicate)
+            i = j
+        return plan
+
+    def _compile_select(
+        self, plan: _Plan, obj_type: str, predicates: list[Step]
+    ) -> list[Step]:
+        """
+        Add the operation finding the objects to start from, through an index
+        if a predicate can use one.
+
+        Returns:
+            predicates (list[Step]): The predicates left to check
+        """
+        type_id = self._type_id(obj_type)
+        if type_id is None:
+            plan.add(lambda ids: EMPTY, f"select {obj_type}: not in the model")
+            return []
+        for predicate in predicates:
+            # resolve every field now, so that typos fail before running
+            if predicate[0] == "where":
+                self._position(type_id, predicate[1])
+        indexed = next(
+            (
+                p
+                for p in predicates
+                if p[0] == "where" and not callable(p[2]) and p[2] != "!="
+            ),
+            None,
+        )
+        if indexed is None:
+            plan.add(
+                lambda ids: self._ids_by_type[type_id],
+                f"scan {obj_type} ({len(self._ids_by_type[type_id])} objects)",
+            )
+            return predicates
+        _, field, op, value = indexed
+        if op in ("=", "in"):
+            keys = [_key(value)] if op == "=" else list(dict.fromkeys(map(_key, value)))
+
+            def lookup(ids):
+                index = self._hash_index(type_id, field)
+                found = [node_id for key in keys for node_id in index.get(key, ())]
+                found = np.array(found, dtype=np.int64)
+                return np.sort(found) if len(keys) > 1 else found
+
+            plan.add(lookup, f"hash index {obj_type}.{field} {op} {value}")
+        else:
+            bound = _number(value)
+            if bound is None:
+                raise ValueError(f"'{op}' needs a number, not '{value}'.")
+            # the side of the bound the matching numbers are on, and whether
+            # numbers equal to it match
+            side = "left" if op in ("<", ">=") else "right"
+
+            def lookup(ids):
+                numbers, node_ids = self._sorted_index(type_id, field)
+                split = np.searchsorted(numbers, bound, side=side)
+                found = node_ids[:split] if op in ("<", "<=") else node_ids[split:]
+                return np.sort(found)
+
+            plan.add(lookup, f"sorted index {obj_type}.{field} {op} {value}")
+        return [p for p in predicates if p is not indexed]
+
+    def _compile_filter(self, plan: _Plan, predicate: Step):
+        _, field, op, value = predicate
+        kind, check = _predicate(op, value)
+
+        def filter_ids(ids):
+            types = self._node_types[ids]
+            keep = np.zeros(len(ids), dtype=bool)
+            for type_id in np.unique(types).tolist():
+                try:
+                    column = self.column(type_id, field, kind)
+                except KeyError:
+                    # objects of other types reached by a reference
+                    continue
+                of_type = types == type_id
+                keep[of_type] = check(column[self._node_rows[ids[of_type]]])
+            return ids[keep]
+
+        plan.add(filter_ids, f"filter {_describe(predicate)}")
+
+    def _compile_follow(self, plan: _Plan, field: str):
+        field_id = self._field_id(field)
+
+        def follow(ids):
+            sources, targets = self._references(field_id)
+            return np.unique(targets[np.isin(sources, ids)])
+
+        plan.add(follow, f"follow {field}")
+
+    def _compile_back(self, plan: _Plan, obj_type: str, field: str):
+        field_id = self._field_id(field)
+        type_id = self._type_id(obj_type)
+
+        def back(ids):
+            sources, targets = self._references(field_id)
+            found = sources[np.isin(targets, ids)]
+            return np.unique(found[self._node_types[found] == type_id])
+
+        plan.add(back, f"referenced by {obj_type}.{field}")
+
+    def _compile_refers(self, plan: _Plan, field: str, steps: tuple[Step, ...]):
+        field_id = self._field_id(field)
+        inner = self.plan(steps)
+
+        def refers(ids):
+            sources, targets = self._references(field_id)
+            referring = sources[np.isin(targets, inner.run())]
+            return ids[np.isin(ids, referring)]
+
+        plan.add(refers, f"filter {field} refers to:", inner)
+
+
+def main():
+    from .idf import build_graph_store
+    from .parser import parse_idf
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("idf", help="The IDF to query")
+    parser.add_argument("query", help="The query, e.g. 'ZONE[Floor_Area > 100]'")
+    parser.add_argument("--idd", help="The Energy+.idd to resolve references with")
+    parser.add_argument(
+        "--fields", nargs="+", default=[], help="Fields to print for each object"
+    )
+    parser.add_argument(
+        "--explain", action="store_true", help="Print how the query runs"
+    )
+    args = parser.parse_args()
+    idd = load_idd_file(args.idd) if args.idd else None
+    store = build_graph_store(parse_idf(args.idf, idd), idd, progress=False)
+    engine = QueryEngine(store, idd)
+
+    start = time.perf_counter()
+    try:
+        query = engine.query(args.query)
+        rows = query.rows(*args.fields)
+    except (KeyError, ValueError) as e:
+        parser.error(e.args[0] if e.args else str(e))
+    elapsed = time.perf_counter() - start
+    if args.explain:
+        print(query.explain())
+    for row in rows:
+        values = ", ".join(f"{field}={row[field]!r}" for field in args.fields)
+        print(f"{row['type']} '{row['name']}'" + (f": {values}" if values else ""))
+    start = time.perf_counter()
+    query.ids()
+    again = time.perf_counter() - start
+    print(
+        f"{len(rows)} objects in {elapsed * 1000:.2f} ms, "
+        f"{again * 1000:.2f} ms with its plan and indexes built"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+"""
+Retrieve the IDD memos, field notes and EnergyPlus documentation relevant to
+a question.
+
+Usage (from the repository root):
+
+    python -m aiep.retrieval "how do I set a thermostat deadband" --idd path/to/Energy+.idd
+
+The text is split into chunks (one per object type, one per field with a note,
+and paragraphs of any documents given), embedded, and stored as a float32
+matrix, dense or sparse, which is memory-mapped back in, together with an
+inverted file index: the vectors are clustered, and a query is only scored
+against the vectors of the clusters whose centroids are nearest to it.
+
+Embedding is pluggable.  The default `HashingEmbedder` is a TF-IDF over
+hashed words and word pairs, which needs no model and no network; anything
+with the same methods (e.g. a wrapper around a local sentence embedding model)
+can be used in its place.  Indexes are cached on disk per IDD file, documents
+and embedder, in ~/.cache/aiep/retrieval (or $AIEP_CACHE_DIR/retrieval).
+"""
+
+import argparse
+import errno
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional, Protocol, Union
+
+import numpy as np
+import scipy.sparse as sp
+from pydantic import BaseModel
+
+from .cache import hash_file, load_idd_file
+from .idd import IDD, read_idd_version
+
+DEFAULT_CACHE_DIR = (
+    Path(os.environ.get("AIEP_CACHE_DIR", Path.home() / ".cache" / "aiep"))
+    / "retrieval"
+)
+# bump when the chunks or the files of an index change shape
+INDEX_FORMAT = 2
+
+WORD = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+
+class Chunk(BaseModel):
+    # 'idd', or the path of the document the chunk comes from
+    source: str
+    obj_type: Optional[str] = None
+    field: Optional[str] = None
+    text: str
+
+
+class Hit(BaseModel):
+    chunk: Chunk
+    score: float
+
+
+def idd_chunks(idd: IDD) -> list[Chunk]:
+    """
+    Split the text of an IDD into chunks: one per object type, with its group,
+    memo and the names of its fields, and one per field with a note, with its
+    units and choices.  Fields of an extensible group after the first repeat
+    of it are left out, since their notes are the first one's again.
+    """
+    chunks = []
+    for schema in idd:
+        fields = []
+        for field in schema:
+            if field.begin_extensible and fields:
+                break
+            fields.append(field)
+        header = schema.header
+        chunks.append(
+            Chunk(
+                source="idd",
+                obj_type=schema.object_type,
+                text=(
+                    f"{schema.object_type} ({header.group}). {header.memo or ''} "
+                    f"Fields: {', '.join(field.name for field in fields)}"
+                ),
+            )
+        )
+        for field in fields:
+            if not field.note:
+                continue
+            text = f"{schema.object_type}: {field.name}"
+            if field.units:
+                text += f" [{field.units}]"
+            text += f". {field.note}"
+            if field.key:
+                text += f" Choices: {', '.join(field.key)}"
+            chunks.append(
+                Chunk(
+                    source="idd",
+                    obj_type=schema.object_type,
+                    field=field.name,
+                    text=text,
+                )
+            )
+    return chunks
+
+
+def doc_chunks(path: Union[str, Path], max_words: int = 200) -> list[Chunk]:
+    """
+    Split a text or markdown document into chunks of whole paragraphs of up to
+    about `max_words` words each.
+    """
+    path = Path(path)
+    paragraphs = [
+        " ".join(paragraph.split())
+        for paragraph in re.split(r"\n\s*\n", path.read_text(errors="replace"))
+    ]
+    chunks: list[Chunk] = []
+    current: list[str] = []
+    n_words = 0
+    for paragraph in filter(None, paragraphs):
+        words = len(paragraph.split())
+        if current and n_words + words > max_words:
+            chunks.append(Chunk(source=str(path), text="\n\n".join(current)))
+            current, n_words = [], 0
+        current.append(paragraph)
+        n_words += words
+    if current:
+        chunks.append(Chunk(source=str(path), text="\n\n".join(current)))
+    return chunks
+
+
+class Embedder(Protocol):
+    # identifies the embedder and its settings, as part of the cache key
+    name: str
+
+    def fit(self, texts: list[str]):
+        """
+        Learn whatever the embedder needs from the texts to be indexed.
+        """
+        ...
+
+    def embed(self, texts: list[str]) -> Union[np.ndarray, sp.csr_matrix]:
+        """
+        Embed texts as the unit-length float32 rows of a matrix, either a
+        dense array or a sparse CSR matrix.
+        """
+        ...
+
+    def state(self) -> dict[str, np.ndarray]:
+        """
+        The arrays to store with an index to restore the fitted embedder.
+        """
+        ...
+
+    def load_state(self, state: dict[str, np.ndarray]): ...
+
+
+class HashingEmbedder:
+    """
+    TF-IDF over words and pairs of adjacent words, hashed into a fixed number
+    of dimensions, so that there is no vocabulary to store and nothing to
+    download.  Hashes are signed, so that collisions tend to cancel out
+    rather than add up.
+
+    A chunk only has a few dozen terms, so the vectors are sparse, which lets
+    them have enough dimensions (2^16 by default) that terms rarely collide;
+    with a few hundred, unrelated chunks share enough of them to crowd out
+    the relevant ones.
+    """
+
+    def __init__(self, dim: int = 1 << 16):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    def _features(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        words = WORD.findall(text.lower())
+        terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        hashes = np.fromiter(
+            (zlib.crc32(term.encode()) for term in terms),
+            dtype=np.uint32,
+            count=len(terms),
+        )
+        signs = np.where(hashes & 1, 1.0, -1.0).astype(np.float32)
+        return (hashes >> 1) % self.dim, signs
+
+    def fit(self, texts: list[str]):
+        df = np.zeros(self.dim, dtype=np.float32)
+        for text in texts:
+            indices, _ = self._features(text)
+            df[np.unique(indices)] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+
+    def embed(self, texts: list[str]) -> sp.csr_matrix:
+        columns, values = [], []
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        for row, text in enumerate(texts):
+            indices, signs = self._features(text)
+            indices, inverse = np.unique(indices, return_inverse=True)
+            counts = np.zeros(len(indices), dtype=np.float32)
+            np.add.at(counts, inverse, signs)
+            # damp repeated terms, keeping the sign of the hash
+            weights = np.sign(counts) * np.log1p(np.abs(counts)) * self.idf[indices]
+            nonzero = weights != 0
+            indices, weights = indices[nonzero], weights[nonzero]
+            columns.append(indices.astype(np.int32))
+            values.append(weights / max(float(np.linalg.norm(weights)), 1e-12))
+            indptr[row + 1] = indptr[row] + len(indices)
+        return sp.csr_matrix(
+            (
+                np.concatenate(values or [np.zeros(0)]).astype(np.float32),
+                np.concatenate(columns or [np.zeros(0, dtype=np.int32)]),
+                indptr,
+            ),
+            shape=(len(texts), self.dim),
+        )
+
+    def state(self) -> dict[str, np.ndarray]:
+        return {"idf": self.idf}
+
+    def load_state(self, state: dict[str, np.ndarray]):
+        self.idf = np.asarray(state["idf"], dtype=np.float32)
+
+
+def _dense(vectors: Union[np.ndarray, sp.spmatrix]) -> np.ndarray:
+    return vectors.toarray() if sp.issparse(vectors) else np.asarray(vectors)
+
+
+def _kmeans(
+    vectors: Union[np.ndarray, sp.csr_matrix],
+    n_clusters: int,
+    iterations: int = 10,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster unit vectors, dense or sparse, by cosine similarity (spherical
+    k-means).  The centroids are dense.
+
+    Returns:
+        centroids (np.ndarray): The unit-length centroid of each cluster
+        assignments (np.ndarray): The cluster of each vector
+    """
+    n_vectors = vectors.shape[0]
+    rng = np.random.default_rng(seed)
+    centroids = _dense(vectors[rng.choice(n_vectors, n_clusters, replace=False)])
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        # sum each cluster's vectors with a cluster by vector indicator matrix
+        members = sp.csr_matrix(
+            (np.ones(n_vectors, dtype=np.float32), (assignments, np.arange(n_vectors))),
+            shape=(n_clusters, n_vectors),
+        )
+        sums = _dense(members @ vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # keep the old centroid of a cluster which lost all of its vectors
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return centroids.astype(np.float32), np.argmax(vectors @ centroids.T, axis=1)
+
+
+def _score_slice(
+    vectors: Union[np.ndarray, sp.csr_matrix], start: int, end: int, vector: np.ndarray
+) -> np.ndarray:
+    """
+    Score the rows from `start` to `end` of a matrix against a dense vector.
+    A sparse matrix's rows are read straight from its CSR arrays, as slicing
+    the matrix costs more than scoring a cluster's few rows.
+    """
+    if not sp.issparse(vectors):
+        return vectors[start:end] @ vector
+    indptr = vectors.indptr[start : end + 1]
+    entries = slice(indptr[0], indptr[-1])
+    return np.bincount(
+        np.repeat(np.arange(end - start), np.diff(indptr)),
+        weights=vectors.data[entries] * vector[vectors.indices[entries]],
+        minlength=end - start,
+    )
+
+
+class VectorIndex:
+    """
+    Chunks and their vectors, with an inverted file index over the vectors.
+
+    The vectors are stored sorted by cluster, so each cluster's vectors are
+    one contiguous slice of the (memory-mapped) matrix, from `offsets[c]` to
+    `offsets[c + 1]`.  A sparse matrix is stored as its CSR arrays, which
+    are memory-mapped in the same way.
+    """
+
+    def __init__(
+        self,
+        chunks: list[Chunk],
+        vectors: Union[np.ndarray, sp.csr_matrix],
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        embedder: Embedder,
+    ):
+        self.chunks = chunks
+        self.vectors = vectors
+        self.centroids = centroids
+        self.offsets = offsets
+        self.embedder = embedder
+
+    @classmethod
+    def build(
+        cls,
+        chunks: list[Chunk],
+        embedder: Optional[Embedder] = None,
+        n_clusters: Optional[int] = None,
+    ) -> "VectorIndex":
+        """
+        Embed chunks and cluster their vectors.
+
+        Args:
+            chunks (list[Chunk]): The chunks to index
+            embedder (Embedder, optional): Defaults to a `HashingEmbedder`
+            n_clusters (int, optional): Defaults to about the square root of
+                the number of chunks
+        """
+        embedder = HashingEmbedder() if embedder is None else embedder
+        texts = [chunk.text for chunk in chunks]
+        embedder.fit(texts)
+        vectors = embedder.embed(texts)
+        n_clusters = n_clusters or max(1, int(np.sqrt(len(chunks))))
+        centroids, assignments = _kmeans(vectors, min(n_clusters, len(chunks)))
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=len(centroids)), out=offsets[1:])
+        return cls(
+            [chunks[i] for i in order], vectors[order], centroids, offsets, embedder
+        )
+
+    def search(
+        self, query: str, k: int = 5, n_probe: int = 16, exact: bool = False
+    ) -> list[Hit]:
+        """
+        Find the chunks most similar to a query.
+
+        The inverted file search trades recall for speed: it misses the chunks
+        in clusters it does not score.  On the 9.2 IDD, with about 80
+        clusters, the default of 16 finds about 96% of the exact top 10, and
+        32 about 99%; `benchmarks.bench_retrieval` measures it.  An index of
+        the IDD alone is small enough that scoring every chunk is about as
+        fast; the clusters pay off once documents are indexed too.
+
+        Args:
+            query (str): The question or keywords
+            k (int): The number of chunks to return
+            n_probe (int): The number of clusters to score, nearest first
+            exact (bool): Score every chunk instead
+
+        Returns:
+            hits (list[Hit]): The chunks, the most similar first
+        """
+        embedded = self.embedder.embed([query])
+        vector = _dense(embedded)[0]
+        if exact or n_probe >= len(self.centroids):
+            rows = np.arange(len(self.chunks))
+            scores = self.vectors @ vector
+        else:
+            if sp.issparse(embedded):
+                # only the query's few terms count towards the centroids
+                similarity = self.centroids[:, embedded.indices] @ embedded.data
+            else:
+                similarity = self.centroids @ vector
+            nearest = np.argpartition(-similarity, n_probe - 1)
+            slices = [(self.offsets[c], self.offsets[c + 1]) for c in nearest[:n_probe]]
+            rows = np.concatenate([np.arange(start, end) for start, end in slices])
+            scores = np.concatenate(
+                [
+                    _score_slice(self.vectors, start, end, vector)
+                    for start, end in slices
+                ]
+            )
+        k = min(k, len(rows))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [Hit(chunk=self.chunks[rows[i]], score=float(scores[i])) for i in top]
+
+    def save(self, directory: Union[str, Path]):
+        """
+        Write the index to a directory, atomically, so that concurrent readers
+        see either the whole index or none of it.  An index already in the
+        directory is replaced.
+        """
+        directory = Path(directory)
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=directory.parent, suffix=".tmp"))
+        try:
+            if sp.issparse(self.vectors):
+                np.save(tmp / "vectors.data.npy", self.vectors.data)
+                np.save(tmp / "vectors.indices.npy", self.vectors.indices)
+                np.save(tmp / "vectors.indptr.npy", self.vectors.indptr)
+                np.save(tmp / "vectors.shape.npy", np.array(self.vectors.shape))
+            else:
+                np.save(tmp / "vectors.npy", self.vectors)
+            np.save(tmp / "centroids.npy", self.centroids)
+            np.save(tmp / "offsets.npy", self.offsets)
+            np.savez(tmp / "embedder.npz", **self.embedder.state())
+            with open(tmp / "chunks.jsonl", "w") as f:
+                for chunk in self.chunks:
+                    f.write(chunk.model_dump_json() + "\n")
+            try:
+                os.replace(tmp, directory)
+            except OSError as e:
+                if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                    raise
+                _replace_directory(tmp, directory)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], embedder: Embedder) -> "VectorIndex":
+        """
+        Read an index written by `save`, memory-mapping its vectors.
+
+        Args:
+            directory (Path): The index directory
+            embedder (Embedder): An embedder like the one the index was built
+                with; its fitted state is restored from the index
+        """
+        directory = Path(directory)
+        with np.load(directory / "embedder.npz") as state:
+            embedder.load_state(dict(state))
+        with open(directory / "chunks.jsonl") as f:
+            chunks = [Chunk.model_validate_json(line) for line in f]
+        if (directory / "vectors.npy").exists():
+            vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+        else:
+            vectors = sp.csr_matrix(
+                tuple(
+                    np.load(directory / f"vectors.{part}.npy", mmap_mode="r")
+                    for part in ("data", "indices", "indptr")
+                ),
+                shape=tuple(np.load(directory / "vectors.shape.npy")),
+                copy=False,
+            )
+        return cls(
+            chunks,
+            vectors,
+            np.load(directory / "centroids.npy"),
+            np.load(directory / "offsets.npy"),
+            embedder,
+        )
+
+
+def _replace_directory(new: Path, directory: Path):
+    """
+    Replace a non-empty directory with another, by moving the old one aside.
+    If another writer replaces it in the meantime, its copy is kept instead.
+    """
+    old = Path(tempfile.mkdtemp(dir=directory.parent, suffix=".old"))
+    try:
+        try:
+            os.replace(directory, old)
+        except FileNotFoundError:
+            # another writer moved it aside first
+            pass
+        try:
+            os.replace(new, directory)
+        except OSError as e:
+            if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                raise
+            shutil.rmtree(new, ignore_errors=True)
+    finally:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def index_key(
+    idd_path: Union[str, Path], docs: Iterable[Union[str, Path]], embedder: Embedder
+) -> str:
+    """
+    Key an index by the IDD's version and contents, the documents' contents,
+    and the embedder.
+    """
+    digest = hashlib.sha256(hash_file(idd_path).encode())
+    for doc in sorted(str(doc) for doc in docs):
+        digest.update(hash_file(doc).encode())
+    version = read_idd_version(idd_path) or "unknown"
+    return f"{version}-{digest.hexdigest()[:16]}-{embedder.name}-v{INDEX_FORMAT}"
+
+
+def load_index(
+    idd_path: Union[str, Path],
+    docs: Iterable[Union[str, Path]] = (),
+    embedder: Optional[Embedder] = None,
+    cache_dir: Optional[Union[str, Path]] = DEFAULT_CACHE_DIR,
+) -> VectorIndex:
+    """
+    Get the index of an IDD's text and some documents, building it if it is
+    not cached.
+
+    Args:
+        idd_path (Path): The Energy+.idd file
+        docs (Iterable[Path]): Text or markdown documents to index too, e.g.
+            the Input Output Reference converted to text
+        embedder (Embedder, optional): Defaults to a `HashingEmbedder`
+        cache_dir (Path, optional): The directory to cache indexes in.  If
+            None, the index is built every time.
+
+    Returns:
+        index (VectorIndex): The index
+    """
+    docs = list(docs)
+    embedder = HashingEmbedder() if embedder is None else embedder
+    directory = None
+    if cache_dir is not None:
+        directory = Path(cache_dir) / index_key(idd_path, docs, embedder)
+        if directory.exists():
+            try:
+                return VectorIndex.load(directory, embedder)
+            except Exception as e:
+                print(
+                    f"WARNING: Could not load cached index {directory}, rebuilding: {e}"
+                )
+
+    chunks = idd_chunks(load_idd_file(idd_path))
+    for doc in docs:
+        chunks += doc_chunks(doc)
+    index = VectorIndex.build(chunks, embedder)
+    if directory is not None:
+        index.save(directory)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("query", help="The question or keywords to search for")
+    parser.add_argument("--idd", required=True, help="The Energy+.idd to index")
+    parser.add_argument(
+        "--docs", nargs="*", default=[], help="Text or markdown documents to index"
+    )
+    parser.add_argument("-k", type=int, default=5, help="The number of results")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = load_index(args.idd, args.docs)
+    loaded = time.perf_counter()
+    hits = index.search(args.query, k=args.k)
+    searched = time.perf_counter()
+    for hit in hits:
+        where = hit.chunk.obj_type or hit.chunk.source
+        if hit.chunk.field:
+            where += f" > {hit.chunk.field}"
+        print(f"{hit.score:.3f}  {where}\n       {hit.chunk.text[:200]}")
+    print(
+        f"Loaded {len(index.chunks)} chunks in {loaded - start:.2f}s, "
+        f"searched in {(searched - loaded) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
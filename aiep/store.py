@@ -0,0 +1,428 @@
+from array import array
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Sequence, Union
+
+import networkx as nx
+from pydantic import BaseModel, UUID4, Field
+from uuid import uuid4
+
+from .idd import IDD, IDFObjectModel, object_model
+from .parser import IDFObject
+
+if TYPE_CHECKING:
+    from archetypal.idfclass import IDF
+    from geomeppy.patches import EpBunch
+
+
+class Node(BaseModel):
+    id: UUID4 = Field(..., default_factory=lambda: uuid4())
+    name: str
+    type: str
+    # an EpBunch or an IDFObject; eppy is not imported to check, so that
+    # graphs of parsed objects do not need it
+    object: Any
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __hash__(self):
+        return hash(self.id.int)
+
+
+class Edge(BaseModel):
+    source: Node
+    target: Node
+    type: tuple[str, str]
+    field: str
+
+    def __hash__(self):
+        return hash((self.source.id.int, self.target.id.int, self.field))
+
+
+class FieldTable:
+    """
+    The raw field values of all the objects of one type, in IDD field order.
+
+    Each object's values, starting with its key, are appended to one flat
+    list, and `offsets` records where each object's values start, so an
+    object costs its values and one integer rather than objects of its own.
+    The objects share `fieldnames`, the longest list of field names seen for
+    the type; as with eppy, fields past an object's stored values read as
+    blank.
+    """
+
+    __slots__ = ("fieldnames", "values", "offsets", "_field_index")
+
+    def __init__(self):
+        self.fieldnames: list[str] = []
+        self.values: list[Union[str, float, int]] = []
+        self.offsets = array("I", [0])
+        self._field_index: Optional[dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def append(self, fieldnames: list[str], fieldvalues: list) -> int:
+        """
+        Add an object's values, starting with its key.
+
+        Returns:
+            row (int): The object's row in the table
+        """
+        if len(fieldnames) > len(self.fieldnames):
+            # objects of a type only differ in how many extensible fields
+            # they name, so the longer list names the fields of both
+            self.fieldnames = fieldnames
+            self._field_index = None
+        self.values.extend(fieldvalues)
+        self.offsets.append(len(self.values))
+        return len(self.offsets) - 2
+
+    def row(self, row: int) -> list:
+        """
+        A copy of the values of an object, starting with its key.
+        """
+        return self.values[self.offsets[row] : self.offsets[row + 1]]
+
+    def value(self, row: int, field: str) -> Union[str, float, int]:
+        """
+        Read one field of an object by its EpBunch name.
+        """
+        if self._field_index is None:
+            self._field_index = {
+                field: i for i, field in reversed(list(enumerate(self.fieldnames)))
+            }
+        i = self._field_index.get(field)
+        if i is None:
+            raise KeyError(f"There is no field called '{field}'.")
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.values[start + i] if start + i < end else ""
+
+
+class GraphStore:
+    """
+    A compact, columnar store of the nodes and edges of an IDF graph.
+
+    Nodes are numbered from 0 in the order they are added.  Object types and
+    field names are interned in string tables, so each node costs one name,
+    one type id and one row id, and each edge costs three integers in the
+    `edge_sources`, `edge_targets` and `edge_fields` arrays.
+
+    Objects are not kept: their raw field values are copied into a
+    `FieldTable` per type, and the graph is built and analysed from those.
+    `IDFObject` records, `EpBunch` objects and typed pydantic models are only
+    built when asked for, and are copies, so editing them does not change the
+    store.
+
+    Pydantic `Node` and `Edge` views are only built when asked for, and each
+    node's view is built once, so views of the same node compare equal.
+    """
+
+    __slots__ = (
+        "types",
+        "fields",
+        "names",
+        "tables",
+        "node_types",
+        "node_rows",
+        "edge_sources",
+        "edge_targets",
+        "edge_fields",
+        "_type_ids",
+        "_field_ids",
+        "_node_ids",
+        "_node_views",
+    )
+
+    def __init__(self):
+        self.types: list[str] = []
+        self.fields: list[str] = []
+        self.names: list[str] = []
+        self.tables: list[FieldTable] = []
+        self.node_types = array("I")
+        self.node_rows = array("I")
+        self.edge_sources = array("I")
+        self.edge_targets = array("I")
+        self.edge_fields = array("I")
+        self._type_ids: dict[str, int] = {}
+        self._field_ids: dict[str, int] = {}
+        self._node_ids: dict[tuple[int, str], int] = {}
+        self._node_views: dict[int, Node] = {}
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.names)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.edge_sources)
+
+    def type_id(self, obj_type: str) -> int:
+        """
+        Get the id of an object type in the type table, adding it if it is new.
+        """
+        if obj_type not in self._type_ids:
+            self._type_ids[obj_type] = len(self.types)
+            self.types.append(obj_type)
+            self.tables.append(FieldTable())
+        return self._type_ids[obj_type]
+
+    def field_id(self, field: str) -> int:
+        """
+        Get the id of a field name in the field table, adding it if it is new.
+        """
+        if field not in self._field_ids:
+            self._field_ids[field] = len(self.fields)
+            self.fields.append(field)
+        return self._field_ids[field]
+
+    def add_node(
+        self, name: str, obj_type: str, obj: Union["EpBunch", IDFObject]
+    ) -> int:
+        """
+        Add a node to the store, copying the object's field values.
+
+        Args:
+            name (str): The object's name
+            obj_type (str): The object's type
+            obj (Union[EpBunch, IDFObject]): The object itself
+
+        Returns:
+            node_id (int): The id of the new node
+        """
+        node_id = len(self.names)
+        type_id = self.type_id(obj_type)
+        self.names.append(name)
+        self.node_types.append(type_id)
+        self.node_rows.append(
+            self.tables[type_id].append(obj.fieldnames, obj.fieldvalues)
+        )
+        self._node_ids.setdefault((type_id, name), node_id)
+        return node_id
+
+    def add_edge(self, source: int, target: int, field: str) -> int:
+        """
+        Add an edge from the node whose `field` holds a reference to the node
+        it refers to.
+
+        Returns:
+            edge_id (int): The id of the new edge
+        """
+        self.edge_sources.append(source)
+        self.edge_targets.append(target)
+        self.edge_fields.append(self.field_id(field))
+        return len(self.edge_sources) - 1
+
+    def find_node(self, obj_type: str, name: str) -> Optional[int]:
+        """
+        Find the first node added with the given type and name.
+        """
+        type_id = self._type_ids.get(obj_type)
+        if type_id is None:
+            return None
+        return self._node_ids.get((type_id, name))
+
+    def find_field(self, field: str) -> Optional[int]:
+        """
+        Find the id of a field name in the field table, if any edge uses it.
+        """
+        return self._field_ids.get(field)
+
+    def node_type(self, node_id: int) -> str:
+        return self.types[self.node_types[node_id]]
+
+    def edge_field(self, edge_id: int) -> str:
+        return self.fields[self.edge_fields[edge_id]]
+
+    def fieldnames(self, node_id: int) -> list[str]:
+        """
+        The EpBunch names of a node's fields, starting with 'key'.  There may
+        be more names than values.
+        """
+        return self.tables[self.node_types[node_id]].fieldnames
+
+    def fieldvalues(self, node_id: int) -> list:
+        """
+        A copy of a node's raw field values, starting with its key.
+        """
+        return self.tables[self.node_types[node_id]].row(self.node_rows[node_id])
+
+    def field(self, node_id: int, field: str) -> Union[str, float, int]:
+        """
+        Read one of a node's raw field values by its EpBunch name.
+        """
+        return self.tables[self.node_types[node_id]].value(
+            self.node_rows[node_id], field
+        )
+
+    def iter_fields(self) -> Iterator[tuple[int, int, list[str], list]]:
+        """
+        Iterate over the raw field values of every node, in node id order.
+
+        Yields:
+            node_id (int): The node
+            type_id (int): Its type's id
+            fieldnames (list[str]): The names of its type's fields
+            fieldvalues (list): Its values, starting with its key
+        """
+        tables = self.tables
+        for node_id, (type_id, row) in enumerate(zip(self.node_types, self.node_rows)):
+            table = tables[type_id]
+            offsets = table.offsets
+            yield node_id, type_id, table.fieldnames, table.values[
+                offsets[row] : offsets[row + 1]
+            ]
+
+    def object(self, node_id: int) -> IDFObject:
+        """
+        Build an `IDFObject` record of a node's values.
+        """
+        values = self.fieldvalues(node_id)
+        return IDFObject(values[0], self.fieldnames(node_id), values)
+
+    @property
+    def objects(self) -> Sequence[IDFObject]:
+        """
+        The `IDFObject` record of each node, by node id, built on access.
+        """
+        return _ObjectsView(self)
+
+    def bunch(self, node_id: int, idf: "IDF") -> "EpBunch":
+        """
+        Build an `EpBunch` of a node's values, described by a loaded IDF's
+        IDD.  The object is not added to the IDF.
+        """
+        from eppy.modeleditor import obj2bunch
+
+        abunch = obj2bunch(idf.model, idf.idd_info, self.fieldvalues(node_id))
+        abunch.theidf = idf
+        return abunch
+
+    def typed(self, node_id: int, idd: IDD) -> IDFObjectModel:
+        """
+        Build a typed pydantic model of a node's values with the model
+        `object_model` builds for its type.
+        """
+        schema = idd[self.node_type(node_id).upper()]
+        return object_model(schema).from_values(self.fieldvalues(node_id)[1:])
+
+    def node(self, node_id: int) -> Node:
+        """
+        Get the pydantic view of a node, building it on first access.
+        """
+        if node_id not in self._node_views:
+            self._node_views[node_id] = Node(
+                name=self.names[node_id],
+                type=self.node_type(node_id),
+                object=self.object(node_id),
+            )
+        return self._node_views[node_id]
+
+    def edge(self, edge_id: int) -> Edge:
+        """
+        Build the pydantic view of an edge.
+        """
+        source = self.node(self.edge_sources[edge_id])
+        target = self.node(self.edge_targets[edge_id])
+        return Edge(
+            source=source,
+            target=target,
+            type=(source.type, target.type),
+            field=self.edge_field(edge_id),
+        )
+
+    def nodes(self) -> Iterator[Node]:
+        return (self.node(i) for i in range(self.n_nodes))
+
+    def edges(self) -> Iterator[Edge]:
+        return (self.edge(i) for i in range(self.n_edges))
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        """
+        Build a multi-edge directed graph over the integer node ids.
+
+        As with `create_graph`, edges point from the referenced object to the
+        object which references it and are keyed by field name.  Nodes carry
+        their `name` and `type`, and edges their `type`, as attributes.
+        """
+        g = nx.MultiDiGraph()
+        g.add_nodes_from(
+            (i, {"name": name, "type": self.types[type_id]})
+            for i, (name, type_id) in enumerate(zip(self.names, self.node_types))
+        )
+        g.add_edges_from(
+            (
+                target,
+                source,
+                self.fields[field_id],
+                {"type": (self.node_type(source), self.node_type(target))},
+            )
+            for source, target, field_id in zip(
+                self.edge_sources, self.edge_targets, self.edge_fields
+            )
+        )
+        return g
+
+    def materialize(
+        self, objects: Optional[Sequence[Union["EpBunch", IDFObject]]] = None
+    ) -> tuple[list[Node], list[Edge], nx.MultiDiGraph]:
+        """
+        Build the pydantic views of the whole graph, in the shape returned by
+        `create_graph`.
+
+        Args:
+            objects (Sequence[Union[EpBunch, IDFObject]], optional): The
+                object for each node's view, by node id, e.g. the EpBunch
+                objects the store was built from.  By default each node gets
+                an `IDFObject` copy of its values.
+
+        Returns:
+            nodes (list[Node]): A list of the node objects
+            edges (list[Edge]): A list of the edge objects
+            graph (nx.MultiDiGraph): A multi-edge directed graph of the nodes
+        """
+        if objects is None:
+            nodes = list(self.nodes())
+            edges = list(self.edges())
+        else:
+            nodes = [
+                Node(name=name, type=self.types[type_id], object=obj)
+                for name, type_id, obj in zip(self.names, self.node_types, objects)
+            ]
+            edges = [
+                Edge(
+                    source=nodes[source],
+                    target=nodes[target],
+                    type=(nodes[source].type, nodes[target].type),
+                    field=self.fields[field_id],
+                )
+                for source, target, field_id in zip(
+                    self.edge_sources, self.edge_targets, self.edge_fields
+                )
+            ]
+        g = nx.MultiDiGraph()
+        for node in nodes:
+            g.add_node(node)
+        for edge in edges:
+            g.add_edge(edge.target, edge.source, edge.field, type=edge.type)
+        return nodes, edges, g
+
+
+class _ObjectsView(Sequence):
+    """
+    A read-only sequence of the `IDFObject` records of a store's nodes.
+    """
+
+    def __init__(self, store: GraphStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return self.store.n_nodes
+
+    def __getitem__(self, node_id):
+        if isinstance(node_id, slice):
+            return [self.store.object(i) for i in range(self.store.n_nodes)[node_id]]
+        if node_id < 0:
+            node_id += self.store.n_nodes
+        if not 0 <= node_id < self.store.n_nodes:
+            raise IndexError(node_id)
+        return self.store.object(node_id)
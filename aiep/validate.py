@@ -0,0 +1,361 @@
+"""
+Check the field values of IDF objects against the rules in an IDD.
+
+Usage (from the repository root):
+
+    python -m aiep.validate path/to/model.idf --idd path/to/Energy+.idd
+
+Objects are grouped by type and each field is checked as a column of values
+across all the objects of that type.  The checks are numpy array operations,
+so large files are validated in a few array passes per field instead of one
+Python check per value.
+"""
+
+import argparse
+import time
+from collections import Counter
+from itertools import zip_longest
+from typing import Iterable, Literal, Optional, Union
+
+import numpy as np
+from archetypal.idfclass import IDF
+from pydantic import BaseModel
+
+from .cache import load_idd_file
+from .idd import IDD, IDDField, IDDObjectSchema, _is_numeric
+from .idf import iter_objects
+from .parser import IDFObject, parse_idf
+
+Rule = Literal[
+    "unknown_type",
+    "too_many_fields",
+    "required",
+    "not_numeric",
+    "not_integer",
+    "below_minimum",
+    "above_maximum",
+    "autosize",
+    "autocalculate",
+    "invalid_choice",
+]
+
+
+class Violation(BaseModel):
+    obj_type: str
+    name: str
+    # the position of the object among all the objects validated
+    index: int
+    field: str
+    value: str
+    rule: Rule
+    message: str
+
+
+class ValidationReport(BaseModel):
+    n_objects: int = 0
+    violations: list[Violation] = []
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+    def counts(self) -> dict[str, int]:
+        """
+        Count the violations of each rule.
+        """
+        return dict(Counter(violation.rule for violation in self.violations))
+
+    def for_object(self, index: int) -> list[Violation]:
+        return [violation for violation in self.violations if violation.index == index]
+
+
+class _TypeChecker:
+    """
+    Checks the columns of values of all the objects of one type.
+    """
+
+    def __init__(
+        self,
+        schema: IDDObjectSchema,
+        indices: list[int],
+        rows: list[list[str]],
+        violations: list[Violation],
+    ):
+        self.schema = schema
+        self.fields = list(schema)
+        self.indices = indices
+        self.rows = rows
+        self.violations = violations
+        self.lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        self.has_name = bool(self.fields) and self.fields[0].name == "Name"
+        # where the repeating group of an extensible object starts
+        self.extensible = schema.header.extensible
+        self.begin = next(
+            (i for i, field in enumerate(self.fields) if field.begin_extensible),
+            None,
+        )
+        if self.extensible is None or self.begin is None:
+            self.extensible = self.begin = None
+
+    def field(self, column: int) -> Optional[IDDField]:
+        """
+        Get the definition of a column, repeating the first extensible group
+        for columns beyond those listed in the IDD.
+        """
+        if column < len(self.fields):
+            return self.fields[column]
+        if self.extensible is None:
+            return None
+        return self.fields[self.begin + (column - self.begin) % self.extensible]
+
+    def field_name(self, column: int) -> str:
+        if column < len(self.fields):
+            return self.fields[column].bunch_name
+        # as named by `parse_idf`, counting the key as field 0
+        return f"Field_{column + 1}"
+
+    def report(self, mask: np.ndarray, column: int, values, rule: Rule, message):
+        for i in np.flatnonzero(mask):
+            value = "" if values is None else str(values[i])
+            self.violations.append(
+                Violation(
+                    obj_type=self.schema.object_type,
+                    name=self.rows[i][0] if self.has_name and self.rows[i] else "",
+                    index=self.indices[i],
+                    field=self.field_name(column) if column >= 0 else "",
+                    value=value,
+                    rule=rule,
+                    message=message(value),
+                )
+            )
+
+    def check(self):
+        if self.extensible is None and len(self.fields) < int(
+            self.lengths.max(initial=0)
+        ):
+            n_fields = len(self.fields)
+            self.report(
+                self.lengths > n_fields,
+                -1,
+                None,
+                "too_many_fields",
+                lambda _: f"{self.schema.object_type} only has {n_fields} fields",
+            )
+        columns = zip_longest(*self.rows, fillvalue="")
+        for column, values in enumerate(columns):
+            field = self.field(column)
+            if field is not None:
+                self.check_column(column, field, np.array(values, dtype=str))
+        # required fields the objects stop short of
+        for column in range(int(self.lengths.max(initial=0)), len(self.fields)):
+            if self.fields[column].required_field and self.is_fixed(column):
+                self.report(
+                    np.ones(len(self.rows), dtype=bool),
+                    column,
+                    None,
+                    "required",
+                    lambda _: "a value is required",
+                )
+
+    def is_fixed(self, column: int) -> bool:
+        return self.begin is None or column < self.begin
+
+    def started(self, column: int) -> np.ndarray:
+        """
+        Which objects have values in the extensible group a column is in.
+        Required fields only have to be filled in groups which are used.
+        """
+        if self.is_fixed(column):
+            return np.ones(len(self.rows), dtype=bool)
+        group_start = (
+            self.begin + (column - self.begin) // self.extensible * self.extensible
+        )
+        return self.lengths > group_start
+
+    def check_column(self, column: int, field: IDDField, values: np.ndarray):
+        blank = values == ""
+        if field.required_field:
+            self.report(
+                blank & self.started(column),
+                column,
+                values,
+                "required",
+                lambda _: "a value is required",
+            )
+        if _is_numeric(field):
+            self.check_numbers(column, field, values, blank)
+        elif field.key:
+            choices = np.char.lower(np.array(field.key, dtype=str))
+            invalid = ~blank & ~np.isin(np.char.lower(values), choices)
+            self.report(
+                invalid,
+                column,
+                values,
+                "invalid_choice",
+                lambda v: f"'{v}' is not one of {', '.join(field.key)}",
+            )
+
+    def check_numbers(
+        self, column: int, field: IDDField, values: np.ndarray, blank: np.ndarray
+    ):
+        try:
+            # nearly every column is all numbers and blanks
+            numbers = np.where(blank, "nan", values).astype(np.float64)
+        except ValueError:
+            numbers = self.parse_numbers(column, field, values, blank)
+
+        valid = ~np.isnan(numbers)
+        if field.type == "integer":
+            self.report(
+                valid & (numbers != np.floor(numbers)),
+                column,
+                values,
+                "not_integer",
+                lambda v: f"{v} is not an integer",
+            )
+        bounds: list[tuple[Optional[str], Rule, np.ufunc, str]] = [
+            (field.minimum, "below_minimum", np.less, "below the minimum of"),
+            (field.minimum_strict, "below_minimum", np.less_equal, "not above"),
+            (field.maximum, "above_maximum", np.greater, "above the maximum of"),
+            (field.maximum_strict, "above_maximum", np.greater_equal, "not below"),
+        ]
+        for bound, rule, compare, description in bounds:
+            if bound is None:
+                continue
+            self.report(
+                valid & compare(numbers, float(bound)),
+                column,
+                values,
+                rule,
+                lambda v: f"{v} is {description} {bound}",
+            )
+
+    def parse_numbers(
+        self, column: int, field: IDDField, values: np.ndarray, blank: np.ndarray
+    ) -> np.ndarray:
+        """
+        Convert a column which holds more than numbers and blanks, reporting
+        words the field does not accept.
+        """
+        lower = np.char.lower(values)
+        autosize = lower == "autosize"
+        autocalculate = lower == "autocalculate"
+        # EnergyPlus reads either word as "size this automatically" in any
+        # field which takes one of them
+        if not (field.autosizable or field.autocalculatable):
+            self.report(
+                autosize,
+                column,
+                values,
+                "autosize",
+                lambda _: "the field is not autosizable",
+            )
+            self.report(
+                autocalculate,
+                column,
+                values,
+                "autocalculate",
+                lambda _: "the field is not autocalculatable",
+            )
+
+        numbers = np.full(len(values), np.nan)
+        not_numeric = np.zeros(len(values), dtype=bool)
+        for i in np.flatnonzero(~(blank | autosize | autocalculate)):
+            try:
+                numbers[i] = float(values[i])
+            except ValueError:
+                not_numeric[i] = True
+        self.report(
+            not_numeric,
+            column,
+            values,
+            "not_numeric",
+            lambda v: f"'{v}' is not a number",
+        )
+        return numbers
+
+
+def validate_objects(
+    idf: Union[IDF, Iterable[IDFObject]], idd: IDD, progress: bool = False
+) -> ValidationReport:
+    """
+    Check the field values of every object against the IDD.
+
+    Numeric fields must hold numbers (integers, for integer fields) within
+    their bounds, or 'autosize'/'autocalculate' where the field allows it;
+    choice fields must hold one of their keys, in any case; and required
+    fields must be filled in, although in extensible objects only within the
+    groups of fields which are used.
+
+    Args:
+        idf (Union[IDF, Iterable[IDFObject]]): A loaded IDF, or the objects
+            yielded by `aiep.parser.parse_idf`
+        idd (IDD): The IDD to check the objects against
+        progress (bool): Whether to show a progress bar while grouping objects
+
+    Returns:
+        report (ValidationReport): Every violation found
+    """
+    start = time.perf_counter()
+    groups: dict[str, tuple[list[int], list[list[str]]]] = {}
+    n_objects = 0
+    for index, (obj_type, obj) in enumerate(iter_objects(idf, progress=progress)):
+        indices, rows = groups.setdefault(obj_type.upper(), ([], []))
+        indices.append(index)
+        rows.append(obj.fieldvalues[1:])
+        n_objects += 1
+
+    violations: list[Violation] = []
+    for obj_type, (indices, rows) in groups.items():
+        if obj_type not in idd.schemas:
+            for index, row in zip(indices, rows):
+                violations.append(
+                    Violation(
+                        obj_type=obj_type,
+                        name="",
+                        index=index,
+                        field="",
+                        value="",
+                        rule="unknown_type",
+                        message=f"{obj_type} is not an object in this IDD",
+                    )
+                )
+            continue
+        _TypeChecker(idd.schemas[obj_type], indices, rows, violations).check()
+
+    violations.sort(key=lambda violation: violation.index)
+    return ValidationReport(
+        n_objects=n_objects,
+        violations=violations,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("idf", help="The IDF file to check")
+    parser.add_argument("--idd", required=True, help="The Energy+.idd to check with")
+    parser.add_argument(
+        "--limit", type=int, default=50, help="The number of violations to print"
+    )
+    args = parser.parse_args()
+
+    idd = load_idd_file(args.idd)
+    report = validate_objects(parse_idf(args.idf, idd), idd)
+    for violation in report.violations[: args.limit]:
+        print(
+            f"{violation.obj_type} '{violation.name}' {violation.field}: "
+            f"{violation.message}"
+        )
+    if len(report.violations) > args.limit:
+        print(f"... and {len(report.violations) - args.limit} more")
+    print(
+        f"Checked {report.n_objects} objects in {report.seconds:.2f}s: "
+        f"{len(report.violations)} violations {report.counts()}"
+    )
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,181 @@
+import difflib
+import io
+from os import PathLike
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Union
+
+from .graph import IDFGraph
+from .parser import format_object
+
+IDFTarget = Union[str, PathLike, IO[str], IO[bytes]]
+
+
+class _Target:
+    """
+    Open a path, or wrap an open text or binary stream (e.g. a socket's
+    `makefile("wb")`), for writing text; streams passed in are left open.
+    """
+
+    def __init__(self, target: IDFTarget, encoding: str):
+        self.target = target
+        self.encoding = encoding
+
+    def __enter__(self) -> IO[str]:
+        if isinstance(self.target, (str, PathLike)):
+            self.f = open(Path(self.target), "w", encoding=self.encoding)
+        elif isinstance(self.target, io.TextIOBase):
+            self.f = self.target
+        else:
+            self.f = io.TextIOWrapper(
+                self.target, encoding=self.encoding, write_through=True
+            )
+        return self.f
+
+    def __exit__(self, *exc):
+        if self.f is self.target:
+            self.f.flush()
+        elif isinstance(self.target, (str, PathLike)):
+            self.f.close()
+        else:
+            self.f.flush()
+            self.f.detach()
+
+
+def canonical_order(
+    graph: IDFGraph, nodes: Optional[Iterable[int]] = None
+) -> list[int]:
+    """
+    Sort nodes the way the objects should appear in a file.
+
+    Object types are ordered as in the IDD, as eppy writes them, or
+    alphabetically if the graph has no IDD or the IDD does not list the type.
+    Objects of the same type stay in the order they were added.
+
+    Args:
+        graph (IDFGraph): The graph the nodes belong to
+        nodes (Iterable[int], optional): The nodes to sort; defaults to all
+
+    Returns:
+        nodes (list[int]): The sorted nodes
+    """
+    type_order = (
+        {} if graph.idd is None else {t: i for i, t in enumerate(graph.idd.schemas)}
+    )
+    node_types = graph.graph.nodes(data="type")
+    nodes = graph.graph.nodes if nodes is None else nodes
+
+    def key(node_id: int) -> tuple[int, str, int]:
+        obj_type = node_types[node_id]
+        return type_order.get(obj_type, len(type_order)), obj_type, node_id
+
+    return sorted(nodes, key=key)
+
+
+def iter_idf_text(graph: IDFGraph, changed_only: bool = False) -> Iterator[str]:
+    """
+    Render a graph's objects as IDF text, one object at a time.
+
+    Args:
+        graph (IDFGraph): The graph to render
+        changed_only (bool): Only render the objects which were added or
+            edited since the graph was loaded.  Removed objects cannot be
+            expressed as IDF, so they are listed in comments at the end.
+
+    Yields:
+        text (str): The text of each object, in canonical order
+    """
+    nodes = canonical_order(graph, graph.changed if changed_only else None)
+    for node_id in nodes:
+        yield format_object(graph.object(node_id)) + "\n"
+    if changed_only and graph.removed:
+        yield "\n"
+        for obj_type, name, _ in graph.removed.values():
+            yield f"! removed: {obj_type}, {name}\n"
+
+
+def write_idf(
+    graph: IDFGraph,
+    target: IDFTarget,
+    changed_only: bool = False,
+    encoding: str = "utf-8",
+) -> int:
+    """
+    Stream a graph's objects to a file or stream as IDF text.
+
+    Objects are written one at a time, so the whole text is never held in
+    memory.
+
+    Args:
+        graph (IDFGraph): The graph to write
+        target (IDFTarget): A path, or an open text or binary stream
+        changed_only (bool): Only write the objects which were added or edited
+            since the graph was loaded, see `iter_idf_text`
+        encoding (str): The encoding to write paths and binary streams with
+
+    Returns:
+        n_objects (int): The number of objects written
+    """
+    with _Target(target, encoding) as f:
+        for text in iter_idf_text(graph, changed_only=changed_only):
+            f.write(text)
+    return len(graph.changed) if changed_only else len(graph)
+
+
+def iter_diff(graph: IDFGraph) -> Iterator[str]:
+    """
+    Describe the changes to a graph since it was loaded as a unified diff.
+
+    Each changed object is diffed on its own, labelled 'TYPE/Name' with its
+    name before and after the change, so line numbers in the hunks count from
+    the start of the object's text.  Added objects are diffed against
+    /dev/null, as are removed objects.
+
+    Args:
+        graph (IDFGraph): The graph whose changes to describe
+
+    Yields:
+        line (str): Each line of the diff, ending in a newline
+    """
+    for node_id in canonical_order(graph, graph.changed):
+        attrs = graph.graph.nodes[node_id]
+        if node_id in graph.added:
+            before, from_label = "", "/dev/null"
+        else:
+            name, before = graph.original[node_id]
+            from_label = f"a/{attrs['type']}/{name}"
+        after = format_object(attrs["object"])
+        to_label = f"b/{attrs['type']}/{attrs['name']}"
+        yield from _diff_lines(before, after, from_label, to_label)
+    for obj_type, name, before in graph.removed.values():
+        yield from _diff_lines(before, "", f"a/{obj_type}/{name}", "/dev/null")
+
+
+def _diff_lines(before: str, after: str, from_label: str, to_label: str):
+    for line in difflib.unified_diff(
+        before.strip("\n").splitlines(),
+        after.strip("\n").splitlines(),
+        fromfile=from_label,
+        tofile=to_label,
+        lineterm="",
+    ):
+        yield line + "\n"
+
+
+def write_diff(graph: IDFGraph, target: IDFTarget, encoding: str = "utf-8") -> int:
+    """
+    Write the changes to a graph since it was loaded as a unified diff.
+
+    Args:
+        graph (IDFGraph): The graph whose changes to write
+        target (IDFTarget): A path, or an open text or binary stream
+        encoding (str): The encoding to write paths and binary streams with
+
+    Returns:
+        n_objects (int): The number of objects added, edited or removed
+    """
+    n_objects = 0
+    with _Target(target, encoding) as f:
+        for line in iter_diff(graph):
+            f.write(line)
+            n_objects += line.startswith("--- ")
+    return n_objects
@@ -0,0 +1,77 @@
+"""
+Benchmark the graph analyses against the same questions asked of networkx.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_analysis --idd /path/to/Energy+.idd
+
+For each synthetic file, times finding connected components, unreferenced
+objects and dangling references with `GraphAnalysis`, both cold and from its
+cache, and times the components and unreferenced objects with networkx over
+the materialized `create_graph` output, as this used to be done by hand.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import networkx as nx
+
+from aiep.analysis import GraphAnalysis
+from aiep.idd import IDD
+from aiep.idf import build_graph_store
+from aiep.parser import parse_idf
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def analyse(analysis: GraphAnalysis) -> float:
+    start = time.perf_counter()
+    analysis.components()
+    analysis.unreferenced(referenceable_only=False)
+    analysis.dangling_references()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to resolve references with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'model':>24} {'nodes':>8} {'components':>11} {'cold s':>8} "
+        f"{'cached s':>9} {'networkx s':>11}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            store = build_graph_store(parse_idf(path, idd), idd, progress=False)
+            analysis = GraphAnalysis(store, idd)
+            cold = analyse(analysis)
+            cached = analyse(analysis)
+
+            _, _, graph = store.materialize()
+            start = time.perf_counter()
+            list(nx.weakly_connected_components(graph))
+            [node for node in graph if graph.out_degree(node) == 0]
+            networkx_elapsed = time.perf_counter() - start
+
+            print(
+                f"{f'synthetic {size}':>24} {store.n_nodes:>8} "
+                f"{len(analysis.components()):>11} {cold:>8.3f} {cached:>9.5f} "
+                f"{networkx_elapsed:>11.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
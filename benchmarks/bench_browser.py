@@ -0,0 +1,96 @@
+"""
+Benchmark the lookups the app makes on each render, with and without the
+`ModelIndex`.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_browser
+
+For each synthetic file, times one render's worth of lookups the way the app
+used to make them, by scanning the whole graph (listing a type's objects,
+ranking the zones and listing one zone's references through `nx.reverse`),
+against the same lookups through a `ModelIndex`, and checks they agree.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import networkx as nx
+
+from aiep.browser import ModelIndex
+from aiep.idf import create_graph
+from aiep.parser import parse_idf
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def scan(graph: nx.MultiDiGraph):
+    zones = sorted(
+        filter(lambda x: x.type == "ZONE", graph.nodes),
+        key=lambda x: -len(list(graph.successors(x))),
+    )
+    lights = list(filter(lambda x: x.type.upper() == "LIGHTS", graph.nodes))
+    references = [
+        (field, target)
+        for _, target, field in nx.reverse(graph).edges(zones[0], keys=True)
+    ]
+    referenced_by = [
+        (field, target) for _, target, field in graph.edges(zones[0], keys=True)
+    ]
+    return zones[0], lights, references, referenced_by
+
+
+def lookup(model: ModelIndex):
+    zone = model.most_referenced("ZONE")
+    return (
+        zone,
+        model.objects("LIGHTS"),
+        model.references(zone),
+        model.referenced_by(zone),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'model':>24} {'nodes':>8} {'index s':>8} {'scan ms':>8} "
+        f"{'lookup ms':>10} {'agree':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            _, _, graph = create_graph(parse_idf(path))
+
+            start = time.perf_counter()
+            model = ModelIndex(graph)
+            index_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            scanned = scan(graph)
+            scan_elapsed = time.perf_counter() - start
+
+            # the first lookup ranks the zones; later renders reuse the ranking
+            lookup(model)
+            start = time.perf_counter()
+            looked_up = lookup(model)
+            lookup_elapsed = time.perf_counter() - start
+
+            print(
+                f"{f'synthetic {size}':>24} {graph.number_of_nodes():>8} "
+                f"{index_elapsed:>8.3f} {scan_elapsed * 1000:>8.1f} "
+                f"{lookup_elapsed * 1000:>10.3f} {str(scanned == looked_up):>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark rendering the neighbourhoods of objects for an agent.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_context --idd /path/to/Energy+.idd
+
+For each synthetic file, renders the 2-hop neighbourhood of a sample of zones
+the way it used to be done by hand, by walking the `create_graph` graph and
+rendering every object as IDF text, and with a `ContextRenderer`, first cold
+and then again, as on the next turn of an agent, from its memoized fragments.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import networkx as nx
+
+from aiep.context import ContextRenderer
+from aiep.idd import IDD
+from aiep.idf import create_graph
+from aiep.parser import format_object, parse_idf
+from aiep.store import Node
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def by_hand(graph: nx.MultiDiGraph, zone: Node) -> str:
+    found = {zone}
+    frontier = [zone]
+    for _ in range(2):
+        frontier = [
+            other
+            for node in frontier
+            for other in (*graph.successors(node), *graph.predecessors(node))
+            if other not in found and not found.add(other)
+        ]
+    return "".join(format_object(node.object) for node in found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument("--zones", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=2_000)
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to resolve references with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'model':>24} {'nodes':>8} {'by hand ms':>11} {'cold ms':>8} "
+        f"{'warm ms':>8} {'tokens':>7}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            _, _, graph = create_graph(parse_idf(path, idd), idd)
+            renderer = ContextRenderer(graph)
+            zones = random.Random(0).sample(
+                renderer.model.objects("ZONE"),
+                min(args.zones, len(renderer.model.objects("ZONE"))),
+            )
+
+            start = time.perf_counter()
+            for zone in zones:
+                by_hand(graph, zone)
+            hand_elapsed = time.perf_counter() - start
+
+            timings = []
+            for _ in range(2):
+                start = time.perf_counter()
+                contexts = [
+                    renderer.render(zone, hops=2, budget=args.budget) for zone in zones
+                ]
+                timings.append(time.perf_counter() - start)
+            tokens = sum(context.n_tokens for context in contexts) / len(contexts)
+
+            print(
+                f"{f'synthetic {size}':>24} {graph.number_of_nodes():>8} "
+                f"{hand_elapsed / len(zones) * 1000:>11.3f} "
+                f"{timings[0] / len(zones) * 1000:>8.3f} "
+                f"{timings[1] / len(zones) * 1000:>8.3f} {tokens:>7.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
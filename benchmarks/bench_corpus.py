@@ -0,0 +1,119 @@
+"""
+Benchmark querying a Parquet corpus against reparsing the IDF files.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_corpus --idd /path/to/Energy+.idd
+
+For each corpus size, writes that many synthetic models (of `--objects`
+objects each) to a corpus with `CorpusWriter`, then answers "which walls are
+there, and what are the conductivities of the materials" once by scanning
+the corpus and once by reparsing every file, and checks the answers agree.
+"""
+
+import argparse
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from aiep.corpus import CorpusStore, CorpusWriter
+from aiep.idd import IDD
+from aiep.idf import build_graph_store
+from aiep.parser import parse_idf
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def query_corpus(corpus: CorpusStore) -> tuple[Counter, list[float]]:
+    walls = corpus.objects(
+        "BUILDINGSURFACE:DETAILED",
+        columns=["model"],
+        filter=ds.field("Surface_Type") == "Wall",
+    )
+    conductivities = corpus.objects("MATERIAL", columns=["Conductivity"])
+    return (
+        Counter(walls.column("model").cast("string").to_pylist()),
+        sorted(pc.drop_null(conductivities.column("Conductivity")).to_pylist()),
+    )
+
+
+def query_files(paths: list[Path], idd: IDD) -> tuple[Counter, list[float]]:
+    walls: Counter = Counter()
+    conductivities: list[float] = []
+    for path in paths:
+        for obj in parse_idf(path, idd):
+            if obj.key.upper() == "BUILDINGSURFACE:DETAILED":
+                if obj["Surface_Type"] == "Wall":
+                    walls[str(path)] += 1
+            elif obj.key.upper() == "MATERIAL":
+                conductivities.append(float(obj["Conductivity"]))
+    return walls, sorted(conductivities)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--models",
+        type=int,
+        nargs="+",
+        default=[10, 100, 500],
+        help="The numbers of models in the corpora",
+    )
+    parser.add_argument(
+        "--objects",
+        type=int,
+        default=2_000,
+        help="Approximate object count of each model",
+    )
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to type the fields with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'models':>8} {'objects':>9} {'ingest s':>9} {'corpus MB':>10} "
+        f"{'query s':>8} {'reparse s':>10} {'agree':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n_models in args.models:
+            directory = Path(tmpdir) / f"corpus_{n_models}"
+            (directory / "idfs").mkdir(parents=True)
+            paths = [
+                write_synthetic_idf(directory / "idfs" / f"model_{i}.idf", args.objects)
+                for i in range(n_models)
+            ]
+
+            start = time.perf_counter()
+            writer = CorpusWriter(directory / "corpus")
+            n_objects = 0
+            for path in paths:
+                store = build_graph_store(parse_idf(path, idd), idd, progress=False)
+                writer.add(store, str(path), "9.2", idd)
+                n_objects += store.n_nodes
+            writer.close()
+            ingest_elapsed = time.perf_counter() - start
+            size = sum(
+                f.stat().st_size for f in (directory / "corpus").rglob("*.parquet")
+            )
+
+            start = time.perf_counter()
+            from_corpus = query_corpus(CorpusStore(directory / "corpus"))
+            query_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            from_files = query_files(paths, idd)
+            reparse_elapsed = time.perf_counter() - start
+
+            print(
+                f"{n_models:>8} {n_objects:>9} {ingest_elapsed:>9.2f} "
+                f"{size / 1e6:>10.1f} {query_elapsed:>8.3f} "
+                f"{reparse_elapsed:>10.2f} {str(from_corpus == from_files):>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark `create_graph` on the bundled NECB model and synthetic models.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_create_graph --sizes 1000 10000 100000
+
+Loading the IDF and building the IDD are not included in the reported times;
+only graph construction is measured, both untyped and resolved with the IDD.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from archetypal.idfclass import IDF
+
+from aiep.idd import IDD
+from aiep.idf import create_graph
+from benchmarks.synthetic import write_synthetic_idf
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+NECB_IDF = (
+    DATA_DIR
+    / "NECB 2011-FullServiceRestaurant-NECB HDD Method-CAN_PQ_Montreal.Intl.AP.716270_CWEC.epw.idf"
+)
+
+
+def time_create_graph(idf: IDF, idd: Optional[IDD] = None) -> tuple[int, int, float]:
+    start = time.perf_counter()
+    nodes, edges, _ = create_graph(idf, idd)
+    elapsed = time.perf_counter() - start
+    return len(nodes), len(edges), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'model':>24} {'mode':>8} {'nodes':>8} {'edges':>8} {'seconds':>9} "
+        f"{'nodes/s':>10}"
+    )
+    workloads = [("NECB restaurant", NECB_IDF)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            workloads.append((f"synthetic {size}", path))
+
+        for label, path in workloads:
+            idf = IDF(idfname=path)
+            idd = IDD.from_idf(idf)
+            for mode, mode_idd in [("untyped", None), ("typed", idd)]:
+                n_nodes, n_edges, elapsed = time_create_graph(idf, mode_idd)
+                print(
+                    f"{label:>24} {mode:>8} {n_nodes:>8} {n_edges:>8} "
+                    f"{elapsed:>9.3f} {n_nodes / elapsed:>10.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
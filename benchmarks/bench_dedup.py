@@ -0,0 +1,113 @@
+"""
+Benchmark storing a corpus of models with shared objects kept once.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_dedup --idd /path/to/Energy+.idd
+
+For each corpus size, graphs that many synthetic models of slightly different
+sizes, which share their materials, constructions and schedules and the zones
+they have in common, and adds them to a `SharedObjectStore`.  Reports how
+many distinct objects are stored against the number across all models, the
+size of the store against the pickled graphs, and the time to find the models
+which use a construction, from the store and by loading and searching every
+pickled graph.
+"""
+
+import argparse
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+from aiep.dedup import SharedObjectStore
+from aiep.idd import IDD
+from aiep.idf import build_graph_store
+from aiep.parser import parse_idf
+from aiep.store import GraphStore
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def search(pickles: dict[str, Path], construction: str) -> list[str]:
+    models = []
+    for model, path in pickles.items():
+        with open(path, "rb") as f:
+            store: GraphStore = pickle.load(f)
+        if store.find_node("CONSTRUCTION", construction) is not None:
+            models.append(model)
+    return sorted(models)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--models",
+        type=int,
+        nargs="+",
+        default=[10, 100, 300],
+        help="The numbers of models in the corpora",
+    )
+    parser.add_argument(
+        "--objects",
+        type=int,
+        default=2_000,
+        help="Approximate object count of the smallest model",
+    )
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to resolve references with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'models':>8} {'objects':>9} {'distinct':>9} {'add s':>7} "
+        f"{'store MB':>9} {'pickles MB':>11} {'lookup ms':>10} {'search ms':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n_models in args.models:
+            directory = Path(tmpdir) / f"corpus_{n_models}"
+            directory.mkdir()
+            stores: dict[str, GraphStore] = {}
+            for i in range(n_models):
+                path = write_synthetic_idf(
+                    directory / f"model_{i}.idf", args.objects + 10 * i
+                )
+                stores[str(path)] = build_graph_store(
+                    parse_idf(path, idd), idd, progress=False
+                )
+            pickles: dict[str, Path] = {}
+            for model, store in stores.items():
+                pickles[model] = Path(model).with_suffix(".pkl")
+                with open(pickles[model], "wb") as f:
+                    pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickled = sum(path.stat().st_size for path in pickles.values())
+
+            shared = SharedObjectStore(directory / "shared.db")
+            start = time.perf_counter()
+            for model, store in stores.items():
+                shared.add(store, model)
+            add_elapsed = time.perf_counter() - start
+            n_occurrences, n_distinct = shared.counts()
+            size = sum(f.stat().st_size for f in directory.glob("shared.db*"))
+
+            model = next(iter(stores))
+            start = time.perf_counter()
+            digest = shared.hash_of(model, "Exterior Wall", "Construction")
+            from_store = sorted({model for model, _ in shared.models_with(digest)})
+            lookup_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            searched = search(pickles, "Exterior Wall")
+            search_elapsed = time.perf_counter() - start
+            assert from_store == searched
+            shared.close()
+
+            print(
+                f"{n_models:>8} {n_occurrences:>9} {n_distinct:>9} "
+                f"{add_elapsed:>7.2f} {size / 1e6:>9.1f} {pickled / 1e6:>11.1f} "
+                f"{lookup_elapsed * 1000:>10.2f} {search_elapsed * 1000:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark diffing and merging IDF graphs against comparing every object.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_diff --sizes 10000 50000 --idd /path/to/Energy+.idd
+
+For each size, writes a synthetic model and makes two variants of it, each
+editing a field of, renaming, removing and adding `--changed` of the objects
+(1% by default).  Reports the time to hash a model's objects, to diff the
+model against a variant, to diff it again reusing the model's digests, as
+when checking many edits to one model, and to merge both variants, against
+diffing by comparing every matched object field by field, and checks that
+the diffs find the same changed objects.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from aiep.diff import (
+    diff_graphs,
+    field_changes,
+    merge_graphs,
+    object_digests,
+    object_keys,
+)
+from aiep.idd import IDD
+from aiep.idf import build_graph_store
+from aiep.parser import IDFObject, parse_idf
+from aiep.store import GraphStore
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def variant(objects: list[IDFObject], fraction: float, seed: int) -> list[IDFObject]:
+    """
+    Copy a model, then edit, rename, remove and add a fraction of its objects.
+    """
+    rng = random.Random(seed)
+    objects = [
+        IDFObject(obj.key, obj.fieldnames, list(obj.fieldvalues)) for obj in objects
+    ]
+    named = [i for i, obj in enumerate(objects) if len(obj.fieldvalues) > 2]
+    n = max(1, int(len(objects) * fraction / 4))
+    picked = rng.sample(named, 4 * n)
+    for i in picked[:n]:
+        values = objects[i].fieldvalues
+        values[-1] = f"{values[-1]} {seed}"
+    for i in picked[n : 2 * n]:
+        objects[i].fieldvalues[1] = f"{objects[i].fieldvalues[1]} renamed {seed}"
+    added = []
+    for i in picked[2 * n : 3 * n]:
+        values = list(objects[i].fieldvalues)
+        values[1] = f"{values[1]} added {seed}"
+        added.append(IDFObject(values[0], objects[i].fieldnames, values))
+    removed = set(picked[3 * n :])
+    return [obj for i, obj in enumerate(objects) if i not in removed] + added
+
+
+def compare_all(old: GraphStore, new: GraphStore) -> set[str]:
+    """
+    Diff by comparing the fields of every object matched by type and name.
+    """
+    new_keys = object_keys(new)
+    changed = set()
+    for key, old_id in object_keys(old).items():
+        new_id = new_keys.get(key)
+        if new_id is not None and field_changes(
+            old.fieldnames(old_id), old.fieldvalues(old_id), new.fieldvalues(new_id)
+        ):
+            changed.add(new.names[new_id])
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 50_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument(
+        "--changed",
+        type=float,
+        default=0.01,
+        help="The fraction of objects each variant changes",
+    )
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to resolve references with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'objects':>8} {'changes':>8} {'hash ms':>8} {'diff ms':>8} "
+        f"{'warm ms':>8} {'compare ms':>11} {'merge ms':>9} {'conflicts':>10} {'agree':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            objects = list(parse_idf(path, idd))
+            base = build_graph_store(objects, idd, progress=False)
+            ours = build_graph_store(
+                variant(objects, args.changed, 1), idd, progress=False
+            )
+            theirs = build_graph_store(
+                variant(objects, args.changed, 2), idd, progress=False
+            )
+
+            start = time.perf_counter()
+            base_digests = object_digests(base)
+            hash_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            diff = diff_graphs(base, ours)
+            diff_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            warm = diff_graphs(base, ours, base_digests)
+            warm_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            compared = compare_all(base, ours)
+            compare_elapsed = time.perf_counter() - start
+            agree = warm == diff and compared == {
+                change.name for change in diff.changed
+            }
+
+            start = time.perf_counter()
+            merged = merge_graphs(base, ours, theirs)
+            merge_elapsed = time.perf_counter() - start
+            # the variants pick their objects independently, so any conflict
+            # is an object one side removed and the other changed
+            agree &= all(conflict.field is None for conflict in merged.conflicts)
+            merged_diff = diff_graphs(
+                base, build_graph_store(merged.objects, idd, progress=False)
+            )
+            n_changes = (
+                len(diff.added)
+                + len(diff.removed)
+                + len(diff.renamed)
+                + len(diff.changed)
+            )
+            agree &= len(merged_diff.changed) >= len(diff.changed)
+
+            print(
+                f"{base.n_nodes:>8} {n_changes:>8} {hash_elapsed * 1000:>8.1f} "
+                f"{diff_elapsed * 1000:>8.1f} {warm_elapsed * 1000:>8.1f} "
+                f"{compare_elapsed * 1000:>11.1f} "
+                f"{merge_elapsed * 1000:>9.1f} {len(merged.conflicts):>10} "
+                f"{str(agree):>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
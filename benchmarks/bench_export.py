@@ -0,0 +1,88 @@
+"""
+Benchmark exporting graphs for a graph database.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_export --idd /path/to/Energy+.idd
+
+For each synthetic file, times exporting its graph to a SQLite file and to
+`neo4j-admin import` CSVs, reports the rows written per second, and checks
+that exporting it again leaves the SQLite node and relationship counts as
+they were, i.e. that the ids are stable.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from aiep.export import Neo4jCSVSink, SQLiteSink, export_graph
+from aiep.idd import IDD
+from aiep.idf import build_graph_store
+from aiep.parser import parse_idf
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def timed_export(store, sink, model: str, idd: IDD) -> float:
+    start = time.perf_counter()
+    try:
+        export_graph(store, sink, model, idd)
+    finally:
+        sink.close()
+    return time.perf_counter() - start
+
+
+def counts(path: Path) -> tuple[int, int]:
+    sink = SQLiteSink(path)
+    try:
+        (n_nodes,) = sink.connection.execute("SELECT COUNT(*) FROM nodes").fetchone()
+        (n_edges,) = sink.connection.execute("SELECT COUNT(*) FROM edges").fetchone()
+    finally:
+        sink.close()
+    return n_nodes, n_edges
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to resolve references with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'model':>24} {'nodes':>8} {'edges':>8} {'sqlite s':>9} "
+        f"{'csv s':>8} {'rows/s':>9} {'stable':>7}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            store = build_graph_store(parse_idf(path, idd), idd, progress=False)
+            model = path.name
+
+            database = Path(tmpdir) / f"synthetic_{size}.db"
+            sqlite_elapsed = timed_export(store, SQLiteSink(database), model, idd)
+            first = counts(database)
+            timed_export(store, SQLiteSink(database), model, idd)
+            stable = counts(database) == first == (store.n_nodes, store.n_edges)
+
+            csv_dir = Path(tmpdir) / f"synthetic_{size}_csv"
+            csv_elapsed = timed_export(store, Neo4jCSVSink(csv_dir, idd), model, idd)
+
+            rows = store.n_nodes + store.n_edges
+            print(
+                f"{f'synthetic {size}':>24} {store.n_nodes:>8} {store.n_edges:>8} "
+                f"{sqlite_elapsed:>9.3f} {csv_elapsed:>8.3f} "
+                f"{rows / sqlite_elapsed:>9.0f} {str(stable):>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
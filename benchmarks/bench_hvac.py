@@ -0,0 +1,122 @@
+"""
+Benchmark tracing air loops through an `HVACNetwork` against searching.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_hvac --sizes 10000 100000 --idd /path/to/Energy+.idd
+
+For each size, writes a synthetic model whose zones are served by air loops
+of `--zones-per-loop` zones, breaks the last loop by misnaming its fan's
+outlet node, and builds the network.  Reports the time to build it, to trace
+every loop, and to trace the broken loop, against tracing the broken loop by
+scanning every object for the next node at each step, as one would without
+an index, and checks that both find the same nodes.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from aiep.hvac import HVACNetwork
+from aiep.idd import IDD
+from aiep.idf import build_graph_store
+from aiep.parser import IDFObject, parse_idf
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def scan_trace(network: HVACNetwork, idd: IDD, inlet: str) -> set[str]:
+    """
+    Follow the flow from a node by scanning every object at each step.
+    """
+    store = network.store
+    seen = {inlet.upper()}
+    frontier = [inlet.upper()]
+    while frontier:
+        found = []
+        for node_id, type_id, fieldnames, fieldvalues in store.iter_fields():
+            values = dict(zip(fieldnames, fieldvalues))
+            for inlet_fields, outlet_fields in network._streams_of(
+                idd, store.types[type_id].upper()
+            ):
+                if not any(
+                    str(values.get(field, "")).upper() in frontier
+                    for field in inlet_fields
+                ):
+                    continue
+                for field in outlet_fields:
+                    name = str(values.get(field, "")).upper()
+                    if name and name not in seen:
+                        seen.add(name)
+                        found.append(name)
+        frontier = found
+    return seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument(
+        "--zones-per-loop",
+        type=int,
+        default=20,
+        help="The number of zones each air loop serves",
+    )
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to resolve references with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'objects':>8} {'loops':>6} {'fluid nodes':>12} {'build s':>8} "
+        f"{'all ms':>8} {'broken ms':>10} {'scan ms':>10} {'agree':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(
+                Path(tmpdir) / f"synthetic_{size}.idf", size, args.zones_per_loop
+            )
+            objects: list[IDFObject] = list(parse_idf(path, idd))
+            fan = [obj for obj in objects if obj.type == "FAN:CONSTANTVOLUME"][-1]
+            fan["Air_Outlet_Node_Name"] = "Misnamed Node"
+            store = build_graph_store(objects, idd, progress=False)
+
+            start = time.perf_counter()
+            network = HVACNetwork(store, idd)
+            build_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            traces = network.trace_all()
+            all_elapsed = time.perf_counter() - start
+            broken = [trace for trace in traces if not trace.ok]
+            assert len(broken) == 1 and broken[0].sides[0].dead_ends == [
+                "Misnamed Node"
+            ]
+
+            loop = network.find_loop(broken[0].name)
+            start = time.perf_counter()
+            supply = network.trace(loop).sides[0]
+            trace_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            scanned = scan_trace(network, idd, supply.inlets[0])
+            scan_elapsed = time.perf_counter() - start
+            agree = scanned == {name.upper() for name in supply.nodes}
+
+            print(
+                f"{store.n_nodes:>8} {len(traces):>6} {network.n_nodes:>12} "
+                f"{build_elapsed:>8.3f} {all_elapsed * 1000:>8.2f} "
+                f"{trace_elapsed * 1000:>10.3f} {scan_elapsed * 1000:>10.1f} "
+                f"{str(agree):>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark building an `IDD` natively against building it through eppy.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_idd --idd /path/to/Energy+.idd
+
+`IDD.from_idf` needs an IDF loaded through archetypal, which parses the IDD
+with eppy first, so its reported time includes loading the bundled NECB model.
+`IDD.from_idd_file` only reads the IDD file.
+"""
+
+import argparse
+import time
+
+from archetypal.idfclass import IDF
+
+from aiep.idd import IDD
+from benchmarks.bench_create_graph import NECB_IDF
+
+
+def time_from_idf() -> tuple[IDD, float]:
+    start = time.perf_counter()
+    idd = IDD.from_idf(IDF(idfname=NECB_IDF))
+    return idd, time.perf_counter() - start
+
+
+def time_from_idd_file(idd_path: str) -> tuple[IDD, float]:
+    start = time.perf_counter()
+    idd = IDD.from_idd_file(idd_path)
+    return idd, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--idd",
+        help="The Energy+.idd to parse natively; defaults to the one archetypal uses",
+    )
+    args = parser.parse_args()
+
+    eppy_idd, eppy_elapsed = time_from_idf()
+    idd_path = args.idd or IDF(idfname=NECB_IDF).iddname
+    native_idd, native_elapsed = time_from_idd_file(idd_path)
+
+    print(f"{'path':>14} {'schemas':>8} {'type edges':>11} {'seconds':>9}")
+    for label, idd, elapsed in [
+        ("eppy", eppy_idd, eppy_elapsed),
+        ("native", native_idd, native_elapsed),
+    ]:
+        n_edges = idd.make_graph().number_of_edges()
+        print(f"{label:>14} {len(idd):>8} {n_edges:>11} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
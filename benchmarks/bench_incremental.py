@@ -0,0 +1,111 @@
+"""
+Benchmark editing an `IDFGraph` in place against rebuilding the whole graph.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_incremental --idd /path/to/Energy+.idd
+
+For each synthetic file, renames zones (re-pointing their surfaces, people and
+lights), points lights at a new schedule, and removes and re-adds objects,
+then checks that the edited graph has the same edges as a graph rebuilt from
+scratch from the edited objects.  The time per edit should stay flat as the
+files grow, while the rebuild time grows with them.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from aiep.graph import IDFGraph
+from aiep.idd import IDD
+from aiep.idf import build_graph_store
+from aiep.parser import parse_idf
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def edit(graph: IDFGraph, n_edits: int, seed: int = 0) -> int:
+    rng = random.Random(seed)
+    zones = [n for n, t in graph.graph.nodes(data="type") if t == "ZONE"]
+    lights = [n for n, t in graph.graph.nodes(data="type") if t == "LIGHTS"]
+    schedules = [
+        n for n, t in graph.graph.nodes(data="type") if t.startswith("SCHEDULE")
+    ]
+    for i in range(n_edits):
+        kind = i % 3
+        if kind == 0:
+            zone = rng.choice(zones)
+            graph.rename(zone, f"{graph.graph.nodes[zone]['name']} renamed {i}")
+        elif kind == 1:
+            schedule = graph.graph.nodes[rng.choice(schedules)]["name"]
+            graph.set_field(rng.choice(lights), "Schedule_Name", schedule)
+        else:
+            node = rng.choice(lights)
+            obj = graph.object(node)
+            graph.remove_object(node)
+            lights.remove(node)
+            lights.append(graph.add_object(obj))
+    return n_edits
+
+
+def matches_rebuild(graph: IDFGraph) -> bool:
+    nodes = graph.graph.nodes
+    objects = [nodes[node]["object"] for node in sorted(nodes)]
+    store = build_graph_store(objects, graph.idd, progress=False)
+    # the store copies the objects' values, so match its nodes by position
+    rebuilt = {
+        (id(objects[source]), store.edge_field(i), id(objects[target]))
+        for i, (source, target) in enumerate(
+            zip(store.edge_sources, store.edge_targets)
+        )
+    }
+    edited = {
+        (id(nodes[source]["object"]), field, id(nodes[target]["object"]))
+        for target, source, field in graph.graph.edges(keys=True)
+    }
+    return rebuilt == edited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument("--edits", type=int, default=300, help="Edits per file")
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to name fields and resolve with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'model':>24} {'nodes':>8} {'us/edit':>9} {'rebuild s':>10} "
+        f"{'matches rebuild':>16}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            objects = list(parse_idf(path, idd))
+            graph = IDFGraph.from_idf(objects, idd)
+
+            start = time.perf_counter()
+            n_edits = edit(graph, args.edits)
+            per_edit = (time.perf_counter() - start) / n_edits
+
+            start = time.perf_counter()
+            build_graph_store(objects, idd, progress=False)
+            rebuild = time.perf_counter() - start
+
+            print(
+                f"{f'synthetic {size}':>24} {len(graph):>8} {per_edit * 1e6:>9.1f} "
+                f"{rebuild:>10.3f} {str(matches_rebuild(graph)):>16}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark keeping raw field values in a `GraphStore` against pinning objects.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_lazy --sizes 10000 --idd /path/to/Energy+.idd
+
+Each model is loaded twice, as `EpBunch` objects through eppy and as
+`IDFObject` records through `aiep.parser.parse_idf`, and graphed.  Reports the
+memory held while the loaded objects are kept alive, as they were when every
+node pinned its object, against the memory held by the store alone once they
+are dropped.  Then times one pass over every field value of every object:
+reading each field by name as `create_graph` used to, zipping each object's
+names and values, and iterating over the store's flat per-type tables.
+"""
+
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterable
+
+from eppy.modeleditor import IDF
+
+from aiep.idd import IDD
+from aiep.idf import build_graph_store, iter_objects
+from aiep.parser import parse_idf
+from aiep.store import GraphStore
+from benchmarks.bench_create_graph import NECB_IDF
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def held_memory(load: Callable[[], Iterable], idd: IDD) -> tuple[int, int]:
+    """
+    Returns:
+        pinned (int): Bytes held by the objects and the store together
+        flat (int): Bytes held by the store once the objects are dropped
+    """
+    gc.collect()
+    tracemalloc.start()
+    loaded = load()
+    store = build_graph_store(loaded, idd, progress=False)
+    gc.collect()
+    pinned, _ = tracemalloc.get_traced_memory()
+    del loaded
+    gc.collect()
+    flat, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return pinned, flat
+
+
+def by_name(objects: list) -> int:
+    n = 0
+    for obj in objects:
+        for field in obj.fieldnames[: len(obj.fieldvalues)]:
+            obj[field]
+            n += 1
+    return n
+
+
+def zipped(objects: list) -> int:
+    n = 0
+    for obj in objects:
+        for field, value in zip(obj.fieldnames, obj.fieldvalues):
+            n += 1
+    return n
+
+
+def flat(store: GraphStore) -> int:
+    n = 0
+    for _, _, fieldnames, fieldvalues in store.iter_fields():
+        for field, value in zip(fieldnames, fieldvalues):
+            n += 1
+    return n
+
+
+def timed(run: Callable[[], int]) -> tuple[int, float]:
+    start = time.perf_counter()
+    n = run()
+    return n, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to load and resolve with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+    IDF.setiddname(args.idd)
+
+    print(
+        f"{'model':>24} {'objects':>9} {'nodes':>8} {'pinned MB':>10} "
+        f"{'flat MB':>8} {'by name ms':>11} {'zip ms':>8} {'flat ms':>8}"
+    )
+    workloads = [("NECB restaurant", NECB_IDF)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            workloads.append((f"synthetic {size}", path))
+
+        for label, path in workloads:
+            for kind, load in [
+                ("EpBunch", lambda: IDF(str(path))),
+                ("IDFObject", lambda: list(parse_idf(path, idd))),
+            ]:
+                # eppy parses and caches its IDD on the first load, so load
+                # once before measuring
+                loaded = load()
+                store = build_graph_store(loaded, idd, progress=False)
+                pinned, held = held_memory(load, idd)
+                objects = [obj for _, obj in iter_objects(loaded, progress=False)]
+                n_by_name, by_name_elapsed = timed(lambda: by_name(objects))
+                n_zipped, zip_elapsed = timed(lambda: zipped(objects))
+                n_flat, flat_elapsed = timed(lambda: flat(store))
+                assert n_by_name == n_zipped == n_flat
+                print(
+                    f"{label:>24} {kind:>9} {store.n_nodes:>8} "
+                    f"{pinned / 1e6:>10.2f} {held / 1e6:>8.2f} "
+                    f"{by_name_elapsed * 1000:>11.2f} {zip_elapsed * 1000:>8.2f} "
+                    f"{flat_elapsed * 1000:>8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark the native IDF parser against loading through archetypal.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_parser --sizes 10000 100000
+
+For each file, reports the time to load it with `archetypal.idfclass.IDF`,
+the time to stream it with `aiep.parser.parse_idf`, and the peak memory
+allocated while streaming (which should stay flat as files grow).
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from archetypal.idfclass import IDF
+
+from aiep.parser import parse_idf
+from benchmarks.bench_create_graph import NECB_IDF
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def time_archetypal(path: Path) -> float:
+    start = time.perf_counter()
+    IDF(idfname=path)
+    return time.perf_counter() - start
+
+
+def time_parser(path: Path) -> tuple[int, float, int]:
+    start = time.perf_counter()
+    n_objects = sum(1 for _ in parse_idf(path))
+    elapsed = time.perf_counter() - start
+
+    # tracing allocations slows the parser down, so measure memory separately
+    tracemalloc.start()
+    for _ in parse_idf(path):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return n_objects, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument(
+        "--skip-archetypal",
+        action="store_true",
+        help="Only time the native parser",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'model':>24} {'objects':>8} {'archetypal s':>13} {'parser s':>9} "
+        f"{'speedup':>8} {'peak MB':>8}"
+    )
+    workloads = [("NECB restaurant", NECB_IDF)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            workloads.append((f"synthetic {size}", path))
+
+        for label, path in workloads:
+            n_objects, parser_elapsed, peak = time_parser(path)
+            if args.skip_archetypal:
+                archetypal_elapsed = float("nan")
+            else:
+                archetypal_elapsed = time_archetypal(path)
+            print(
+                f"{label:>24} {n_objects:>8} {archetypal_elapsed:>13.3f} "
+                f"{parser_elapsed:>9.3f} {archetypal_elapsed / parser_elapsed:>8.1f} "
+                f"{peak / 1e6:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Benchmark queries through the query engine against handwritten loops over
+the nodes of `create_graph`.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_query --sizes 10000 100000 --idd /path/to/Energy+.idd
+
+For each size, writes a synthetic model, builds its graph, and runs each
+query three ways: on a new engine, which compiles the query and builds the
+indexes it needs; again on the same engine, reusing them, as a long-lived
+tool answering many questions about one model would; and as a loop over the
+graph's nodes reading fields from their objects.  Reports the milliseconds
+each took, the number of objects found, and whether the engine and the loop
+agree.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import networkx as nx
+
+from aiep.idd import IDD
+from aiep.idf import build_graph_store
+from aiep.parser import parse_idf
+from aiep.query import QueryEngine
+from aiep.store import GraphStore
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def _of_type(graph: nx.MultiDiGraph, obj_type: str) -> list:
+    return [node for node in graph.nodes if node.type.upper() == obj_type]
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return float("nan")
+
+
+def loop_zones_east(graph: nx.MultiDiGraph) -> set[str]:
+    return {
+        zone.name
+        for zone in _of_type(graph, "ZONE")
+        if _number(zone.object["X_Origin"]) >= 500
+    }
+
+
+def loop_exterior_wall_constructions(graph: nx.MultiDiGraph) -> set[str]:
+    zones = {
+        zone.name.upper()
+        for zone in _of_type(graph, "ZONE")
+        if _number(zone.object["X_Origin"]) >= 900
+    }
+    return {
+        surface.object["Construction_Name"]
+        for surface in _of_type(graph, "BUILDINGSURFACE:DETAILED")
+        if surface.object["Surface_Type"].upper() == "WALL"
+        and surface.object["Outside_Boundary_Condition"].upper() == "OUTDOORS"
+        and surface.object["Zone_Name"].upper() in zones
+    }
+
+
+def loop_occupied_zones(graph: nx.MultiDiGraph) -> set[str]:
+    zones = {
+        zone.name.upper(): zone.name
+        for zone in _of_type(graph, "ZONE")
+        if _number(zone.object["Y_Origin"]) < 100
+    }
+    return {
+        zones[people.object["Zone_or_ZoneList_Name"].upper()]
+        for people in _of_type(graph, "PEOPLE")
+        if people.object["Zone_or_ZoneList_Name"].upper() in zones
+    }
+
+
+def loop_zone_surfaces(graph: nx.MultiDiGraph) -> set[str]:
+    return {
+        surface.name
+        for surface in _of_type(graph, "BUILDINGSURFACE:DETAILED")
+        if surface.object["Zone_Name"].upper() == "ZONE 000042"
+    }
+
+
+QUERIES: list[tuple[str, str, Callable[[nx.MultiDiGraph], set[str]]]] = [
+    ("range", "ZONE[X_Origin >= 500]", loop_zones_east),
+    (
+        "join",
+        "BUILDINGSURFACE:DETAILED[Surface_Type = Wall, "
+        "Outside_Boundary_Condition = Outdoors, "
+        "Zone_Name -> ZONE[X_Origin >= 900]] -> Construction_Name",
+        loop_exterior_wall_constructions,
+    ),
+    (
+        "back",
+        "ZONE[Y_Origin < 100] <- PEOPLE.Zone_or_ZoneList_Name "
+        "-> Zone_or_ZoneList_Name",
+        loop_occupied_zones,
+    ),
+    (
+        "point",
+        "ZONE[Name = 'Zone 000042'] <- BUILDINGSURFACE:DETAILED.Zone_Name",
+        loop_zone_surfaces,
+    ),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to resolve references with"
+    )
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'objects':>8} {'query':>6} {'found':>6} {'cold ms':>8} "
+        f"{'warm ms':>8} {'loop ms':>8} {'agree':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            store: GraphStore = build_graph_store(
+                parse_idf(path, idd), idd, progress=False
+            )
+            _, _, graph = store.materialize()
+            engine = QueryEngine(store, idd)
+            for label, text, loop in QUERIES:
+                query = engine.query(text)
+
+                start = time.perf_counter()
+                found = query.names()
+                cold = time.perf_counter() - start
+
+                start = time.perf_counter()
+                query.names()
+                warm = time.perf_counter() - start
+
+                start = time.perf_counter()
+                expected = loop(graph)
+                loop_elapsed = time.perf_counter() - start
+
+                agree = set(found) == expected and len(found) == len(expected)
+                print(
+                    f"{store.n_nodes:>8} {label:>6} {len(found):>6} "
+                    f"{cold * 1000:>8.2f} {warm * 1000:>8.2f} "
+                    f"{loop_elapsed * 1000:>8.2f} {str(agree):>6}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark retrieval over the text of an IDD.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_retrieval --idd /path/to/Energy+.idd
+
+Builds the index (uncached), loads it back from disk, then runs a query for
+each of a sample of field names and object memos, and reports the median and
+95th percentile latency of the inverted file search and of scoring every
+chunk, with the share of the exact top k the inverted file search finds.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from aiep.retrieval import HashingEmbedder, load_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--idd", required=True, help="The Energy+.idd to index")
+    parser.add_argument(
+        "--docs", nargs="*", default=[], help="Text or markdown documents to index"
+    )
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument(
+        "--n-probe",
+        type=int,
+        nargs="+",
+        default=[4, 8, 16],
+        help="The numbers of clusters to score",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        index = load_index(args.idd, args.docs, cache_dir=cache_dir)
+        build_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        index = load_index(args.idd, args.docs, HashingEmbedder(), cache_dir=cache_dir)
+        load_elapsed = time.perf_counter() - start
+        print(
+            f"{len(index.chunks)} chunks in {len(index.centroids)} clusters: "
+            f"built in {build_elapsed:.2f}s, loaded in {load_elapsed * 1000:.1f} ms"
+        )
+
+        rng = random.Random(0)
+        queries = [
+            " ".join(chunk.text.split()[:8])
+            for chunk in rng.sample(index.chunks, min(args.queries, len(index.chunks)))
+        ]
+
+        def run(**kwargs) -> tuple[list[float], list[set[str]]]:
+            latencies, results = [], []
+            for query in queries:
+                start = time.perf_counter()
+                hits = index.search(query, k=args.k, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                results.append({hit.chunk.text for hit in hits})
+            return latencies, results
+
+        print(f"{'search':>12} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+        exact_latencies, exact_results = run(exact=True)
+        rows = [("exact", exact_latencies, exact_results)]
+        for n_probe in args.n_probe:
+            rows.append((f"n_probe={n_probe}", *run(n_probe=n_probe)))
+        for name, latencies, results in rows:
+            recall = np.mean(
+                [
+                    len(found & exact) / max(1, len(exact))
+                    for found, exact in zip(results, exact_results)
+                ]
+            )
+            print(
+                f"{name:>12} {np.percentile(latencies, 50) * 1000:>8.2f} "
+                f"{np.percentile(latencies, 95) * 1000:>8.2f} {recall:>7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
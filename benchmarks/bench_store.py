@@ -0,0 +1,81 @@
+"""
+Benchmark the columnar `GraphStore` against the pydantic `create_graph` output.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_store --sizes 10000 100000 --idd /path/to/Energy+.idd
+
+Files are streamed with `aiep.parser.parse_idf` so that loading them is cheap.
+For each file, reports the time and the peak memory allocated while building
+the graph, either into a `GraphStore` or as pydantic `Node`/`Edge` models.
+References are resolved with the IDD if one is given, and untyped otherwise.
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional
+
+from aiep.idd import IDD
+from aiep.idf import build_graph_store, create_graph
+from aiep.parser import IDFObject, parse_idf
+from benchmarks.bench_create_graph import NECB_IDF
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def measure(build: Callable[[], object]) -> tuple[float, int]:
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    # tracing allocations slows everything down, so measure memory separately
+    tracemalloc.start()
+    graph = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del graph
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument("--idd", help="The Energy+.idd to resolve references with")
+    args = parser.parse_args()
+    idd: Optional[IDD] = IDD.from_idd_file(args.idd) if args.idd else None
+
+    print(
+        f"{'model':>24} {'nodes':>8} {'edges':>8} {'mode':>9} {'seconds':>9} "
+        f"{'peak MB':>8}"
+    )
+    workloads = [("NECB restaurant", NECB_IDF)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size)
+            workloads.append((f"synthetic {size}", path))
+
+        for label, path in workloads:
+            # parse up front so only graph construction is measured
+            objects: list[IDFObject] = list(parse_idf(path, idd))
+            store = build_graph_store(objects, idd)
+            for mode, build in [
+                ("store", lambda: build_graph_store(objects, idd)),
+                ("pydantic", lambda: create_graph(objects, idd)),
+            ]:
+                elapsed, peak = measure(build)
+                print(
+                    f"{label:>24} {store.n_nodes:>8} {store.n_edges:>8} {mode:>9} "
+                    f"{elapsed:>9.3f} {peak / 1e6:>8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
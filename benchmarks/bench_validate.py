@@ -0,0 +1,63 @@
+"""
+Benchmark validating IDF objects against the IDD.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_validate --idd /path/to/Energy+.idd
+
+Validates the bundled NECB model and synthetic files of growing size.  Parsing
+is timed separately, since a file is usually parsed anyway before it is
+graphed or simulated.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from aiep.idd import IDD
+from aiep.parser import parse_idf
+from aiep.validate import validate_objects
+from benchmarks.bench_create_graph import NECB_IDF
+from benchmarks.synthetic import write_synthetic_idf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    parser.add_argument("--idd", required=True, help="The Energy+.idd to check with")
+    args = parser.parse_args()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(
+        f"{'model':>24} {'objects':>8} {'parse s':>8} {'validate s':>11} "
+        f"{'violations':>11}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workloads = [("NECB restaurant", Path(NECB_IDF))] + [
+            (
+                f"synthetic {size}",
+                write_synthetic_idf(Path(tmpdir) / f"synthetic_{size}.idf", size),
+            )
+            for size in args.sizes
+        ]
+        for label, path in workloads:
+            start = time.perf_counter()
+            objects = list(parse_idf(path, idd))
+            parse_elapsed = time.perf_counter() - start
+
+            report = validate_objects(objects, idd)
+            print(
+                f"{label:>24} {report.n_objects:>8} {parse_elapsed:>8.3f} "
+                f"{report.seconds:>11.3f} {len(report.violations):>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
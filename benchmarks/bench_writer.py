@@ -0,0 +1,71 @@
+"""
+Benchmark writing IDF text from an `IDFGraph` against eppy's `saveas`.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_writer --idd /path/to/Energy+.idd
+
+Times saving the bundled NECB model with eppy, writing the whole model from
+a graph of the same eppy objects and from a graph of parsed objects, and,
+after renaming one zone, writing only the changed objects and a diff.  Every
+write is repeated and the best time is reported.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from eppy.modeleditor import IDF
+
+from aiep.graph import IDFGraph
+from aiep.idd import IDD
+from aiep.parser import parse_idf
+from aiep.writer import write_diff, write_idf
+from benchmarks.bench_create_graph import NECB_IDF
+
+
+def best_time(write: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        write()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--idd", required=True, help="The Energy+.idd to load with")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    IDF.setiddname(args.idd)
+    eppy_idf = IDF(str(NECB_IDF))
+    idd = IDD.from_idd_file(args.idd)
+    eppy_graph = IDFGraph.from_idf(eppy_idf, idd)
+    parsed_graph = IDFGraph.from_idf(parse_idf(NECB_IDF, idd), idd)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out = Path(tmpdir) / "out.idf"
+        rows = [
+            ("eppy saveas", lambda: eppy_idf.saveas(str(out))),
+            ("graph (EpBunch)", lambda: write_idf(eppy_graph, out)),
+            ("graph (parsed)", lambda: write_idf(parsed_graph, out)),
+        ]
+        zone = next(n for n, t in parsed_graph.graph.nodes(data="type") if t == "ZONE")
+        parsed_graph.rename(zone, "Renamed Zone")
+        rows += [
+            ("changed only", lambda: write_idf(parsed_graph, out, changed_only=True)),
+            ("diff", lambda: write_diff(parsed_graph, out)),
+        ]
+
+        print(f"{'writer':>18} {'seconds':>9} {'KB':>8}")
+        for label, write in rows:
+            elapsed = best_time(write, args.repeat)
+            print(f"{label:>18} {elapsed:>9.4f} {out.stat().st_size / 1e3:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
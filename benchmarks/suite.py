@@ -0,0 +1,320 @@
+"""
+Run the benchmark suite over the pipeline's stages and store the results, to
+compare across commits.
+
+Usage (from the repository root):
+
+    python -m benchmarks.suite run --idd /path/to/Energy+.idd
+    python -m benchmarks.suite run --idd /path/to/Energy+.idd --sizes 1000 10000
+    python -m benchmarks.suite compare benchmarks/results/abc1234.json \\
+        benchmarks/results/def5678.json
+
+`run` times each stage of loading a model and building its graph, on the
+bundled NECB restaurant model and on synthetic models of each size from
+`benchmarks.synthetic` (zones with surfaces, gains and schedules, served by
+air loops), and times building the IDD and its graph once.  The NECB model
+is also loaded through eppy and its graph built from eppy's objects with
+`create_graph`, as the app does.  Each stage runs
+`--repeat` times after its inputs are prepared, keeping the fastest time,
+then once more under tracemalloc for its peak memory.  For each stage run on
+several synthetic sizes, the scaling exponent between the smallest and
+largest is reported, i.e. 1 for linear.
+
+Results are written as JSON to `benchmarks/results/<commit>.json`, with the
+machine and Python they were measured on.  `compare` lists each stage's time
+and memory in a newer result relative to an older one, flags stages which got
+slower or bigger by more than `--threshold`, and exits with 1 if any did.
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from eppy.modeleditor import IDF
+
+from aiep.idd import IDD, IDDIndex
+from aiep.idf import build_graph_store, create_graph
+from aiep.parser import parse_idf
+from aiep.profiling import Profiler
+from benchmarks.bench_create_graph import NECB_IDF
+from benchmarks.synthetic import write_synthetic_idf
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def measure(run: Callable[[], Any], repeat: int) -> tuple[float, int]:
+    """
+    Returns:
+        seconds (float): The fastest of `repeat` runs
+        peak_bytes (int): The most memory allocated during one more run
+    """
+    best = math.inf
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    profiler = Profiler(trace_memory=True)
+    with profiler.span("run") as span:
+        run()
+    return best, span.peak_bytes
+
+
+Stage = tuple[str, Callable[[], Any], int]
+
+
+def model_stages(path: Path, idd: IDD) -> list[Stage]:
+    """
+    The stages of building a model's graph, each with the number of objects
+    it goes over.
+    """
+    objects = list(parse_idf(path, idd))
+    store = build_graph_store(objects, idd, progress=False)
+    n_objects = len(objects)
+    return [
+        ("parse", lambda: list(parse_idf(path, idd)), n_objects),
+        (
+            "graph.untyped",
+            lambda: build_graph_store(objects, None, progress=False),
+            n_objects,
+        ),
+        (
+            "graph.typed",
+            lambda: build_graph_store(objects, idd, progress=False),
+            n_objects,
+        ),
+        ("graph.materialize", store.materialize, n_objects),
+    ]
+
+
+def eppy_stages(path: Path, idd_path: str, idd: IDD) -> list[Stage]:
+    """
+    The stages of loading a model through eppy, reading its IDD, and building
+    its graph from eppy's objects with `create_graph`.
+    """
+    # eppy parses its IDD on the first load and reuses it, as a long-lived
+    # process would
+    IDF.setiddname(idd_path)
+    loaded = IDF(str(path))
+    n_objects = sum(len(objs) for objs in loaded.idfobjects.values())
+    return [
+        ("load.eppy", lambda: IDF(str(path)), n_objects),
+        ("idd.from_idf", lambda: IDD.from_idf(loaded), len(loaded.idd_info)),
+        (
+            "create_graph",
+            lambda: create_graph(loaded, idd, progress=False),
+            n_objects,
+        ),
+    ]
+
+
+def idd_stages(idd_path: str) -> list[Stage]:
+    idd = IDD.from_idd_file(idd_path)
+    return [
+        ("idd.from_idd_file", lambda: IDD.from_idd_file(idd_path), len(idd)),
+        ("idd.index", lambda: IDDIndex(idd), len(idd)),
+        ("idd.make_graph", idd.make_graph, len(idd)),
+    ]
+
+
+def git_commit() -> tuple[str, bool]:
+    """
+    Returns:
+        commit (str): The short hash of the checked out commit
+        dirty (bool): Whether tracked files have uncommitted changes
+    """
+    root = Path(__file__).parent.parent
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", True
+    return commit, bool(status)
+
+
+def scaling(results: list[dict]) -> dict[str, float]:
+    """
+    The exponent of each stage's time in the size of the synthetic models,
+    between the smallest and the largest.
+    """
+    exponents = {}
+    for stage in dict.fromkeys(result["stage"] for result in results):
+        runs = sorted(
+            (result["objects"], result["seconds"])
+            for result in results
+            if result["stage"] == stage and result["workload"].startswith("synthetic")
+        )
+        if len(runs) < 2 or runs[0][0] == runs[-1][0] or not runs[0][1]:
+            continue
+        (n_small, t_small), (n_large, t_large) = runs[0], runs[-1]
+        exponents[stage] = math.log(t_large / t_small) / math.log(n_large / n_small)
+    return exponents
+
+
+def run(args) -> int:
+    commit, dirty = git_commit()
+    idd = IDD.from_idd_file(args.idd)
+
+    print(f"{'stage':>18} {'workload':>16} {'objects':>8} {'ms':>10} {'peak MB':>9}")
+    results = []
+
+    def record(workload: str, stages: list[Stage]):
+        for stage, function, n_objects in stages:
+            seconds, peak_bytes = measure(function, args.repeat)
+            results.append(
+                {
+                    "stage": stage,
+                    "workload": workload,
+                    "objects": n_objects,
+                    "seconds": seconds,
+                    "peak_bytes": peak_bytes,
+                }
+            )
+            print(
+                f"{stage:>18} {workload:>16} {n_objects:>8} "
+                f"{seconds * 1000:>10.2f} {peak_bytes / 1e6:>9.2f}"
+            )
+
+    record("idd", idd_stages(args.idd))
+    record("necb", eppy_stages(NECB_IDF, args.idd, idd) + model_stages(NECB_IDF, idd))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = write_synthetic_idf(
+                Path(tmpdir) / f"synthetic_{size}.idf", size, args.zones_per_loop
+            )
+            record(f"synthetic {size}", model_stages(path, idd))
+
+    exponents = scaling(results)
+    for stage, exponent in exponents.items():
+        print(f"{stage:>18} scales as n^{exponent:.2f}")
+
+    output = Path(
+        args.output or RESULTS_DIR / f"{commit}{'-dirty' if dirty else ''}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "commit": commit,
+                "dirty": dirty,
+                "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "processor": platform.processor() or platform.machine(),
+                "cpu_count": os.cpu_count(),
+                "idd": Path(args.idd).name,
+                "repeat": args.repeat,
+                "results": results,
+                "scaling": exponents,
+            },
+            indent=2,
+        )
+    )
+    print(f"Wrote {output}")
+    return 0
+
+
+def compare(args) -> int:
+    old, new = (json.loads(Path(path).read_text()) for path in (args.old, args.new))
+    if old["platform"] != new["platform"] or old["cpu_count"] != new["cpu_count"]:
+        print("Warning: the results were measured on different machines")
+    old_results = {(r["stage"], r["workload"]): r for r in old["results"]}
+
+    print(
+        f"{old['commit']} -> {new['commit']}\n"
+        f"{'stage':>18} {'workload':>16} {'old ms':>10} {'new ms':>10} "
+        f"{'time':>7} {'memory':>7}"
+    )
+    n_regressions = 0
+    for result in new["results"]:
+        before: Optional[dict] = old_results.get((result["stage"], result["workload"]))
+        if before is None:
+            continue
+        time_ratio = result["seconds"] / before["seconds"]
+        memory_ratio = result["peak_bytes"] / max(before["peak_bytes"], 1)
+        # changes of under a millisecond are noise
+        slower = (
+            time_ratio > 1 + args.threshold
+            and result["seconds"] - before["seconds"] > 1e-3
+        )
+        bigger = memory_ratio > 1 + args.threshold
+        flag = " ".join(
+            label for label, on in (("slower", slower), ("bigger", bigger)) if on
+        )
+        n_regressions += bool(flag)
+        print(
+            f"{result['stage']:>18} {result['workload']:>16} "
+            f"{before['seconds'] * 1000:>10.2f} {result['seconds'] * 1000:>10.2f} "
+            f"{time_ratio:>6.2f}x {memory_ratio:>6.2f}x {flag}"
+        )
+    print(f"{n_regressions} regressions past {args.threshold:.0%}")
+    return 1 if n_regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and store the results")
+    run_parser.add_argument(
+        "--idd", required=True, help="The Energy+.idd to resolve references with"
+    )
+    run_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 50_000],
+        help="Approximate object counts of the synthetic files",
+    )
+    run_parser.add_argument(
+        "--zones-per-loop",
+        type=int,
+        default=20,
+        help="The number of zones each synthetic air loop serves",
+    )
+    run_parser.add_argument(
+        "--repeat", type=int, default=3, help="How many times to time each stage"
+    )
+    run_parser.add_argument(
+        "--output", help="Where to write the results; by default, named by commit"
+    )
+
+    compare_parser = commands.add_parser("compare", help="Compare two stored results")
+    compare_parser.add_argument("old", help="The earlier results")
+    compare_parser.add_argument("new", help="The later results")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="The relative slowdown or growth to flag as a regression",
+    )
+
+    args = parser.parse_args()
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,301 @@
+"""
+Generate synthetic IDF files of arbitrary size for benchmarking.
+
+The generated models are not meant to be simulated; they only need to look
+like real models to the graph tooling, i.e. many zones, each with surfaces,
+internal gains and schedules, which reference a shared pool of constructions,
+materials and schedule type limits, and optionally air loops serving them.
+"""
+
+from pathlib import Path
+
+# Objects written for every zone: the zone, 6 surfaces, people, lights and
+# one zone-specific schedule.
+OBJECTS_PER_ZONE = 10
+
+MATERIALS = [
+    ("1/2IN Gypsum", 0.0127, 0.16, 784.9, 830.0),
+    ("M10 200mm concrete block", 0.2032, 0.72, 800.0, 832.0),
+    ("Insulation Board", 0.0508, 0.03, 43.0, 1210.0),
+    ("Wood Siding", 0.01, 0.11, 544.62, 1210.0),
+]
+
+CONSTRUCTIONS = [
+    ("Exterior Wall", ["Wood Siding", "Insulation Board", "1/2IN Gypsum"]),
+    ("Interior Wall", ["1/2IN Gypsum", "1/2IN Gypsum"]),
+    ("Exterior Roof", ["M10 200mm concrete block", "Insulation Board"]),
+    ("Exterior Floor", ["M10 200mm concrete block"]),
+]
+
+SURFACES = [
+    ("North Wall", "Wall", "Exterior Wall"),
+    ("East Wall", "Wall", "Exterior Wall"),
+    ("South Wall", "Wall", "Exterior Wall"),
+    ("West Wall", "Wall", "Interior Wall"),
+    ("Roof", "Roof", "Exterior Roof"),
+    ("Floor", "Floor", "Exterior Floor"),
+]
+
+
+def _write_object(lines: list[str], obj_type: str, fields: list):
+    lines.append(f"  {obj_type},")
+    for i, value in enumerate(fields):
+        terminator = ";" if i == len(fields) - 1 else ","
+        lines.append(f"    {value}{terminator}")
+    lines.append("")
+
+
+def _write_air_loop(lines: list[str], loop: str, zones: list[str]):
+    """
+    Write an air loop with a heating coil and a fan, serving the given zones
+    through uncontrolled terminals.
+    """
+    _write_object(
+        lines,
+        "AirLoopHVAC",
+        [
+            loop,
+            "",
+            "",
+            "autosize",
+            f"{loop} Branches",
+            "",
+            f"{loop} Supply Inlet",
+            f"{loop} Demand Outlet",
+            f"{loop} Demand Inlet",
+            f"{loop} Supply Outlet",
+        ],
+    )
+    _write_object(lines, "BranchList", [f"{loop} Branches", f"{loop} Main Branch"])
+    _write_object(
+        lines,
+        "Branch",
+        [
+            f"{loop} Main Branch",
+            "",
+            "Coil:Heating:Electric",
+            f"{loop} Heating Coil",
+            f"{loop} Supply Inlet",
+            f"{loop} Heating Coil Outlet",
+            "Fan:ConstantVolume",
+            f"{loop} Fan",
+            f"{loop} Heating Coil Outlet",
+            f"{loop} Supply Outlet",
+        ],
+    )
+    _write_object(
+        lines,
+        "Coil:Heating:Electric",
+        [
+            f"{loop} Heating Coil",
+            "Always On",
+            1,
+            "autosize",
+            f"{loop} Supply Inlet",
+            f"{loop} Heating Coil Outlet",
+        ],
+    )
+    _write_object(
+        lines,
+        "Fan:ConstantVolume",
+        [
+            f"{loop} Fan",
+            "Always On",
+            0.7,
+            600,
+            "autosize",
+            0.9,
+            1,
+            f"{loop} Heating Coil Outlet",
+            f"{loop} Supply Outlet",
+        ],
+    )
+    _write_object(
+        lines,
+        "AirLoopHVAC:SupplyPath",
+        [
+            f"{loop} Supply Path",
+            f"{loop} Demand Inlet",
+            "AirLoopHVAC:ZoneSplitter",
+            f"{loop} Zone Splitter",
+        ],
+    )
+    _write_object(
+        lines,
+        "AirLoopHVAC:ZoneSplitter",
+        [
+            f"{loop} Zone Splitter",
+            f"{loop} Demand Inlet",
+            *[f"{zone} Supply Inlet" for zone in zones],
+        ],
+    )
+    for zone in zones:
+        _write_object(
+            lines,
+            "AirTerminal:SingleDuct:Uncontrolled",
+            [f"{zone} Terminal", "Always On", f"{zone} Supply Inlet", "autosize"],
+        )
+        _write_object(
+            lines,
+            "ZoneHVAC:EquipmentConnections",
+            [
+                zone,
+                "",
+                f"{zone} Supply Inlet",
+                "",
+                f"{zone} Air Node",
+                f"{zone} Return Outlet",
+            ],
+        )
+    _write_object(
+        lines,
+        "AirLoopHVAC:ReturnPath",
+        [
+            f"{loop} Return Path",
+            f"{loop} Demand Outlet",
+            "AirLoopHVAC:ZoneMixer",
+            f"{loop} Zone Mixer",
+        ],
+    )
+    _write_object(
+        lines,
+        "AirLoopHVAC:ZoneMixer",
+        [
+            f"{loop} Zone Mixer",
+            f"{loop} Demand Outlet",
+            *[f"{zone} Return Outlet" for zone in zones],
+        ],
+    )
+
+
+def generate_idf(n_zones: int, zones_per_air_loop: int = 0) -> str:
+    """
+    Generate the text of a synthetic IDF with the requested number of zones.
+
+    Args:
+        n_zones (int): The number of zones to write
+        zones_per_air_loop (int): If set, the zones are also served by air
+            loops of this many zones each
+
+    Returns:
+        text (str): The IDF file contents
+    """
+    lines: list[str] = []
+    _write_object(lines, "Version", ["9.2"])
+    _write_object(lines, "ScheduleTypeLimits", ["Fraction", 0, 1, "Continuous"])
+    _write_object(lines, "ScheduleTypeLimits", ["Any Number", "", "", "Continuous"])
+    _write_object(lines, "Schedule:Constant", ["Always On", "Fraction", 1])
+    _write_object(lines, "Schedule:Constant", ["Activity Level", "Any Number", 120])
+    for name, thickness, conductivity, density, specific_heat in MATERIALS:
+        _write_object(
+            lines,
+            "Material",
+            [name, "Smooth", thickness, conductivity, density, specific_heat],
+        )
+    for name, layers in CONSTRUCTIONS:
+        _write_object(lines, "Construction", [name, *layers])
+
+    for i in range(n_zones):
+        zone = f"Zone {i:06d}"
+        x = float(i % 100) * 10
+        y = float(i // 100) * 10
+        _write_object(lines, "Zone", [zone, 0, x, y, 0])
+        for surface_name, surface_type, construction in SURFACES:
+            _write_object(
+                lines,
+                "BuildingSurface:Detailed",
+                [
+                    f"{zone} {surface_name}",
+                    surface_type,
+                    construction,
+                    zone,
+                    "Outdoors",
+                    "",
+                    "SunExposed",
+                    "WindExposed",
+                    "",
+                    4,
+                    *[x, y, 3, x, y, 0, x + 10, y, 0, x + 10, y, 3],
+                ],
+            )
+        schedule = f"{zone} Occupancy"
+        _write_object(
+            lines,
+            "Schedule:Compact",
+            [
+                schedule,
+                "Fraction",
+                "Through: 12/31",
+                "For: AllDays",
+                "Until: 08:00",
+                0,
+                "Until: 18:00",
+                1,
+                "Until: 24:00",
+                0,
+            ],
+        )
+        _write_object(
+            lines,
+            "People",
+            [
+                f"{zone} People",
+                zone,
+                schedule,
+                "People",
+                10,
+                "",
+                "",
+                0.3,
+                "",
+                "Activity Level",
+            ],
+        )
+        _write_object(
+            lines,
+            "Lights",
+            [
+                f"{zone} Lights",
+                zone,
+                "Always On",
+                "Watts/Area",
+                "",
+                10,
+                "",
+                0,
+                0.5,
+                0.2,
+                0,
+            ],
+        )
+
+    if zones_per_air_loop:
+        for i in range(0, n_zones, zones_per_air_loop):
+            zones = [
+                f"Zone {j:06d}" for j in range(i, min(i + zones_per_air_loop, n_zones))
+            ]
+            _write_air_loop(lines, f"Air Loop {i // zones_per_air_loop:05d}", zones)
+
+    return "\n".join(lines)
+
+
+def write_synthetic_idf(
+    path: Path, n_objects: int, zones_per_air_loop: int = 0
+) -> Path:
+    """
+    Write a synthetic IDF with approximately the requested number of objects.
+
+    Args:
+        path (Path): Where to write the file
+        n_objects (int): The approximate number of objects in the file
+        zones_per_air_loop (int): If set, the zones are also served by air
+            loops of this many zones each, which adds about two objects per
+            zone
+
+    Returns:
+        path (Path): The path of the written file
+    """
+    n_zones = max(1, n_objects // OBJECTS_PER_ZONE)
+    path = Path(path)
+    path.write_text(generate_idf(n_zones, zones_per_air_loop))
+    return path
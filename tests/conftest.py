@@ -0,0 +1,19 @@
+from pathlib import Path
+
+import pytest
+
+from aiep.idd import IDD
+
+eppy = pytest.importorskip("eppy")
+
+IDD_PATH = Path(eppy.__file__).parent / "resources" / "iddfiles" / "Energy+V9_2_0.idd"
+
+
+@pytest.fixture(scope="session")
+def idd_path() -> Path:
+    return IDD_PATH
+
+
+@pytest.fixture(scope="session")
+def idd() -> IDD:
+    return IDD.from_idd_file(IDD_PATH)
@@ -0,0 +1,159 @@
+from typing import Optional
+
+import pytest
+
+from aiep.graph import IDFGraph
+from aiep.idd import IDD
+from aiep.idf import build_graph_store
+from aiep.parser import IDFObject, parse_idf
+
+MODEL = b"""
+Zone, Core, 0, 0, 0, 0;
+Zone, Perimeter, 0, 10, 0, 0;
+Material, Brick, Rough, 0.1, 0.9, 1900, 800;
+Material, Insulation, Rough, 0.05, 0.04, 30, 1400;
+Construction, Wall, Brick, Insulation;
+Construction, Partition, Brick;
+ScheduleTypeLimits, Fraction, 0, 1, Continuous;
+Schedule:Constant, Always On, Fraction, 1;
+Schedule:Constant, Half, Fraction, 0.5;
+BuildingSurface:Detailed, Core Wall 1, Wall, Wall, Core, , Outdoors, , SunExposed,
+    WindExposed, autocalculate, 4, 0, 0, 3, 0, 0, 0, 10, 0, 0, 10, 0, 3;
+BuildingSurface:Detailed, Core Wall 2, Wall, Wall, Core, , Outdoors, , SunExposed,
+    WindExposed, autocalculate, 4, 0, 0, 3, 0, 0, 0, 0, 10, 0, 0, 10, 3;
+BuildingSurface:Detailed, Perimeter Wall, Wall, Wall, Perimeter, , Outdoors, ,
+    SunExposed, WindExposed, autocalculate, 4, 0, 10, 3, 0, 10, 0, 10, 10, 0,
+    10, 10, 3;
+BuildingSurface:Detailed, Core Partition, Wall, Partition, Core, , Adiabatic, ,
+    NoSun, NoWind, autocalculate, 4, 10, 0, 3, 10, 0, 0, 10, 10, 0, 10, 10, 3;
+People, Core People, Core, Always On, People, 10, , , 0.3, , Always On;
+People, Perimeter People, Perimeter, Half, People, 5, , , 0.3, , Always On;
+"""
+
+
+def rebuilt_edge_set(
+    graph: IDFGraph, idd: Optional[IDD]
+) -> set[tuple[str, str, str, str, str]]:
+    """
+    The edges of a graph built from scratch from the edited objects, in the
+    shape of `IDFGraph.edge_set`.
+    """
+    objects = [graph.object(node_id) for node_id in graph.graph.nodes]
+    store = build_graph_store(objects, idd, progress=False)
+    return {
+        (
+            store.node_type(source),
+            store.names[source],
+            store.edge_field(edge_id),
+            store.node_type(target),
+            store.names[target],
+        )
+        for edge_id, (source, target) in enumerate(
+            zip(store.edge_sources, store.edge_targets)
+        )
+    }
+
+
+@pytest.fixture(params=["typed", "untyped"])
+def graph_idd(request, idd: IDD) -> Optional[IDD]:
+    return idd if request.param == "typed" else None
+
+
+@pytest.fixture
+def graph(idd: IDD, graph_idd: Optional[IDD]) -> IDFGraph:
+    # the objects are always named by the IDD, even when references are not
+    return IDFGraph.from_idf(parse_idf(MODEL, idd), graph_idd)
+
+
+def test_from_idf_matches_rebuild(graph: IDFGraph, graph_idd: Optional[IDD]):
+    edges = graph.edge_set()
+    assert ("CONSTRUCTION", "Wall", "Outside_Layer", "MATERIAL", "Brick") in edges
+    assert edges == rebuilt_edge_set(graph, graph_idd)
+
+
+def test_add_object_resolves_references(graph: IDFGraph, graph_idd: Optional[IDD]):
+    # a construction which refers to a material that does not exist yet
+    graph.add_object(
+        IDFObject(
+            "Construction",
+            ["key", "Name", "Outside_Layer"],
+            ["Construction", "Glass Wall", "Glass"],
+        )
+    )
+    assert graph.edge_set() == rebuilt_edge_set(graph, graph_idd)
+    graph.add_object(
+        IDFObject(
+            "Material:NoMass",
+            ["key", "Name", "Roughness", "Thermal_Resistance"],
+            ["Material:NoMass", "Glass", "Smooth", "0.2"],
+        )
+    )
+    edges = graph.edge_set()
+    assert (
+        "CONSTRUCTION",
+        "Glass Wall",
+        "Outside_Layer",
+        "MATERIAL:NOMASS",
+        "Glass",
+    ) in edges
+    assert edges == rebuilt_edge_set(graph, graph_idd)
+
+
+def test_remove_object_drops_edges(graph: IDFGraph, graph_idd: Optional[IDD]):
+    graph.remove_object(graph.find("MATERIAL", "Brick"))
+    edges = graph.edge_set()
+    assert not any(target_name == "Brick" for *_, target_name in edges)
+    assert edges == rebuilt_edge_set(graph, graph_idd)
+
+
+def test_set_field_repoints_edge(graph: IDFGraph, graph_idd: Optional[IDD]):
+    surface = graph.find("BUILDINGSURFACE:DETAILED", "Core Partition")
+    graph.set_field(surface, "Construction_Name", "Wall")
+    graph.set_field(surface, "Zone_Name", "Perimeter")
+    edges = graph.edge_set()
+    assert (
+        "BUILDINGSURFACE:DETAILED",
+        "Core Partition",
+        "Construction_Name",
+        "CONSTRUCTION",
+        "Wall",
+    ) in edges
+    assert edges == rebuilt_edge_set(graph, graph_idd)
+
+
+def test_set_field_to_missing_name(graph: IDFGraph, graph_idd: Optional[IDD]):
+    graph.set_field(graph.find("PEOPLE", "Core People"), "Zone_or_ZoneList_Name", "X")
+    assert graph.edge_set() == rebuilt_edge_set(graph, graph_idd)
+
+
+def test_rename_with_several_referrers(graph: IDFGraph, graph_idd: Optional[IDD]):
+    graph.rename(graph.find("SCHEDULE:CONSTANT", "Always On"), "Always On 2")
+    graph.rename(graph.find("ZONE", "Core"), "Core Zone")
+    edges = graph.edge_set()
+    assert not any("Always On" in edge or "Core" in edge for edge in edges)
+    assert (
+        "PEOPLE",
+        "Core People",
+        "Activity_Level_Schedule_Name",
+        "SCHEDULE:CONSTANT",
+        "Always On 2",
+    ) in edges
+    assert edges == rebuilt_edge_set(graph, graph_idd)
+
+
+def test_edit_sequence(graph: IDFGraph, graph_idd: Optional[IDD]):
+    graph.rename(graph.find("CONSTRUCTION", "Wall"), "Exterior Wall")
+    graph.remove_object(graph.find("ZONE", "Perimeter"))
+    graph.add_object(
+        IDFObject(
+            "Zone",
+            ["key", "Name"],
+            ["Zone", "Perimeter"],
+        )
+    )
+    graph.set_field(
+        graph.find("PEOPLE", "Core People"), "Zone_or_ZoneList_Name", "Perimeter"
+    )
+    graph.rename(graph.find("MATERIAL", "Brick"), "Clay Brick")
+    graph.remove_object(graph.find("SCHEDULE:CONSTANT", "Half"))
+    assert graph.edge_set() == rebuilt_edge_set(graph, graph_idd)
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import pytest
+
+from aiep.idd import IDD
+
+
+@pytest.fixture(scope="module")
+def idd_eppy(idd_path: Path) -> IDD:
+    from io import StringIO
+
+    from eppy.modeleditor import IDF
+
+    IDF.setiddname(str(idd_path), testing=True)
+    return IDD.from_idf(IDF(StringIO("")))
+
+
+def test_same_object_types(idd: IDD, idd_eppy: IDD):
+    assert set(idd.schemas) == set(idd_eppy.schemas)
+
+
+def test_bunch_names_match_eppy(idd: IDD, idd_eppy: IDD):
+    mismatched = [
+        obj_type
+        for obj_type, schema in idd_eppy.schemas.items()
+        if [field.bunch_name for field in idd[obj_type]]
+        != [field.bunch_name for field in schema]
+    ]
+    assert mismatched == []